@@ -0,0 +1,66 @@
+# File: benchmarks/bench_periode_codes.py
+# Micro-benchmark: periode sleutels via strftime per rij (oude aanpak) vs. integer periode codes (periode_codes).
+# Gebruik: python benchmarks/bench_periode_codes.py [aantal_events], of als onderdeel van de suite: pytest benchmarks --grootte 10k,1M
+
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dashboard import periode_codes, periode_label, PERIODE_CODE_KOLOM  # noqa: E402
+
+def maak_jaar_data(aantal: int) -> pd.DataFrame:
+    """Een jaar aan willekeurige starttijden met een duur in minuten."""
+    rng = np.random.default_rng(42)
+    start = np.datetime64("2024-01-01T00:00:00", "s")
+    offsets = np.sort(rng.integers(0, 366 * 24 * 3600, size=aantal))
+    return pd.DataFrame({"Starttijd_dt": pd.to_datetime(start + offsets.astype("timedelta64[s]")), "Duur_min": rng.exponential(12.0, size=aantal)})
+
+def oud(df: pd.DataFrame, periode: str) -> pd.Series:
+    """Zoals display_period_analysis het vroeger deed: label per rij, dan groeperen."""
+    if periode == "Dag": sleutel = df["Starttijd_dt"].dt.strftime("%Y-%m-%d")
+    elif periode == "Week": sleutel = df["Starttijd_dt"].dt.strftime('%Y-W%V')
+    else: sleutel = df["Starttijd_dt"].dt.to_period("M").astype(str)
+    return df.groupby(sleutel)["Duur_min"].sum()
+
+def nieuw(df: pd.DataFrame, periode: str, codes: pd.DataFrame) -> pd.Series:
+    """Groeperen op de integer code, labels alleen voor de resultaatgroepen."""
+    totaal = df["Duur_min"].groupby(codes[PERIODE_CODE_KOLOM[periode]]).sum()
+    totaal.index = [periode_label(code, periode) for code in totaal.index]
+    return totaal
+
+@pytest.fixture(scope="module")
+def jaar_data(aantal) -> tuple:
+    df = maak_jaar_data(aantal)
+    return df, periode_codes(df["Starttijd_dt"])
+
+def bench_periode_codes(meet, jaar_data):
+    meet(periode_codes, jaar_data[0]["Starttijd_dt"])
+
+@pytest.mark.parametrize("periode", ["Dag", "Week", "Maand"])
+def bench_periode_strftime(meet, jaar_data, periode):
+    meet(oud, jaar_data[0], periode)
+
+@pytest.mark.parametrize("periode", ["Dag", "Week", "Maand"])
+def bench_periode_groeperen(meet, jaar_data, periode):
+    meet(nieuw, jaar_data[0], periode, jaar_data[1])
+
+def main():
+    aantal = int(sys.argv[1]) if len(sys.argv) > 1 else 250_000
+    df = maak_jaar_data(aantal)
+    herhalingen = 5
+    t_codes = min(timeit.repeat(lambda: periode_codes(df["Starttijd_dt"]), number=1, repeat=herhalingen))
+    codes = periode_codes(df["Starttijd_dt"])
+    print(f"{aantal:,} events over een jaar; periode_codes eenmalig: {t_codes * 1000:.1f} ms")
+    print(f"{'Periode':<8}{'strftime (ms)':>15}{'codes (ms)':>12}{'winst':>8}")
+    for periode in ["Dag", "Week", "Maand"]:
+        t_oud = min(timeit.repeat(lambda: oud(df, periode), number=1, repeat=herhalingen))
+        t_nieuw = min(timeit.repeat(lambda: nieuw(df, periode, codes), number=1, repeat=herhalingen))
+        print(f"{periode:<8}{t_oud * 1000:>15.1f}{t_nieuw * 1000:>12.1f}{t_oud / t_nieuw:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
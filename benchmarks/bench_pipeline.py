@@ -0,0 +1,71 @@
+# File: benchmarks/bench_pipeline.py
+# Tijd en geheugenpiek per stap van de downtime pipeline, op synthetische exports van 10k/1M/10M rijen (zie conftest.py).
+# De display_* functies worden gemeten via hun bereken_* stappen (alles behalve de st.* aanroepen).
+# Gebruik: pytest benchmarks --grootte 10k,1M
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dashboard import (bereken_kpis, bereken_langste_stilstanden, bereken_pareto, bereken_pareto_periodes, bereken_performance,  # noqa: E402
+                       bereken_reden_aggregaat, bereken_reden_per_lijn, bereken_top_orders, bereken_top_orders_per_weekdag, bouw_kubus,
+                       bouw_segmenten, cache_pad_voor, compacteer_downtime, filter_data, filter_kubus, laad_downtime, lees_downtime_csv,
+                       voeg_tijdkenmerken_toe, voorbewerk_downtime)
+
+# === LADEN (load_data) ===
+def bench_lees_csv(meet, export):
+    meet(lees_downtime_csv, export)
+
+def bench_voorbewerk(meet, export):
+    ruw = lees_downtime_csv(export)
+    meet(lambda df: compacteer_downtime(voorbewerk_downtime(df)[0]), setup=lambda: ((ruw.copy(),), {})) # voorbewerk past df aan: elke ronde een kopie
+
+def bench_laad_downtime_koud(meet, export):
+    def zonder_cache():
+        if os.path.exists(cache_pad_voor(export)): os.remove(cache_pad_voor(export))
+    meet(laad_downtime, export, setup=zonder_cache)
+
+def bench_laad_downtime_warm(meet, export, downtime):
+    meet(laad_downtime, export) # De downtime fixture heeft de cache al gevuld
+
+def bench_segmenten(meet, downtime):
+    meet(bouw_segmenten, downtime)
+
+def bench_tijdkenmerken(meet, downtime, segmenten):
+    meet(voeg_tijdkenmerken_toe, downtime, segmenten)
+
+def bench_kubus(meet, events, segmenten):
+    meet(bouw_kubus, events, segmenten)
+
+# === FILTER (filter_data / filter_kubus) ===
+def bench_filter_data(meet, events, bereik):
+    meet(filter_data, events, "Alle lijnen", bereik, True)
+
+def bench_filter_kubus(meet, kubus, bereik):
+    meet(filter_kubus, kubus, "Alle lijnen", bereik, True)
+
+# === DISPLAY BEREKENINGEN ===
+def bench_kpis(meet, selectie):
+    meet(bereken_kpis, selectie[1])
+
+def bench_lijn_analyse(meet, selectie):
+    """display_tabbed_line_analysis: één groupby, daarna elke tab."""
+    def alle_tabs(df_filtered):
+        df_reden_lijn = bereken_reden_per_lijn(df_filtered)
+        return [bereken_reden_aggregaat(df_reden_lijn, lijn) for lijn in ["Alle lijnen"] + sorted(df_reden_lijn["Workflow"].unique())]
+    meet(alle_tabs, selectie[0])
+
+def bench_order_analyse(meet, selectie):
+    """display_order_analysis: top 3 orders, hun langste stilstand (met opmerkingen uit de cache) en top 3 per werkdag."""
+    def order_analyse(df_filtered):
+        top = bereken_top_orders(df_filtered)
+        return top, bereken_langste_stilstanden(df_filtered, top["Ordernummer"].tolist()), bereken_top_orders_per_weekdag(df_filtered)
+    meet(order_analyse, selectie[0])
+
+def bench_performance(meet, selectie):
+    meet(bereken_performance, selectie[1])
+
+def bench_pareto(meet, selectie):
+    def pareto(kubus_sel):
+        return [bereken_pareto(kubus_sel, "Week", code) for code in bereken_pareto_periodes(kubus_sel, "Week")[:1]]
+    meet(pareto, selectie[1])
@@ -0,0 +1,88 @@
+# File: benchmarks/conftest.py
+# Fixtures voor de pipeline benchmarks: een synthetische export per grootte (eenmalig gegenereerd in --bench-data) en de
+# tussenresultaten van de laad-pipeline, zodat elke benchmark alleen zijn eigen stap meet.
+# Gebruik: pytest benchmarks --grootte 10k,1M,10M [--geen-geheugen] [--benchmark-autosave / --benchmark-compare]
+
+import datetime
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dashboard import bouw_kubus, bouw_segmenten, filter_data, filter_kubus, laad_downtime, voeg_tijdkenmerken_toe  # noqa: E402
+from genereer_motivate import genereer_export  # noqa: E402
+
+GROOTTES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+RONDES = {"10k": 5, "1M": 2, "10M": 1} # Minder herhalingen naarmate een ronde langer duurt
+
+def pytest_addoption(parser):
+    parser.addoption("--grootte", default="10k", help="Komma-gescheiden export groottes: 10k, 1M, 10M (standaard: 10k)")
+    parser.addoption("--bench-data", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"), help="Map voor de gegenereerde exports")
+    parser.addoption("--geen-geheugen", action="store_true", help="Sla de extra run onder tracemalloc (geheugenpiek) over")
+
+def pytest_generate_tests(metafunc):
+    if "grootte" in metafunc.fixturenames:
+        groottes = metafunc.config.getoption("--grootte").split(",")
+        onbekend = [g for g in groottes if g not in GROOTTES]
+        if onbekend: raise pytest.UsageError(f"Onbekende grootte(s): {', '.join(onbekend)}; kies uit {', '.join(GROOTTES)}")
+        metafunc.parametrize("grootte", groottes, scope="session")
+
+@pytest.fixture(scope="session")
+def aantal(grootte) -> int:
+    return GROOTTES[grootte]
+
+@pytest.fixture(scope="session")
+def export(grootte, request) -> str:
+    """Pad van de synthetische export (wordt alleen gegenereerd als hij nog niet bestaat)."""
+    data_dir = request.config.getoption("--bench-data"); os.makedirs(data_dir, exist_ok=True)
+    pad = os.path.join(data_dir, f"motivate_{grootte}.csv")
+    if not os.path.exists(pad): genereer_export(GROOTTES[grootte], pad)
+    return pad
+
+@pytest.fixture(scope="session")
+def downtime(export):
+    """Uitkomst van laad_downtime (vult ook de Arrow cache voor de warme benchmark)."""
+    return laad_downtime(export)[0]
+
+@pytest.fixture(scope="session")
+def segmenten(downtime):
+    return bouw_segmenten(downtime)
+
+@pytest.fixture(scope="session")
+def events(downtime, segmenten):
+    return voeg_tijdkenmerken_toe(downtime, segmenten)
+
+@pytest.fixture(scope="session")
+def kubus(events, segmenten):
+    return bouw_kubus(events, segmenten)
+
+@pytest.fixture(scope="session", params=["30d", "alles"])
+def bereik(request, events) -> tuple:
+    """Datumbereik zoals de sidebar: standaard de laatste 30 dagen, of de hele historie."""
+    eind = events["Datum"].max().date()
+    return (eind - datetime.timedelta(days=30), eind) if request.param == "30d" else (events["Datum"].min().date(), eind)
+
+@pytest.fixture(scope="session")
+def selectie(events, kubus, bereik) -> tuple:
+    """(df_filtered, kubus_sel) voor "Alle lijnen" met het shift filter aan, zoals main() standaard toont."""
+    return filter_data(events, "Alle lijnen", bereik, True), filter_kubus(kubus, "Alle lijnen", bereik, True)
+
+@pytest.fixture
+def meet(benchmark, grootte, request):
+    """meet(functie, *args, setup=None): tijd via pytest-benchmark, plus de geheugenpiek (tracemalloc) in extra_info["piek_mb"].
+
+    setup wordt vóór elke ronde buiten de meting aangeroepen en mag (args, kwargs) teruggeven, zoals bij benchmark.pedantic.
+    """
+    def _meet(functie, *args, setup=None):
+        if not request.config.getoption("--geen-geheugen"):
+            args_run, kwargs_run = (setup() or (args, {})) if setup else (args, {})
+            tracemalloc.start()
+            try: functie(*args_run, **kwargs_run)
+            finally: piek = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+            benchmark.extra_info["piek_mb"] = round(piek / 1e6, 1)
+        if setup: return benchmark.pedantic(functie, setup=lambda: setup() or (args, {}), rounds=RONDES[grootte], iterations=1)
+        return benchmark.pedantic(functie, args=args, rounds=RONDES[grootte], iterations=1)
+    return _meet
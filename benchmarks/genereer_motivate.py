@@ -0,0 +1,80 @@
+# File: benchmarks/genereer_motivate.py
+# Synthetische Motivate downtime export: dezelfde 13 kolommen en opmaak als OEE_Dashboard_PowerBI_Finaal.csv
+# (lege index kolom, dd/mm/yy HH:MM:SS tijden, "VMPT 1"/"VMPT 5"/"COSMO", scheve reden verdeling, ~10% opmerkingen).
+# Gebruik: python benchmarks/genereer_motivate.py <aantal_rijen> <pad.csv> [seed]
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+WORKFLOWS = ["VMPT 5", "VMPT 1", "COSMO"] # Zoals in de export (voorbewerk_downtime haalt de spatie weg)
+WORKFLOW_KANS = [0.46, 0.35, 0.19]
+# Redenen uit de echte export; de kansen volgen Zipf (rang ** -1.1), dus een paar redenen domineren zoals in de praktijk
+REDENEN = ["Geplande organisatorische stilstand / Tafel leeg maken", "Geplande organisatorische stilstand / Pauze",
+           "Geplande organisatorische stilstand / Kleurwissel", "Geplande organisatorische stilstand / Verpakkingen open maken",
+           "Geplande organisatorische stilstand / Opstarten", "Geplande organisatorische stilstand / Etiketten rolwissel",
+           "Geplande organisatorische stilstand / Handmatig Labelen", "Geplande organisatorische stilstand / Trays vouwen",
+           "Geplande organisatorische stilstand / IPC", "Geplande organisatorische stilstand / Documentatie",
+           "Productie uitgepland  / Nachten", "Geplande organisatorische stilstand / Doosjes vouwen",
+           "Geplande organisatorische stilstand / Schoonmaken einde dag/inspectie", "Storing / Overzetband", "Storing / Etiketeerder",
+           "Geplande organisatorische stilstand / Orderwissel", "Productie uitgepland  / Geen orders", "Storing / Doppen station / Aanvoer dop",
+           "Storing / Vuller / Vulstation", "Ongeplande organisatorische stilstand / Kwaliteit / Kwaliteitscheck",
+           "Geplande technische stilstand / Onderhoud", "Ongeplande organisatorische stilstand / Wachten op materiaal"]
+OPERATORS = [f"Operator {i}" for i in range(1, 15)]
+OPMERKINGEN = ["Wachten op antwoord over de nieuwe doosjes", "vmpt 6 aflossen", "Scherm restart maar niet geholpen",
+               "Monteur gebeld", "Etiketten scheef, rol opnieuw ingelegd", "Materiaal nog niet geleverd"]
+EVENTS_PER_DAG_PER_LIJN = 6 # Zoals de echte export; grotere sets beslaan meer jaren, tot MAX_JAREN (daarna wordt het drukker)
+MAX_JAREN = 8
+START = np.datetime64("2019-01-01T00:00:00", "s")
+
+def genereer_chunk(aantal: int, rng: np.random.Generator, job_start: int, start_per_lijn: np.ndarray, gap_s: float) -> tuple:
+    """aantal export rijen. Per lijn lopen de starttijden door vanaf start_per_lijn (in seconden vanaf START)."""
+    lijn = rng.choice(len(WORKFLOWS), size=aantal, p=WORKFLOW_KANS)
+    volgorde = np.argsort(lijn, kind="stable"); lijn = lijn[volgorde]
+    start_s = np.empty(aantal, dtype=np.int64)
+    for i in range(len(WORKFLOWS)): # Per lijn een tijdlijn: start = vorige start + exponentiële tussentijd (overlap is mogelijk)
+        mask = lijn == i
+        start_s[mask] = start_per_lijn[i] + np.cumsum(rng.exponential(gap_s, size=mask.sum())).astype(np.int64)
+        if mask.any(): start_per_lijn[i] = start_s[mask][-1]
+    rang = np.arange(1, len(REDENEN) + 1) ** -1.1
+    reden = rng.choice(len(REDENEN), size=aantal, p=rang / rang.sum())
+    duur_s = np.maximum(120, rng.lognormal(np.log(8 * 60), 1.1, size=aantal)).astype(np.int64) # Mediaan ~8 min, minimaal 2 min
+    nacht = np.char.find(np.array(REDENEN)[reden], "Nachten") >= 0
+    duur_s[nacht] = rng.integers(13 * 3600, 16 * 3600, size=nacht.sum()) # Nachten: de hele nacht
+    job = job_start + np.cumsum(rng.random(aantal) < 1 / 8) # Gemiddeld ~8 stops per order run
+    start = START + start_s.astype("timedelta64[s]"); stop = start + duur_s.astype("timedelta64[s]")
+    uren, rest = np.divmod(duur_s, 3600); minuten, seconden = np.divmod(rest, 60)
+    df = pd.DataFrame({
+        "": "",
+        "jobId": pd.Series(job).map(lambda j: f"{j * 2654435761 % (1 << 64):016x}{j:016x}"),
+        "Ordernummer": pd.Series(job).map(lambda j: f"WO{j % 1_000_000:06d}"),
+        "Workflow": np.array(WORKFLOWS)[lijn],
+        "Verklaard door": np.array(OPERATORS)[rng.integers(0, len(OPERATORS), size=aantal)],
+        "Reden": np.array(REDENEN)[reden],
+        "Opmerking": np.where(rng.random(aantal) < 0.1, np.array(OPMERKINGEN)[rng.integers(0, len(OPMERKINGEN), size=aantal)], None),
+        "Starttijd": pd.Series(start).dt.strftime("%d/%m/%y %H:%M:%S"),
+        "Stoptijd": pd.Series(stop).dt.strftime("%d/%m/%y %H:%M:%S"),
+        "Duur": [f"{u:02d}:{m:02d}:{s:02d}" for u, m, s in zip(uren, minuten, seconden)],
+        "excludedFromProductivity": np.where(rng.random(aantal) < 0.06, "true", "false"),
+        "subType": np.where(np.char.startswith(np.array(REDENEN)[reden], "Storing"), "technical", "organizational"),
+        "Opties": ""})
+    return df.iloc[rng.permutation(aantal)], int(job[-1]) + 1 # Een export is niet op tijd gesorteerd
+
+def genereer_export(aantal: int, pad: str, seed: int = 42, chunk: int = 1_000_000) -> str:
+    """Schrijft een export van aantal rijen naar pad (in chunks, dus ook 10M rijen passen in het geheugen)."""
+    rng = np.random.default_rng(seed)
+    dagen = min(MAX_JAREN * 365, max(30, aantal / (EVENTS_PER_DAG_PER_LIJN * len(WORKFLOWS))))
+    gap_s = dagen * 86400 / (aantal / len(WORKFLOWS)) # Gemiddelde tijd tussen twee starts op een lijn
+    start_per_lijn = np.zeros(len(WORKFLOWS), dtype=np.int64); job = 1
+    tmp_pad = pad + ".tmp"
+    for i, van in enumerate(range(0, aantal, chunk)):
+        df, job = genereer_chunk(min(chunk, aantal - van), rng, job, start_per_lijn, gap_s)
+        df.to_csv(tmp_pad, mode="w" if i == 0 else "a", header=i == 0, index=False, quoting=1, lineterminator="\n") # quoting=1: alles tussen "", zoals Motivate
+    os.replace(tmp_pad, pad)
+    return pad
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3: print("Gebruik: python benchmarks/genereer_motivate.py <aantal_rijen> <pad.csv> [seed]"); sys.exit(1)
+    genereer_export(int(sys.argv[1]), sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 42)
@@ -5,58 +5,565 @@ import pandas as pd
 import plotly.express as px
 import os
 import datetime
+import hashlib
+import json
+import heapq
+import glob
+import threading
+import sqlite3
+import time
+import warnings
+import functools
+import cProfile
+import pstats
+import io
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np # Nodig voor mean/std in performance
 
 # === CONSTANTEN ===
 DATA_PATH_DOWNTIME = "OEE_Dashboard_PowerBI_Finaal.csv"
+DATA_DIR_DOWNTIME = "exports" # Optioneel: map met Motivate exports (bv. één per week); heeft voorrang op DATA_PATH_DOWNTIME
 DATA_PATH_ORDER = "Motivate  Performance.csv" # Pad naar order data
 GEWENSTE_WORKFLOWS = ["VMPT1", "VMPT5", "COSMO"] # Workflows voor downtime analyse
 SHIFT_START_TIME = datetime.time(7, 30)
 SHIFT_END_TIME = datetime.time(16, 0)
 PERFORMANCE_SHIFT_MINUTES = 8 * 60
+# Shiftkalender: per weekdag (0 = maandag) de shifts als (start, eind); eind <= start is een nachtshift over middernacht
+SHIFT_KALENDER = {weekdag: [(SHIFT_START_TIME, SHIFT_END_TIME)] for weekdag in range(5)}
+FEESTDAGEN = [] # Dagen zonder shift, bv. datetime.date(2025, 12, 25)
+# Overlappende stops op dezelfde workflow: overlaptijd gaat naar de reden met het eerste passende keyword (daarna: wie eerst begon)
+OVERLAP_REDEN_PRIORITEIT = ["Storing", "Ongeplande", "Kwaliteit", "Geplande technische", "Geplande organisatorische", "Productie uitgepland"]
 # Filters en Top N instellingen
 UITGESLOTEN_REDENEN_KEYWORDS = ['Pauze'] # Voor downtime reden analyse
 TOP_N_IN_BARCHART = 10
 TOP_N_IN_DONUT = 5
 # Instelling voor Order Target Calculator
 EFFECTIVE_CAPACITY = 19.6 # Stuks per minuut
+ORDER_SCATTER_MAX_PUNTEN = 1000 # Daarboven wordt de scatter op de server gebind (ORDER_SCATTER_BINS x ORDER_SCATTER_BINS cellen per lijn)
+ORDER_SCATTER_BINS = 40
+# Opslag/query backend: None = pandas in geheugen; "sqlite" of "duckdb" = lokale database naast de downtime bron (zie SQL BACKEND)
+SQL_BACKEND = None
 
-# === PAGE CONFIG ===
-st.set_page_config(page_title="Interfilling OEE Analyse", layout="wide")
+# === INSTRUMENTATIE ===
+# Timers rond laden, filteren, aggregeren (memo), display secties en Plotly serialisatie. Streamlit runt elke rerun in een
+# eigen thread, dus de stappen van één rerun staan in een thread-local lijst. Buiten een rerun (rapport.py, benchmarks) is
+# stap() een lege context. Tonen gebeurt in de debug sectie; loggen als JSON regel per rerun naar INSTRUMENTATIE_LOG.
+INSTRUMENTATIE_LOG = "dashboard_timings.jsonl"
+INSTRUMENTATIE_LOG_ALTIJD = False # True: elke rerun van elke sessie loggen (anders alleen met de debug toggle "Timings loggen")
+try:
+    import pyinstrument # Optioneel: leesbaardere profielen dan cProfile
+except ImportError:
+    pyinstrument = None
 
-# === HEADER ===
-st.title("📊 Interfilling Dashboard") # Algemenere titel?
-st.caption("Dashboard door www.proces360.com | rob@proces360.com")
-st.markdown("---")
+_rerun = threading.local()
+_log_lock = threading.Lock()
+
+def start_rerun():
+    """Begint een nieuwe meting voor deze rerun."""
+    _rerun.stappen = []; _rerun.diepte = 0; _rerun.info = {}; _rerun.start = time.perf_counter()
+
+def rerun_info(**info):
+    """Context van de rerun (selectie in de sidebar) voor de log regel."""
+    if getattr(_rerun, "stappen", None) is not None: _rerun.info.update(info)
+
+@contextmanager
+def stap(naam: str, **info):
+    """Meet de duur van een blok als stap van de huidige rerun. Het blok kan info (bv. rijen) aanvullen via het dict."""
+    stappen = getattr(_rerun, "stappen", None)
+    if stappen is None: yield info; return
+    meting = {"stap": naam, "diepte": _rerun.diepte}; stappen.append(meting) # Bij het begin toevoegen: volgorde = aanroepvolgorde
+    _rerun.diepte += 1; begin = time.perf_counter()
+    try: yield info
+    finally:
+        meting["ms"] = round((time.perf_counter() - begin) * 1000, 2); _rerun.diepte -= 1
+        meting.update({k: v for k, v in info.items() if v is not None})
+
+def getimed(functie):
+    """Decorator: elke aanroep van functie is een stap met de functienaam."""
+    @functools.wraps(functie)
+    def verpakt(*args, **kwargs):
+        with stap(functie.__name__): return functie(*args, **kwargs)
+    return verpakt
+
+def aantal_rijen(waarde):
+    """Aantal rijen van een (eerste) frame in een stap resultaat, anders None."""
+    if isinstance(waarde, (pd.DataFrame, pd.Series)): return len(waarde)
+    if isinstance(waarde, SqlSelectie): return None
+    if isinstance(waarde, tuple) and waarde: return aantal_rijen(waarde[0])
+    if isinstance(waarde, dict):
+        rijen = [r for r in map(aantal_rijen, waarde.values()) if r is not None]; return sum(rijen) if rijen else None
+    return None
+
+def toon_grafiek(fig, naam: str):
+    """st.plotly_chart als stap: de tijd is vooral de serialisatie van de figuur naar JSON."""
+    punten = sum(next((len(v) for v in (getattr(t, k, None) for k in ("x", "values", "y")) if v is not None), 0) for t in fig.data)
+    with stap(f"plotly_chart: {naam}", punten=punten):
+        st.plotly_chart(fig, use_container_width=True)
+
+def rond_rerun_af(loggen: bool) -> tuple:
+    """Sluit de meting van deze rerun af: (stappen, totaal_ms). Schrijft optioneel een JSON regel naar INSTRUMENTATIE_LOG."""
+    stappen = getattr(_rerun, "stappen", None) or []; totaal_ms = round((time.perf_counter() - _rerun.start) * 1000, 2)
+    if loggen or INSTRUMENTATIE_LOG_ALTIJD:
+        regel = {"tijd": datetime.datetime.now().isoformat(timespec="seconds"), "totaal_ms": totaal_ms, **_rerun.info, "stappen": stappen}
+        try:
+            with _log_lock, open(INSTRUMENTATIE_LOG, "a", encoding="utf-8") as f: f.write(json.dumps(regel, default=str) + "\n")
+        except OSError as e: st.sidebar.warning(f"Kon timings niet loggen naar {INSTRUMENTATIE_LOG}: {e}")
+    _rerun.stappen = None
+    return stappen, totaal_ms
+
+def start_profiel():
+    """Start een profiler voor deze rerun (pyinstrument als die geïnstalleerd is, anders cProfile)."""
+    profiler = pyinstrument.Profiler() if pyinstrument is not None else cProfile.Profile()
+    if pyinstrument is not None: profiler.start()
+    else: profiler.enable()
+    return profiler
+
+def stop_profiel(profiler) -> str:
+    """Stopt de profiler en geeft het profiel als tekst (cProfile: top 40 op cumulatieve tijd)."""
+    if pyinstrument is not None and isinstance(profiler, pyinstrument.Profiler):
+        profiler.stop(); return profiler.output_text(unicode=True, color=False)
+    profiler.disable(); uitvoer = io.StringIO()
+    pstats.Stats(profiler, stream=uitvoer).sort_stats("cumulative").print_stats(40)
+    return uitvoer.getvalue()
+
+def toon_timings(stappen: list, totaal_ms: float):
+    """Timings van deze rerun (en het laatste profiel) in de debug sectie van de sidebar."""
+    with st.sidebar.expander("⏱️ Timings (deze rerun)", expanded=True):
+        st.caption(f"Totaal {totaal_ms:.0f} ms, {len(stappen)} stappen")
+        if stappen:
+            df_stappen = pd.DataFrame(stappen).reindex(columns=["stap", "diepte", "ms", "rijen", "cache", "punten"])
+            df_stappen["stap"] = ["  " * d + ("↳ " if d else "") + s for d, s in zip(df_stappen["diepte"], df_stappen["stap"])]
+            df_stappen[["rijen", "punten"]] = df_stappen[["rijen", "punten"]].astype("Int64")
+            st.dataframe(df_stappen.drop(columns="diepte").dropna(axis=1, how="all"), hide_index=True, use_container_width=True,
+                         column_config={"ms": st.column_config.NumberColumn(format="%.1f")})
+    profiel = st.session_state.get("debug_profiel")
+    if profiel:
+        with st.sidebar.expander("🔬 Profiel", expanded=False):
+            st.download_button("Download profiel", profiel, file_name="dashboard_profiel.txt", key="debug_profiel_download")
+            st.code(profiel, language=None)
+
+# === DATA CACHE (Downtime) ===
+# Kolomgewijze cache naast de CSV (Arrow IPC), zodat een warme start een memory-mapped read is i.p.v. een volledige parse.
+# pyarrow is optioneel: zonder pyarrow wordt de CSV gewoon elke keer geparsed.
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+CACHE_SCHEMA_VERSIE = 6 # Ophogen bij elke wijziging in de voorbewerking, zodat oude caches vervallen
+CACHE_META_KEY = b"oee_cache"
+
+def cache_pad(path: str) -> str:
+    """Pad van de Arrow cache naast het bronbestand."""
+    return os.path.splitext(path)[0] + ".cache.arrow"
+
+def bestand_hash(path: str) -> str:
+    """SHA-256 van de inhoud van een bestand (in blokken gelezen)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blok in iter(lambda: f.read(1 << 20), b""): h.update(blok)
+    return h.hexdigest()
+
+def bron_fingerprint(path: str, met_hash: bool = True) -> dict:
+    """Grootte, mtime en (optioneel) inhoudshash van een bronbestand."""
+    stat = os.stat(path)
+    fp = {"grootte": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if met_hash: fp["sha256"] = bestand_hash(path)
+    return fp
+
+def bron_ongewijzigd(path: str, fp_oud: dict) -> bool:
+    """Vergelijkt een bron met een eerder fingerprint: grootte, dan mtime, pas bij twijfel de inhoudshash."""
+    if not fp_oud: return False
+    fp_nu = bron_fingerprint(path, met_hash=False)
+    if fp_nu["grootte"] != fp_oud.get("grootte"): return False
+    if fp_nu["mtime_ns"] == fp_oud.get("mtime_ns"): return True
+    return bestand_hash(path) == fp_oud.get("sha256") # Zelfde grootte, andere mtime (bv. gekopieerd): inhoud beslist
+
+def lees_cache_meta(cache_path: str) -> dict:
+    """Leest alleen de metadata uit het schema van de cache (geen data)."""
+    if pa is None or not os.path.exists(cache_path): return {}
+    try:
+        with pa.memory_map(cache_path, "r") as bron:
+            metadata = pa.ipc.open_file(bron).schema.metadata or {}
+        meta = json.loads(metadata.get(CACHE_META_KEY, b"{}"))
+    except (OSError, ValueError, pa.ArrowInvalid): return {}
+    return meta if meta.get("versie") == CACHE_SCHEMA_VERSIE else {}
+
+def lees_cache(cache_path: str, columns: list = None) -> pd.DataFrame:
+    """Leest de cache memory-mapped in (optioneel alleen de gevraagde kolommen)."""
+    with pa.memory_map(cache_path, "r") as bron:
+        tabel = pa.ipc.open_file(bron).read_all()
+    if columns is not None: tabel = tabel.select([c for c in columns if c in tabel.column_names])
+    return tabel.to_pandas()
+
+def schrijf_cache(df: pd.DataFrame, cache_path: str, meta: dict):
+    """Schrijft het voorbewerkte frame plus metadata atomair weg als Arrow IPC bestand."""
+    if pa is None: return
+    meta = dict(meta, versie=CACHE_SCHEMA_VERSIE)
+    tabel = pa.Table.from_pandas(df, preserve_index=False)
+    tabel = tabel.replace_schema_metadata({**(tabel.schema.metadata or {}), CACHE_META_KEY: json.dumps(meta).encode("utf-8")})
+    tmp_path = cache_path + ".tmp"
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, tabel.schema) as writer: writer.write_table(tabel)
+        os.replace(tmp_path, cache_path)
+    except OSError: # Bv. read-only map: dan maar zonder cache
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+
+# === OVERLAP SAMENVOEGEN (Downtime) ===
+# Motivate logt soms overlappende of geneste stops op dezelfde workflow; opgeteld kan Duur_min dan meer zijn dan de
+# kloktijd. Per workflow wordt de vereniging van de intervallen bepaald (sorteren + sweep, O(n log n)) en elk stuk
+# tijd toegekend aan één stop volgens OVERLAP_REDEN_PRIORITEIT.
+WORKFLOW_TIJD_OFFSET = 10 ** 10 # Seconden tussen workflows in de gecombineerde tijdas (ruim meer dan de tijdsperiode)
+
+def reden_rang(reden: pd.Series) -> np.ndarray:
+    """Prioriteit per rij (lager wint): index van het eerste keyword uit OVERLAP_REDEN_PRIORITEIT, anders achteraan."""
+    categorieen = reden.astype("category").cat
+    rang_categorie = np.full(len(categorieen.categories), len(OVERLAP_REDEN_PRIORITEIT), dtype=np.int64)
+    for rang, keyword in reversed(list(enumerate(OVERLAP_REDEN_PRIORITEIT))):
+        rang_categorie[np.asarray(categorieen.categories.str.contains(keyword, case=False, regex=False), dtype=bool)] = rang
+    codes = categorieen.codes.to_numpy()
+    return np.where(codes >= 0, rang_categorie[codes], len(OVERLAP_REDEN_PRIORITEIT))
+
+def sweep_cluster(start: np.ndarray, stop: np.ndarray, rang: np.ndarray) -> list:
+    """Sweep over één groep overlappende stops (op start gesorteerd). Geeft [positie, van, tot] stukken terug."""
+    grenzen = np.unique(np.concatenate([start, stop])); actief = []; j = 0; stukken = []
+    for k in range(len(grenzen) - 1):
+        t = grenzen[k]
+        while j < len(start) and start[j] <= t: heapq.heappush(actief, (rang[j], start[j], j)); j += 1
+        while actief and stop[actief[0][2]] <= t: heapq.heappop(actief) # Lazy verwijderen: alleen als de winnaar al gestopt is
+        if not actief: continue
+        winnaar = actief[0][2]
+        if stukken and stukken[-1][0] == winnaar and stukken[-1][2] == t: stukken[-1][2] = grenzen[k + 1]
+        else: stukken.append([winnaar, t, grenzen[k + 1]])
+    return stukken
+
+def overlap_stukken(df: pd.DataFrame) -> tuple:
+    """Niet-overlappende stukken (rij, van, tot) in epoch seconden; rij is de positie van de stop in df.
+
+    Stops zonder overlap gaan gevectoriseerd door; alleen groepen die echt overlappen gaan door sweep_cluster.
+    Een stop die volledig wegvalt achter een stop met hogere prioriteit houdt een stuk van 0 seconden.
+    """
+    start_s = df["Starttijd_dt"].to_numpy().astype("datetime64[s]").astype(np.int64)
+    stop_s = np.maximum(df["Stoptijd_dt"].to_numpy().astype("datetime64[s]").astype(np.int64), start_s)
+    workflow = df["Workflow"].cat.codes.to_numpy().astype(np.int64)
+    volgorde = np.lexsort((start_s, workflow))
+    start_as = start_s[volgorde] + workflow[volgorde] * WORKFLOW_TIJD_OFFSET; stop_as = stop_s[volgorde] + workflow[volgorde] * WORKFLOW_TIJD_OFFSET
+    nieuw_cluster = np.r_[True, start_as[1:] >= np.maximum.accumulate(stop_as)[:-1]]
+    cluster = np.cumsum(nieuw_cluster) - 1
+    enkel = np.bincount(cluster)[cluster] == 1
+    rij = [volgorde[enkel]]; van = [start_s[volgorde[enkel]]]; tot = [stop_s[volgorde[enkel]]]
+    if not enkel.all():
+        rang = reden_rang(df["Reden"])[volgorde]; stukken = []
+        grenzen = np.flatnonzero(np.r_[nieuw_cluster, True])
+        for lo, hi in zip(grenzen[:-1], grenzen[1:]):
+            if hi - lo == 1: continue
+            stukken += [[volgorde[lo + p], a, b] for p, a, b in sweep_cluster(start_s[volgorde[lo:hi]], stop_s[volgorde[lo:hi]], rang[lo:hi])]
+        if stukken:
+            stukken = np.array(stukken, dtype=np.int64); rij.append(stukken[:, 0]); van.append(stukken[:, 1]); tot.append(stukken[:, 2])
+        zonder_stuk = np.flatnonzero(np.bincount(np.concatenate(rij), minlength=len(df)) == 0)
+        rij.append(zonder_stuk); van.append(start_s[zonder_stuk]); tot.append(start_s[zonder_stuk])
+    return np.concatenate(rij), np.concatenate(van), np.concatenate(tot)
+
+# === SHIFTKALENDER (Downtime) ===
+# Stilstanden worden per kalenderdag gesplitst en met de shifts uit SHIFT_KALENDER doorsneden, zodat alleen de
+# minuten binnen de shift meetellen (ook voor stops die over 16:00 of over meerdere dagen lopen). Alles gevectoriseerd.
+DAG_S = 24 * 3600
+
+def shift_vensters() -> tuple:
+    """Zet SHIFT_KALENDER om naar (vensters [W, 2] in seconden na middernacht, actief [7, W] per weekdag)."""
+    per_weekdag = []
+    for weekdag, shifts in SHIFT_KALENDER.items():
+        for begin, eind in shifts:
+            b = begin.hour * 3600 + begin.minute * 60 + begin.second; e = eind.hour * 3600 + eind.minute * 60 + eind.second
+            if e > b: per_weekdag.append((weekdag, b, e))
+            else: per_weekdag += [(weekdag, b, DAG_S), ((weekdag + 1) % 7, 0, e)] # Nachtshift: deel na middernacht hoort bij de volgende dag
+    vensters = sorted({(b, e) for _, b, e in per_weekdag if e > b})
+    actief = np.zeros((7, len(vensters)), dtype=bool)
+    for weekdag, b, e in per_weekdag:
+        if e > b: actief[weekdag, vensters.index((b, e))] = True
+    return np.array(vensters, dtype=np.int64).reshape(-1, 2), actief
+
+def splits_per_dag(start_s: np.ndarray, stop_s: np.ndarray) -> tuple:
+    """Splitst intervallen (epoch seconden) op middernacht. Geeft (rij, dag, van, tot) per deel terug."""
+    dag_start = start_s // DAG_S
+    dag_stop = np.maximum(stop_s - 1, start_s) // DAG_S # Stop om precies 00:00 hoort nog bij de vorige dag
+    aantal = (dag_stop - dag_start + 1).astype(np.int64)
+    rij = np.repeat(np.arange(len(start_s)), aantal)
+    dag = dag_start[rij] + (np.arange(len(rij)) - np.repeat(np.cumsum(aantal) - aantal, aantal))
+    return rij, dag, np.maximum(start_s[rij], dag * DAG_S), np.minimum(stop_s[rij], (dag + 1) * DAG_S)
+
+def shift_overlap(dag: np.ndarray, van: np.ndarray, tot: np.ndarray) -> tuple:
+    """Seconden binnen de shiftkalender per deel, en of het begin van het deel binnen een shift valt."""
+    vensters, actief = shift_vensters()
+    weekdag = (dag + 3) % 7 # 1970-01-01 was een donderdag
+    werkdag = ~np.isin(dag, np.array([np.datetime64(f, "D").astype(np.int64) for f in FEESTDAGEN], dtype=np.int64))
+    overlap = np.zeros(len(dag), dtype=np.int64); begin_in_shift = np.zeros(len(dag), dtype=bool)
+    for w, (b, e) in enumerate(vensters):
+        geldig = actief[weekdag, w] & werkdag
+        overlap += np.where(geldig, np.clip(np.minimum(tot, dag * DAG_S + e) - np.maximum(van, dag * DAG_S + b), 0, None), 0)
+        begin_in_shift |= geldig & (van >= dag * DAG_S + b) & (van < dag * DAG_S + e)
+    return overlap, begin_in_shift
+
+def shift_segmenten(rij: np.ndarray, start_s: np.ndarray, stop_s: np.ndarray) -> pd.DataFrame:
+    """Eén rij per (stuk, kalenderdag) met de duur van dat deel en de minuten binnen de shift.
+
+    Rij is de positie van de stop in het events frame. In_shift: het deel heeft shiftminuten, of is een stuk van
+    0 minuten dat binnen een shift begint.
+    """
+    deel_rij, dag, van, tot = splits_per_dag(start_s, stop_s)
+    overlap, begin_in_shift = shift_overlap(dag, van, tot)
+    duur = tot - van
+    return pd.DataFrame({"Rij": rij[deel_rij], "Dag": dag.astype("datetime64[D]").astype("datetime64[ns]"), "Duur_min": duur / 60.0,
+                         "Shift_min": overlap / 60.0, "In_shift": (overlap > 0) | ((duur == 0) & begin_in_shift)})
+
+def bouw_segmenten(df: pd.DataFrame) -> pd.DataFrame:
+    """Laad-pipeline: overlap samenvoegen per workflow, dan per dag splitsen en met de shiftkalender doorsnijden."""
+    return shift_segmenten(*overlap_stukken(df))
 
 # === DATA LAAD FUNCTIE (Downtime) ===
-@st.cache_data
-def load_data(path: str) -> pd.DataFrame:
-    """Laadt en voorbewerkt de downtime data."""
-    if not os.path.exists(path): st.error(f"❌ Downtime bestand niet gevonden: {path}"); st.stop(); return pd.DataFrame()
+DOWNTIME_KOLOMMEN = ["jobId", "Ordernummer", "Workflow", "Verklaard_door", "Reden", "Opmerking", "Starttijd", "Stoptijd", "Duur_txt", "excludedFromProductivity", "subType", "Opties"]
+
+def lees_downtime_csv(path: str) -> pd.DataFrame:
+    """Leest een Motivate downtime export in en zet de kolomnamen goed."""
+    df = pd.read_csv(path, sep=",", quotechar='"', skipinitialspace=True, encoding="utf-8")
+    if 'Unnamed: 0' in df.columns: df = df.drop('Unnamed: 0', axis=1)
+    if len(df.columns) != len(DOWNTIME_KOLOMMEN): raise ValueError(f"Onverwacht aantal kolommen ({len(df.columns)}) in {path}.")
+    df.columns = DOWNTIME_KOLOMMEN
+    return df
+
+def voorbewerk_downtime(df: pd.DataFrame) -> tuple:
+    """Voorbewerking van de ruwe downtime rijen. Geeft (df, meldingen) terug."""
+    meldingen = []
+    df["Starttijd_dt"] = pd.to_datetime(df["Starttijd"], format="%d/%m/%y %H:%M:%S", errors="coerce", dayfirst=True)
+    df["Stoptijd_dt"]  = pd.to_datetime(df["Stoptijd"], format="%d/%m/%y %H:%M:%S", errors="coerce", dayfirst=True)
+    start_errors = df["Starttijd_dt"].isna().sum(); stop_errors = df["Stoptijd_dt"].isna().sum()
+    if start_errors > 0 or stop_errors > 0: meldingen.append(f"Let op: {start_errors} Starttijd(en) en {stop_errors} Stoptijd(en) konden niet gelezen worden.")
+    df["Duur_calc"] = (df["Stoptijd_dt"] - df["Starttijd_dt"]); df["Duur_sec"] = df["Duur_calc"].dt.total_seconds()
+    neg_dur_count = (df["Duur_sec"] < 0).sum()
+    if neg_dur_count > 0: meldingen.append(f"Let op: {neg_dur_count} rijen met negatieve duur genegeerd."); df = df[df["Duur_sec"] >= 0]
+    df["Duur_min"] = df["Duur_sec"] / 60.0
+    df["Datum"] = df["Starttijd_dt"].dt.normalize()
+    df["Workflow"] = df["Workflow"].astype(str).str.upper().str.replace(" ", "")
+    df['Reden'] = df['Reden'].fillna('Onbekend').astype(str).str.strip()
+    df = df.dropna(subset=["Starttijd_dt", "Datum", "Duur_min", "Reden"])
+    return df, meldingen
+
+# Compact schema: herhalende tekst als category, vlag als bool, duur als float32. Afgeleide kolommen
+# (tekst tijden, Duur_txt/Duur_calc/Duur_sec, lege Opties) gaan niet mee naar de cache.
+CATEGORIE_KOLOMMEN = ["Workflow", "Reden", "Ordernummer", "Verklaard_door", "subType", "Bron"]
+CACHE_KOLOMMEN = ["Event_hash", "Bron", "jobId", "Ordernummer", "Workflow", "Verklaard_door", "Reden", "Opmerking", "Starttijd_dt", "Stoptijd_dt", "Duur_min", "Datum", "excludedFromProductivity", "subType"]
+LAZY_KOLOMMEN = ["Event_hash", "Bron", "jobId", "Opmerking"] # Blijven in de cache, worden alleen op verzoek ingelezen (zie laad_opmerkingen)
+SESSIE_KOLOMMEN = [c for c in CACHE_KOLOMMEN if c not in LAZY_KOLOMMEN]
+
+def compacteer_downtime(df: pd.DataFrame) -> pd.DataFrame:
+    """Zet het voorbewerkte frame om naar het compacte schema (CACHE_KOLOMMEN)."""
+    df = df[[c for c in CACHE_KOLOMMEN if c in df.columns]].copy()
+    for kolom in CATEGORIE_KOLOMMEN: df[kolom] = df[kolom].astype("category")
+    df["excludedFromProductivity"] = df["excludedFromProductivity"].astype(str).str.lower().eq("true")
+    df["Duur_min"] = df["Duur_min"].astype("float32")
+    return df
+
+def geheugen_bytes(df: pd.DataFrame) -> int:
+    """Werkelijk geheugengebruik van een frame (incl. strings)."""
+    return int(df.memory_usage(deep=True).sum())
+
+def cache_pad_voor(path: str) -> str:
+    """Cache pad voor een bronbestand of voor een map met exports."""
+    return os.path.join(path, "downtime.cache.arrow") if os.path.isdir(path) else cache_pad(path)
+
+def downtime_bronnen(path: str) -> list:
+    """Lijst van exportbestanden: één bestand, of alle CSV's in een map (bv. één export per week)."""
+    if os.path.isdir(path): return sorted(glob.glob(os.path.join(path, "*.csv")))
+    return [path]
+
+def lees_downtime_csvs(paden: list, max_workers: int = None) -> list:
+    """Parset meerdere exports parallel (de C-parser van pandas geeft de GIL grotendeels vrij)."""
+    if len(paden) <= 1: return [lees_downtime_csv(p) for p in paden]
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(paden), os.cpu_count() or 1)) as pool:
+        return list(pool.map(lees_downtime_csv, paden))
+
+def event_sleutels(df: pd.DataFrame) -> pd.Series:
+    """Dedupe-sleutel per stilstand: jobId (één per orderrun, niet per event) plus starttijd; zonder jobId de workflow."""
+    job = df["jobId"].astype("string").fillna(df["Workflow"].astype("string"))
+    return job + "|" + df["Starttijd"].astype("string").fillna("")
+
+def event_hashes(sleutels: pd.Series) -> np.ndarray:
+    """64-bit hash (int64) van de event sleutels; deterministisch tussen processen, botsingen zijn verwaarloosbaar."""
+    return pd.util.hash_array(sleutels.to_numpy(dtype=object), categorize=False).view(np.int64) # Sleutels zijn (bijna) uniek: niet eerst factoriseren
+
+def al_gezien(hashes: np.ndarray, historie: np.ndarray) -> np.ndarray:
+    """Mask: welke hashes al in historie staan.
+
+    Hashtabel op de (kleine) nieuwe set en de historie er één keer doorheen: lineair in de historie, zonder die te
+    sorteren of er een hashtabel van te bouwen (np.isin/Series.isin op 1M rijen kosten vele malen meer).
+    """
+    uniek = pd.Index(hashes).unique()
+    treffers = uniek.get_indexer(historie)
+    gevonden = np.zeros(len(uniek), dtype=bool); gevonden[treffers[treffers >= 0]] = True
+    return gevonden[uniek.get_indexer(hashes)]
+
+def voeg_tijdkenmerken_toe(df: pd.DataFrame, segmenten: pd.DataFrame) -> pd.DataFrame:
+    """Kolommen per stop uit de segmenten: netto Duur_min (na overlap), Shift_min en In_shift, plus de weekdag."""
+    duur_min = np.bincount(segmenten["Rij"], weights=segmenten["Duur_min"], minlength=len(df))
+    shift_min = np.bincount(segmenten["Rij"], weights=segmenten["Shift_min"], minlength=len(df))
+    in_shift = np.bincount(segmenten["Rij"], weights=segmenten["In_shift"], minlength=len(df)) > 0
+    return df.assign(Duur_min=duur_min.astype("float32"), Weekdag=df["Starttijd_dt"].dt.weekday.astype("int8"), Shift_min=shift_min.astype("float32"), In_shift=in_shift)
+
+def sessie_frame(df: pd.DataFrame, meta: dict, pad_cache: str) -> pd.DataFrame:
+    """Beperkt het frame tot SESSIE_KOLOMMEN en legt geheugengebruik en cache pad vast in df.attrs.
+
+    De index blijft het rijnummer in de cache, zodat laad_opmerkingen de juiste rijen kan ophalen (zolang de versie klopt).
+    """
+    df = df[[c for c in SESSIE_KOLOMMEN if c in df.columns]]
+    df.attrs["cache_pad"] = pad_cache if os.path.exists(pad_cache) else None
+    df.attrs["geheugen"] = {"origineel_bytes": meta.get("origineel_bytes", 0), "compact_bytes": geheugen_bytes(df)}
+    df.attrs["versie"] = dataset_versie(meta) # Sleutel voor de view cache
+    return df
+
+def dataset_versie(meta: dict) -> str:
+    """Korte hash van de bron fingerprints in de cache meta: verandert zodra er data bijkomt."""
+    return hashlib.sha1(json.dumps(meta.get("bronnen", {}), sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+def laad_opmerkingen(df: pd.DataFrame) -> pd.Series:
+    """Haalt de Opmerking vrije tekst op voor de rijen in df (uit de cache, alleen die kolom).
+
+    De index is een rijnummer in de cache van df.attrs["versie"]. Is de cache intussen herschreven (nieuwe exports via
+    rapport.py, live tail of een andere worker), dan kloppen de rijnummers niet meer: liever lege opmerkingen dan verkeerde.
+    """
+    pad = df.attrs.get("cache_pad")
+    if pa is None or not pad or not os.path.exists(pad): return pd.Series(None, index=df.index, dtype="string")
+    if df.attrs.get("versie") != dataset_versie(lees_cache_meta(pad)): return pd.Series(None, index=df.index, dtype="string")
+    with pa.memory_map(pad, "r") as bron:
+        kolom = pa.ipc.open_file(bron).read_all().column("Opmerking").take(pa.array(df.index.to_numpy()))
+    return pd.Series(kolom.to_pandas().to_numpy(), index=df.index) # Op positie: df.index zijn rijnummers, geen labels van kolom
+
+def laad_downtime(path: str) -> tuple:
+    """Laadt de voorbewerkte downtime data incrementeel. Geeft (df, meldingen) terug.
+
+    Alleen nieuwe of gewijzigde exports worden geparsed. Elke rij in de cache onthoudt zijn export (Bron): van een
+    gewijzigde export vervangt de nieuwe parse al zijn oude rijen, dus correcties (ingevulde reden, gecorrigeerde
+    tijden) komen door. Tussen exports wint de eerste: alleen rijen met een event sleutel (jobId + starttijd) die
+    geen andere export al heeft, gaan de cache in. Rijen van een export die uit de map verdwijnt blijven bewaard
+    (cache verwijderen = volledig opnieuw opbouwen).
+    """
+    pad_cache = cache_pad_voor(path)
+    meta = lees_cache_meta(pad_cache); bekend = meta.get("bronnen", {})
+    nieuw = [b for b in downtime_bronnen(path) if not bron_ongewijzigd(b, bekend.get(b))]
+    df_oud = None
+    if meta:
+        # Alleen als er rijen bijkomen is de volledige cache (incl. LAZY_KOLOMMEN) nodig om te herschrijven
+        try: df_oud = lees_cache(pad_cache, columns=None if nieuw else SESSIE_KOLOMMEN)
+        except (OSError, pa.ArrowException): meta, bekend, nieuw = {}, {}, downtime_bronnen(path) # Beschadigde cache: opnieuw opbouwen
+    if df_oud is not None and not nieuw: return sessie_frame(df_oud, meta, pad_cache), [m for info in bekend.values() for m in info.get("meldingen", [])]
+
+    fingerprints = {b: bron_fingerprint(b) for b in nieuw} # Vóór het inlezen, zodat een tussentijdse wijziging de cache ongeldig maakt
+    if df_oud is not None: df_oud = df_oud[~df_oud["Bron"].isin(nieuw).to_numpy()] # Gewijzigde exports: oude rijen eruit, de nieuwe parse erin
+    gezien = df_oud["Event_hash"].to_numpy() if df_oud is not None else np.empty(0, dtype=np.int64)
+    delen = [] if df_oud is None else [df_oud]
+    for bron, df_ruw in zip(nieuw, lees_downtime_csvs(nieuw)):
+        hashes = event_hashes(event_sleutels(df_ruw))
+        mask_nieuw = ~al_gezien(hashes, gezien) & ~pd.Series(hashes).duplicated().to_numpy()
+        df_ruw = df_ruw[mask_nieuw].assign(Event_hash=hashes[mask_nieuw], Bron=bron)
+        gezien = np.concatenate([gezien, hashes[mask_nieuw]])
+        df_nieuw, meldingen = voorbewerk_downtime(df_ruw)
+        origineel_bytes = geheugen_bytes(df_nieuw.drop(columns=["Event_hash", "Bron"])) # Zoals load_data het frame vroeger in het geheugen hield
+        df_nieuw = compacteer_downtime(df_nieuw)
+        if len(nieuw) > 1: meldingen = [f"{os.path.basename(bron)}: {m}" for m in meldingen]
+        bekend[bron] = dict(fingerprints[bron], meldingen=meldingen, origineel_bytes=origineel_bytes)
+        delen.append(df_nieuw)
+    if not delen: return pd.DataFrame(), []
+    df = pd.concat(delen, ignore_index=True) if len(delen) > 1 else delen[0].reset_index(drop=True)
+    for kolom in CATEGORIE_KOLOMMEN: df[kolom] = df[kolom].astype("category") # concat van verschillende categorieën geeft object
+    df = df.sort_values(["Workflow", "Starttijd_dt"], kind="stable", ignore_index=True) # Zie filter_data: per workflow op tijd gesorteerd
+    meta = {"bronnen": bekend, "origineel_bytes": sum(info.get("origineel_bytes", 0) for info in bekend.values())}
+    schrijf_cache(df, pad_cache, meta)
+    return sessie_frame(df.drop(columns=LAZY_KOLOMMEN), meta, pad_cache), [m for info in bekend.values() for m in info.get("meldingen", [])]
+
+def laad_dataset(path: str) -> tuple:
+    """Volledige laad-pipeline: cache/ingest, overlap samenvoegen, dag/shift splitsen, rollup kubus.
+
+    Geeft ({"events": df, "kubus": kubus}, meldingen) terug. De segmenten zijn alleen tussenresultaat.
+    """
+    df, meldingen = laad_downtime(path)
+    segmenten = bouw_segmenten(df)
+    df = voeg_tijdkenmerken_toe(df, segmenten)
+    return {"events": df, "kubus": bouw_kubus(df, segmenten)}, meldingen
+
+@st.cache_resource # Eén gedeelde (alleen-lezen) dataset voor alle sessies i.p.v. een kopie per rerun
+def load_dataset(path: str) -> dict:
+    """Laadt en voorbewerkt de downtime data (events + rollup kubus)."""
+    leeg = {"events": pd.DataFrame(), "kubus": pd.DataFrame()}
+    if not os.path.exists(path): st.error(f"❌ Downtime bestand niet gevonden: {path}"); st.stop(); return leeg
+    if os.path.isdir(path) and not downtime_bronnen(path): st.error(f"❌ Geen CSV exports gevonden in map: {path}"); st.stop(); return leeg
     try:
-        df = pd.read_csv(path, sep=",", quotechar='"', skipinitialspace=True, encoding="utf-8")
-        if 'Unnamed: 0' in df.columns: df = df.drop('Unnamed: 0', axis=1)
-        expected_cols_len = 12
-        if len(df.columns) == expected_cols_len:
-            df.columns = ["jobId", "Ordernummer", "Workflow", "Verklaard_door", "Reden", "Opmerking", "Starttijd", "Stoptijd", "Duur_txt", "excludedFromProductivity", "subType", "Opties"]
-        else: st.error(f"Onverwacht aantal kolommen ({len(df.columns)}) in {path}."); st.stop(); return pd.DataFrame()
-        df["Starttijd_dt"] = pd.to_datetime(df["Starttijd"], format="%d/%m/%y %H:%M:%S", errors="coerce", dayfirst=True)
-        df["Stoptijd_dt"]  = pd.to_datetime(df["Stoptijd"], format="%d/%m/%y %H:%M:%S", errors="coerce", dayfirst=True)
-        start_errors = df["Starttijd_dt"].isna().sum(); stop_errors = df["Stoptijd_dt"].isna().sum()
-        if start_errors > 0 or stop_errors > 0: st.warning(f"Let op: {start_errors} Starttijd(en) en {stop_errors} Stoptijd(en) konden niet gelezen worden.")
-        df["Duur_calc"] = (df["Stoptijd_dt"] - df["Starttijd_dt"]); df["Duur_sec"] = df["Duur_calc"].dt.total_seconds()
-        neg_dur_count = (df["Duur_sec"] < 0).sum()
-        if neg_dur_count > 0: st.warning(f"Let op: {neg_dur_count} rijen met negatieve duur genegeerd."); df = df[df["Duur_sec"] >= 0]
-        df["Duur_min"] = df["Duur_sec"] / 60.0
-        df["Datum"] = df["Starttijd_dt"].dt.date
-        df["Workflow"] = df["Workflow"].astype(str).str.upper().str.replace(" ", "")
-        df['Reden'] = df['Reden'].fillna('Onbekend').astype(str).str.strip()
-        df.dropna(subset=["Starttijd_dt", "Datum", "Duur_min", "Reden"], inplace=True)
-        return df
-    except Exception as e: st.error(f"Fout bij laden downtime data: {path}."); st.exception(e); st.stop(); return pd.DataFrame()
+        dataset, meldingen = laad_dataset(path)
+        for melding in meldingen: st.warning(melding)
+        return dataset
+    except ValueError as ve: st.error(str(ve)); st.stop(); return leeg
+    except Exception as e: st.error(f"Fout bij laden downtime data: {path}."); st.exception(e); st.stop(); return leeg
+
+def load_data(path: str) -> pd.DataFrame:
+    """De downtime events (één rij per stop) uit de gedeelde dataset."""
+    return load_dataset(path)["events"]
 
 # === NIEUW: DATA LAAD FUNCTIE (Order Performance) ===
+# ERP exports kunnen GB's groot zijn: alleen ORDER_KOLOMMEN inlezen (C-parser, vaste dtypes), in chunks van ORDER_CHUNK_RIJEN
+# die elk direct gevalideerd en versmald worden. Het datumformaat wordt één keer bepaald op de eerste datums.
+ORDER_KOLOMMEN = {'Date': str, 'Work Center': str, 'WO #': str, 'Item': str, 'Build Qty': str} # Date/Build Qty als tekst: per chunk geconverteerd
+ORDER_CHUNK_RIJEN = 250_000
+ORDER_DATUM_FORMATEN = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%m-%Y", "%d-%m-%Y %H:%M", "%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S",
+                        "%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M:%S %p", "%d/%m/%y", "%d-%m-%y"] # Na het door pandas geraden formaat
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError: # pandas < 2.2
+    guess_datetime_format = None
+
+def detecteer_datum_formaat(datums: pd.Series) -> str:
+    """Eerste formaat dat alle gevulde waarden in de steekproef leest (pandas' gok eerst, dan ORDER_DATUM_FORMATEN), anders None."""
+    steekproef = datums.dropna().head(1000)
+    if steekproef.empty: return None
+    kandidaten = list(ORDER_DATUM_FORMATEN)
+    if guess_datetime_format:
+        with warnings.catch_warnings(): # Gok zoals pd.to_datetime zonder format (maand eerst bij twijfel), zonder de dayfirst waarschuwing
+            warnings.simplefilter("ignore", UserWarning); kandidaten.insert(0, guess_datetime_format(steekproef.iloc[0]))
+    for formaat in dict.fromkeys(k for k in kandidaten if k):
+        if pd.to_datetime(steekproef, format=formaat, errors="coerce").notna().all(): return formaat
+    return None
+
+def lees_order_csv(path: str, chunk_rijen: int = ORDER_CHUNK_RIJEN) -> tuple:
+    """Leest de order export in chunks naar Date, Line, WO #, Item, Quantity. Geeft (df, meldingen) terug.
+
+    Per chunk: datum (vast formaat), aantal (numeriek) en rijen zonder Line/Quantity eruit. Ontbrekende kolommen: ValueError.
+    """
+    kolommen = pd.read_csv(path, nrows=0, skipinitialspace=True, encoding="utf-8-sig").columns
+    missing_cols = [col for col in ORDER_KOLOMMEN if col not in kolommen]
+    if missing_cols: raise ValueError(f"De volgende vereiste kolommen missen in {path}: {', '.join(missing_cols)}")
+    delen, formaat = [], None
+    tellers = {"rijen": 0, "datum": 0, "aantal": 0, "leeg": 0}
+    chunks = pd.read_csv(path, sep=',', engine='c', skipinitialspace=True, encoding="utf-8-sig", usecols=list(ORDER_KOLOMMEN), dtype=ORDER_KOLOMMEN, chunksize=chunk_rijen)
+    for chunk in chunks:
+        if formaat is None: formaat = detecteer_datum_formaat(chunk['Date']) # Eén keer: de eerste chunk met datums
+        datum = pd.to_datetime(chunk['Date'], format=formaat, errors="coerce") if formaat else pd.Series(pd.NaT, index=chunk.index)
+        aantal = pd.to_numeric(chunk['Build Qty'], errors="coerce").astype("float64")
+        tellers["rijen"] += len(chunk)
+        tellers["datum"] += int((datum.isna() & chunk['Date'].notna()).sum()); tellers["aantal"] += int((aantal.isna() & chunk['Build Qty'].notna()).sum())
+        geldig = (aantal.notna() & chunk['Work Center'].notna()).to_numpy()
+        tellers["leeg"] += int((~geldig).sum())
+        delen.append(pd.DataFrame({'Date': datum, 'Line': chunk['Work Center'], 'WO #': chunk['WO #'], 'Item': chunk['Item'], 'Quantity': aantal})[geldig])
+    df = pd.concat(delen, ignore_index=True) if delen else pd.DataFrame(columns=['Date', 'Line', 'WO #', 'Item', 'Quantity'])
+    df['Line'] = df['Line'].astype(str)
+    if len(df) and (df['Quantity'] % 1 == 0).all(): df['Quantity'] = df['Quantity'].astype("int64") # Hele aantallen, zoals de export
+    meldingen = []
+    if tellers["rijen"] and formaat is None: meldingen.append(f"Kon het formaat van de 'Date' kolom niet bepalen in {path}; datums zijn leeg gelaten.")
+    if tellers["datum"]: meldingen.append(f"{tellers['datum']} datum(s) in order data niet leesbaar als {formaat}.")
+    if tellers["aantal"]: meldingen.append(f"{tellers['aantal']} 'Build Qty' waarde(n) in order data niet numeriek.")
+    if tellers["leeg"]: meldingen.append(f"{tellers['leeg']} rijen verwijderd uit order data ivm missende Line/Quantity.")
+    return df, meldingen
+
 @st.cache_data
 def load_order_data(path: str) -> pd.DataFrame:
     """Laadt en voorbewerkt de order performance data."""
@@ -65,56 +572,110 @@ def load_order_data(path: str) -> pd.DataFrame:
         # Geef leeg dataframe terug ipv st.stop() zodat de app niet crasht als alleen dit bestand mist
         return pd.DataFrame()
     try:
-        # --- BELANGRIJK: Deze read_csv is ongetest door de tool ---
-        # Controleer lokaal of het pad, sep=',' en skipinitialspace=True correct zijn.
-        # Mogelijk moet je quotechar='"' of encoding toevoegen.
-        df = pd.read_csv(path, sep=',', engine='python', skipinitialspace=True)
-        st.success(f"Bestand {path} succesvol ingelezen (in theorie).") # Feedback
-
-        # --- Kolom Selectie & Hernoemen (pas aan indien nodig) ---
-        # Kolommen die we nodig hebben op basis van screenshot
-        required_cols = ['Date', 'Work Center', 'WO #', 'Item', 'Build Qty']
-        # Check of alle benodigde kolommen bestaan
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            st.error(f"De volgende vereiste kolommen missen in {path}: {', '.join(missing_cols)}")
-            return pd.DataFrame()
-
-        # Selecteer en hernoem
-        df_selected = df[required_cols].copy()
-        df_selected.rename(columns={'Work Center': 'Line', 'Build Qty': 'Quantity'}, inplace=True)
-
-        # --- Data Type Conversie & Cleaning ---
-        df_selected['Quantity'] = pd.to_numeric(df_selected['Quantity'], errors='coerce')
-        # Converteer Datum indien nodig (pas format aan als het niet standaard is)
-        try:
-            df_selected['Date'] = pd.to_datetime(df_selected['Date'], errors='coerce')
-        except Exception as date_err:
-            st.warning(f"Kon 'Date' kolom niet converteren naar datum: {date_err}. Controleer het formaat.")
-
-        # Verwijder rijen waar essentiële data (Line, Quantity) mist
-        rows_before = len(df_selected)
-        df_selected.dropna(subset=['Line', 'Quantity'], inplace=True)
-        rows_after = len(df_selected)
-        if rows_before > rows_after:
-             st.info(f"{rows_before - rows_after} rijen verwijderd uit order data ivm missende Line/Quantity.")
-
-        # Hernoem Line naar string om zeker te zijn
-        df_selected['Line'] = df_selected['Line'].astype(str)
-
-        return df_selected
-
-    except FileNotFoundError:
-         # Extra check, hoewel de check bovenaan dit al zou moeten vangen
-         st.error(f"Kon bestand niet vinden (check pad): {path}")
-         return pd.DataFrame()
+        df, meldingen = lees_order_csv(path)
+        for melding in meldingen: st.warning(melding)
+        st.success(f"Bestand {path} ingelezen ({len(df)} orders).") # Feedback
+        return df
+    except ValueError as ve:
+        st.error(str(ve))
+        return pd.DataFrame()
     except Exception as e:
         st.error(f"Fout bij het laden of verwerken van order data: {path}.")
         st.exception(e) # Toon details van de fout
         return pd.DataFrame()
 
 
+# === ORDER KOPPELING (Orders x Downtime) ===
+# Koppelt stilstand aan orders: eerst op ordernummer, daarna (alleen voor stops zonder ordernummer) op lijn en tijd
+# met merge_asof: een stop hoort bij de laatst gestarte order op dezelfde lijn. Geen cross join, dus O((n + m) log).
+ORDER_LIJN_WORKFLOW = {} # Work Center (order data) -> Workflow (downtime) als de namen verschillen, bv. {"Lijn 1": "VMPT1"}
+ORDER_KOPPEL_TOLERANTIE = pd.Timedelta(days=1) # Max. tijd tussen de start (Date) van een order en een stop op lijn/tijd
+
+def order_sleutel(nummers: pd.Series) -> pd.Series:
+    """Genormaliseerd ordernummer (hoofdletters, zonder 'WO' prefix en voorloopnullen): 'WO024010' en '24010' matchen."""
+    if isinstance(nummers.dtype, pd.CategoricalDtype): # Eén keer per uniek ordernummer (zie uitgesloten_redenen)
+        per_categorie = order_sleutel(pd.Series(nummers.cat.categories)).to_numpy(); codes = nummers.cat.codes.to_numpy()
+        return pd.Series(np.where(codes >= 0, per_categorie[codes], pd.NA), index=nummers.index, dtype="string")
+    sleutels = nummers.astype("string").str.strip().str.upper().str.replace(r"^WO\s*#?\s*", "", regex=True).str.lstrip("0")
+    return sleutels.mask(sleutels == "")
+
+def order_koppel_invoer(df_events: pd.DataFrame, df_orders: pd.DataFrame) -> tuple:
+    """Stilstand per order_sleutel (Downtime_min, Stops) en de stops zonder ordernummer (Workflow, Starttijd_dt, Duur_min).
+
+    Een stop met een ordernummer dat niet in de order data staat telt nergens mee (hoort bij een andere order).
+    """
+    sleutels = order_sleutel(df_events["Ordernummer"])
+    bekend = sleutels.isin(order_sleutel(df_orders["WO #"]).dropna()).to_numpy(dtype=bool)
+    per_order = df_events["Duur_min"][bekend].groupby(sleutels[bekend].to_numpy()).agg(Downtime_min="sum", Stops="size")
+    return per_order, df_events.loc[sleutels.isna().to_numpy(), ["Workflow", "Starttijd_dt", "Duur_min"]]
+
+def order_aandelen(sleutels: pd.Series, aantallen: pd.Series) -> tuple:
+    """Aandeel van elke orderregel in zijn order (naar Quantity, gelijk verdeeld als die 0 is) en het cumulatieve aandeel.
+
+    Een ERP export kan meerdere regels per werkorder hebben (per dag of deelbouw); de stilstand van de order wordt
+    daarover verdeeld i.p.v. bij elke regel volledig meegeteld.
+    """
+    aantallen = pd.Series(aantallen.to_numpy(dtype=float), index=sleutels.index).clip(lower=0).fillna(0)
+    groepen = aantallen.groupby(sleutels.to_numpy(), dropna=True)
+    totaal = groepen.transform("sum"); regels = groepen.transform("size")
+    aandeel = (aantallen / totaal).where(totaal > 0, 1 / regels).fillna(1).to_numpy()
+    return aandeel, pd.Series(aandeel, index=sleutels.index).groupby(sleutels.to_numpy(), dropna=True).cumsum().fillna(1).to_numpy()
+
+def koppel_orders_downtime(df_orders: pd.DataFrame, per_order: pd.DataFrame, events_los: pd.DataFrame) -> pd.DataFrame:
+    """Per order: Target_Time_Min, Downtime_min, Stops, Koppeling en Performance (%) = target / (target + stilstand).
+
+    Heeft een werkorder meerdere regels, dan krijgt elke regel het deel van de stilstand naar zijn Quantity (zie
+    order_aandelen): de som blijft gelijk aan de stilstand van de order en elke regel toont de performance van de order.
+    Stops worden in hele aantallen verdeeld (afgerond op het cumulatieve aandeel, dus de som klopt ook).
+    Orders op dezelfde lijn met dezelfde Date krijgen via lijn/tijd alles bij de laatste; de koppeling is zo precies als Date.
+    """
+    sleutels = order_sleutel(df_orders["WO #"])
+    aandeel, cumulatief = order_aandelen(sleutels, df_orders["Quantity"])
+    stops_order = sleutels.map(per_order["Stops"]).fillna(0).to_numpy(dtype=float)
+    df = df_orders.assign(Target_Time_Min=df_orders["Quantity"] / EFFECTIVE_CAPACITY,
+                          Downtime_min=sleutels.map(per_order["Downtime_min"]).fillna(0).to_numpy(dtype=float) * aandeel,
+                          Stops=(np.round(stops_order * cumulatief) - np.round(stops_order * (cumulatief - aandeel))).astype(int))
+    op_nummer = stops_order > 0
+    op_tijd = np.zeros(len(df), dtype=bool)
+    if not events_los.empty and "Date" in df.columns and df["Date"].notna().any():
+        starts = pd.DataFrame({"Rij": np.arange(len(df)), "Workflow": df["Line"].map(lambda lijn: ORDER_LIJN_WORKFLOW.get(lijn, str(lijn).upper().replace(" ", ""))).to_numpy(), # Zoals voorbewerk_downtime
+                               "Date": df["Date"].to_numpy().astype("datetime64[ns]")}).dropna(subset=["Date"]).sort_values("Date", kind="stable")
+        stops = pd.DataFrame({"Workflow": events_los["Workflow"].astype(str).to_numpy(), "Starttijd_dt": events_los["Starttijd_dt"].to_numpy().astype("datetime64[ns]"),
+                              "Duur_min": events_los["Duur_min"].to_numpy()}).dropna(subset=["Starttijd_dt"]).sort_values("Starttijd_dt", kind="stable")
+        gekoppeld = pd.merge_asof(stops, starts, left_on="Starttijd_dt", right_on="Date", by="Workflow", direction="backward", tolerance=ORDER_KOPPEL_TOLERANTIE).dropna(subset=["Rij"])
+        per_rij = gekoppeld.groupby(gekoppeld["Rij"].astype(int))["Duur_min"].agg(["sum", "size"])
+        rijen = per_rij.index.to_numpy()
+        df["Downtime_min"] = df["Downtime_min"].to_numpy() + np.bincount(rijen, weights=per_rij["sum"], minlength=len(df))
+        df["Stops"] = df["Stops"].to_numpy() + np.bincount(rijen, weights=per_rij["size"], minlength=len(df)).astype(int)
+        op_tijd[rijen] = True
+    df["Koppeling"] = np.select([op_nummer & op_tijd, op_nummer, op_tijd], ["Ordernummer + lijn/tijd", "Ordernummer", "Lijn/tijd"], "Geen")
+    totaal = df["Target_Time_Min"] + df["Downtime_min"]
+    df["Performance (%)"] = (100 * df["Target_Time_Min"] / totaal).where(totaal > 0)
+    return df
+
+def bin_orders(df: pd.DataFrame, x: str, y: str, kleur: str, bins: int = ORDER_SCATTER_BINS) -> pd.DataFrame:
+    """2D histogram van x tegen y per kleur groep op een gedeeld raster: alleen gevulde cellen (middelpunt + Aantal).
+
+    Het resultaat heeft hoogstens bins * bins rijen per groep, hoeveel orders er ook zijn.
+    """
+    df = df[[x, y, kleur]].dropna()
+    if df.empty: return pd.DataFrame(columns=[kleur, x, y, "Aantal"])
+    randen_x = np.histogram_bin_edges(df[x].to_numpy(dtype=float), bins=bins); randen_y = np.histogram_bin_edges(df[y].to_numpy(dtype=float), bins=bins)
+    cel_x = np.clip(np.searchsorted(randen_x, df[x].to_numpy(dtype=float), side="right") - 1, 0, bins - 1)
+    cel_y = np.clip(np.searchsorted(randen_y, df[y].to_numpy(dtype=float), side="right") - 1, 0, bins - 1)
+    cellen = pd.DataFrame({kleur: df[kleur].to_numpy(), "cel_x": cel_x, "cel_y": cel_y}).value_counts().rename("Aantal").reset_index()
+    midden_x = (randen_x[:-1] + randen_x[1:]) / 2; midden_y = (randen_y[:-1] + randen_y[1:]) / 2
+    return pd.DataFrame({kleur: cellen[kleur], x: midden_x[cellen["cel_x"]], y: midden_y[cellen["cel_y"]], "Aantal": cellen["Aantal"]})
+
+def bereken_order_koppeling(df_orders: pd.DataFrame, bron) -> pd.DataFrame:
+    """Orders met hun stilstand (zie koppel_orders_downtime). bron: de downtime events, of de SQL database (dict)."""
+    if isinstance(bron, dict): per_order, events_los = sql_order_koppel_invoer(bron, df_orders)
+    elif bron.empty: per_order, events_los = pd.DataFrame(columns=["Downtime_min", "Stops"]), pd.DataFrame()
+    else: per_order, events_los = order_koppel_invoer(bron, df_orders)
+    return koppel_orders_downtime(df_orders, per_order, events_los)
+
 # === SIDEBAR FUNCTIE ===
+@getimed
 def create_sidebar(df_downtime: pd.DataFrame, df_orders: pd.DataFrame) -> tuple:
     """Creëert de sidebar elementen en retourneert de selecties."""
     # --- Algemene Opties ---
@@ -128,8 +689,8 @@ def create_sidebar(df_downtime: pd.DataFrame, df_orders: pd.DataFrame) -> tuple:
     workflow_options = ["Alle lijnen"] + workflows_in_data
     workflow_select = st.sidebar.selectbox("Kies workflow (machine):", options=workflow_options, key="downtime_workflow_filter")
     # Datum filter (downtime)
-    min_datum_dt = pd.to_datetime(df_downtime["Datum"]).min() if not df_downtime.empty else None
-    max_datum_dt = pd.to_datetime(df_downtime["Datum"]).max() if not df_downtime.empty else None
+    min_datum_dt = df_downtime["Datum"].min() if not df_downtime.empty else None
+    max_datum_dt = df_downtime["Datum"].max() if not df_downtime.empty else None
     if pd.isna(min_datum_dt) or pd.isna(max_datum_dt):
          # st.sidebar.warning("Kan geen geldig datumbereik vinden voor downtime.")
          today = datetime.date.today(); default_start = today - datetime.timedelta(days=30); default_end = today
@@ -153,147 +714,888 @@ def create_sidebar(df_downtime: pd.DataFrame, df_orders: pd.DataFrame) -> tuple:
     else:
          st.sidebar.caption("Geen order data geladen om op lijn te filteren.")
 
+    # --- Geheugengebruik (compact schema) ---
+    geheugen = df_downtime.attrs.get("geheugen")
+    if geheugen and geheugen["origineel_bytes"] > 0:
+        bespaard = 1 - geheugen["compact_bytes"] / geheugen["origineel_bytes"]
+        st.sidebar.caption(f"💾 Downtime data: {geheugen['compact_bytes'] / 1e6:.1f} MB in geheugen (was {geheugen['origineel_bytes'] / 1e6:.1f} MB, {bespaard:.0%} bespaard).")
+
     return (dashboard_choice, workflow_select, date_range, periode_selectie, apply_shift_filter_toggle,
             selected_order_line) # Return order filter
 
 
 # === FILTER DATA FUNCTIE (Downtime) ===
+def workflow_grenzen(df: pd.DataFrame, workflow: str) -> tuple:
+    """Rijbereik (lo, hi) van een workflow in een op Workflow gesorteerd frame (binary search op de category codes)."""
+    categorieen = df["Workflow"].cat.categories
+    if workflow not in categorieen: return 0, 0
+    codes = df["Workflow"].cat.codes.to_numpy(); code = categorieen.get_loc(workflow)
+    return int(np.searchsorted(codes, code, side="left")), int(np.searchsorted(codes, code, side="right"))
+
+def selecteer_bereik(df: pd.DataFrame, tijd_kolom: str, workflow_select: str, date_range: tuple) -> pd.DataFrame:
+    """Selecteert workflow(s) en datumbereik uit een frame gesorteerd op (Workflow, tijd_kolom) met searchsorted."""
+    tijden = df[tijd_kolom].to_numpy()
+    start = np.datetime64(pd.Timestamp(date_range[0])).astype(tijden.dtype) # Zelfde eenheid, anders cast numpy het hele array
+    eind = np.datetime64(pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)).astype(tijden.dtype)
+    workflows = [workflow_select] if workflow_select != "Alle lijnen" else GEWENSTE_WORKFLOWS
+    delen = []
+    for workflow in workflows:
+        lo, hi = workflow_grenzen(df, workflow)
+        van = lo + int(np.searchsorted(tijden[lo:hi], start, side="left")); tot = lo + int(np.searchsorted(tijden[lo:hi], eind, side="left"))
+        if tot > van: delen.append(df.iloc[van:tot])
+    if not delen: return df.iloc[0:0]
+    return delen[0] if len(delen) == 1 else pd.concat(delen)
+
+# Stops over meerdere dagen: de kubus telt per kalenderdag alleen de minuten binnen het bereik, filter_data selecteert
+# stops op starttijd met hun volledige duur. Totalen kunnen daardoor verschillen; de secties zeggen welke ze tonen.
+TOEREKENING_KUBUS = "Per kalenderdag: van stops over meerdere dagen tellen alleen de minuten binnen de periode."
+TOEREKENING_EVENTS = ("Per stop: stops die in de periode starten, met hun volledige duur (stops van vóór de periode tellen niet mee). "
+                      "Totalen kunnen daardoor afwijken van de kerncijfers.")
+
 def filter_data(df: pd.DataFrame, workflow_select: str, date_range: tuple, apply_shift_filter: bool) -> pd.DataFrame:
-    """Filtert de downtime dataframe op basis van selecties."""
-    df_filtered = df.copy()
+    """Filtert de downtime dataframe op basis van selecties (stops op starttijd, zie TOEREKENING_EVENTS).
+
+    Verwacht df gesorteerd op (Workflow, Starttijd_dt), zoals laad_downtime het aanlevert. Per workflow wordt het
+    datumbereik met searchsorted opgezocht, dus O(log n + k) zonder kopie van het hele frame.
+    """
     if not date_range or len(date_range) != 2 or date_range[0] is None or date_range[1] is None:
         st.error("Ongeldig datumbereik geselecteerd."); return pd.DataFrame()
-    start_date = pd.to_datetime(date_range[0]); end_date = pd.to_datetime(date_range[1])
-    df_filtered["Datum"] = pd.to_datetime(df_filtered["Datum"])
-    mask_date = (df_filtered["Datum"] >= start_date) & (df_filtered["Datum"] <= end_date)
-    df_filtered = df_filtered[mask_date]
-    if workflow_select != "Alle lijnen": df_filtered = df_filtered[df_filtered["Workflow"] == workflow_select]
-    else: df_filtered = df_filtered[df_filtered["Workflow"].isin(GEWENSTE_WORKFLOWS)]
-    if apply_shift_filter:
-        mask_shift = ((df_filtered["Starttijd_dt"].dt.weekday < 5) & (df_filtered["Starttijd_dt"].dt.time >= SHIFT_START_TIME) & (df_filtered["Starttijd_dt"].dt.time < SHIFT_END_TIME))
-        df_filtered = df_filtered[mask_shift]
+    df_filtered = selecteer_bereik(df, "Starttijd_dt", workflow_select, date_range)
+    if apply_shift_filter: # Alleen stops met tijd binnen de shift, en dan alleen die minuten (zie shift_segmenten)
+        df_filtered = df_filtered[df_filtered["In_shift"].to_numpy()]
+        df_filtered = df_filtered.assign(Duur_min=df_filtered["Shift_min"])
     return df_filtered
 
+# === ROLLUP KUBUS (Downtime) ===
+# Voor-geaggregeerde stilstand per (Workflow, Dag, Reden, In_shift, Uitgesloten): som van Duur_min, aantal stops en de
+# langste stop (hele Duur_min, en Shift_min voor het shift filter).
+# KPI's, trend per periode, dagelijkse performance en Pareto rekenen hierop i.p.v. op de losse events.
+KUBUS_SLEUTELS = ["Workflow", "Dag", "Reden", "In_shift", "Uitgesloten"]
+
+def uitgesloten_redenen(reden: pd.Series) -> pd.Series:
+    """Bool per rij: reden bevat een van UITGESLOTEN_REDENEN_KEYWORDS. Eén keer per unieke reden bepaald."""
+    categorieen = reden.astype("category").cat
+    mask_categorie = np.zeros(len(categorieen.categories), dtype=bool)
+    for keyword in UITGESLOTEN_REDENEN_KEYWORDS: mask_categorie |= np.asarray(categorieen.categories.str.contains(keyword, case=False, na=False), dtype=bool)
+    codes = categorieen.codes.to_numpy()
+    return pd.Series(np.where(codes >= 0, mask_categorie[codes], False), index=reden.index)
+
+def bouw_kubus(df: pd.DataFrame, seg: pd.DataFrame) -> pd.DataFrame:
+    """Aggregeert de segmenten (bouw_segmenten) naar de rollup kubus, gesorteerd op (Workflow, Dag) zoals selecteer_bereik verwacht.
+
+    Elk dagdeel van een stop levert een deel binnen en een deel buiten de shift. Een stop telt één keer mee in Aantal:
+    bij zijn eerste deel binnen de shift, of (zonder shifttijd) bij zijn eerste deel. Op dat deel staat ook de duur van
+    de hele stop, zodat Duur_max (hele Duur_min) en Shift_max (Shift_min) over stops gaan en niet over dagdelen.
+    """
+    delen = pd.DataFrame({"Rij": np.concatenate([seg["Rij"], seg["Rij"]]), "Dag": np.concatenate([seg["Dag"], seg["Dag"]]),
+                          "In_shift": np.repeat([True, False], len(seg)),
+                          "Duur_min": np.concatenate([seg["Shift_min"], seg["Duur_min"] - seg["Shift_min"]])})
+    delen = delen[np.concatenate([seg["In_shift"], ~seg["In_shift"] | (seg["Duur_min"] > seg["Shift_min"])])]
+    delen = delen.sort_values(["Rij", "Dag", "In_shift"], ascending=[True, True, False], kind="stable", ignore_index=True)
+    rij = delen["Rij"].to_numpy()
+    heeft_shift = np.bincount(seg["Rij"], weights=seg["In_shift"], minlength=len(df)) > 0
+    kandidaat = np.flatnonzero(delen["In_shift"].to_numpy() == heeft_shift[rij]) # Per stop: de delen binnen de shift, of anders alle delen
+    telt = np.zeros(len(delen), dtype=bool); telt[kandidaat[np.r_[True, rij[kandidaat][1:] != rij[kandidaat][:-1]]]] = True
+    stop_duur = np.bincount(seg["Rij"], weights=seg["Duur_min"], minlength=len(df)); stop_shift = np.bincount(seg["Rij"], weights=seg["Shift_min"], minlength=len(df))
+    reden = df["Reden"].iloc[rij].reset_index(drop=True)
+    df_basis = delen.assign(Workflow=df["Workflow"].iloc[rij].reset_index(drop=True), Reden=reden, Uitgesloten=uitgesloten_redenen(reden), Telt=telt,
+                            Stop_duur=np.where(telt, stop_duur[rij], np.nan), Stop_shift=np.where(telt & delen["In_shift"].to_numpy(), stop_shift[rij], np.nan))
+    kubus = df_basis.groupby(KUBUS_SLEUTELS, observed=True).agg(Duur_min=("Duur_min", "sum"), Aantal=("Telt", "sum"), Duur_max=("Stop_duur", "max"),
+                                                                Shift_max=("Stop_shift", "max")).reset_index()
+    return pd.concat([kubus, periode_codes(kubus["Dag"])], axis=1)
+
+def load_kubus(path: str) -> pd.DataFrame:
+    """Rollup kubus van de downtime data in path (eenmalig gebouwd in load_dataset)."""
+    return load_dataset(path)["kubus"]
+
+def filter_kubus(kubus: pd.DataFrame, workflow_select: str, date_range: tuple, apply_shift_filter: bool) -> pd.DataFrame:
+    """Als filter_data, maar op de kubus per kalenderdag (zie TOEREKENING_KUBUS; met het shift filter is de langste stop zijn Shift_min)."""
+    kubus_sel = selecteer_bereik(kubus, "Dag", workflow_select, date_range)
+    if apply_shift_filter:
+        kubus_sel = kubus_sel[kubus_sel["In_shift"].to_numpy()]
+        kubus_sel = kubus_sel.assign(Duur_max=kubus_sel["Shift_max"])
+    return kubus_sel
+
+# === PERIODE CODES ===
+# Integer sleutels per periode, één keer gevectoriseerd berekend (in de kubus). Labels worden pas gemaakt voor
+# de groepen die getoond worden, i.p.v. strftime per rij.
+PERIODE_CODE_KOLOM = {"Dag": "Dag_code", "Week": "Week_code", "Maand": "Maand_code"}
+
+def periode_codes(tijden: pd.Series) -> pd.DataFrame:
+    """Dag_code (dagen sinds 1970-01-01), Week_code (ISO jaar * 100 + ISO week) en Maand_code (jaar * 100 + maand)."""
+    dagen = tijden.to_numpy().astype("datetime64[D]")
+    dag_code = dagen.astype(np.int64)
+    donderdag = dag_code - (dag_code + 3) % 7 + 3 # Donderdag van dezelfde ISO week bepaalt het ISO jaar (1970-01-01 was een donderdag)
+    iso_jaar = donderdag.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+    iso_week = (donderdag - iso_jaar.astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)) // 7 + 1
+    maanden = dagen.astype("datetime64[M]").astype(np.int64)
+    return pd.DataFrame({"Dag_code": dag_code.astype(np.int32), "Week_code": ((iso_jaar + 1970) * 100 + iso_week).astype(np.int32),
+                         "Maand_code": ((maanden // 12 + 1970) * 100 + maanden % 12 + 1).astype(np.int32)}, index=tijden.index)
+
+def periode_label(code: int, periode_selectie: str) -> str:
+    """Leesbaar label voor één periode code (bv. 2025-03-14, 2025-W11, 2025-03)."""
+    code = int(code)
+    if periode_selectie == "Dag": return str(np.datetime64(code, "D"))
+    if periode_selectie == "Week": return f"{code // 100}-W{code % 100:02d}"
+    return f"{code // 100}-{code % 100:02d}"
+
+# === UITSCHIETERS (robuust, incrementeel) ===
+# Per reeks (alleen shift ja/nee x workflow of "Alle lijnen" x reden of "Alle redenen") een rollend venster met de dagtotalen
+# van de laatste UITSCHIETER_VENSTER_DAGEN productiedagen (dagen met stilstand op een van de lijnen). Een dag is een uitschieter
+# als zijn totaal boven mediaan + UITSCHIETER_K * 1.4826 * MAD van het venster ervóór ligt: een eigen basislijn per lijn en
+# reden die met de trend meeschuift. Een reeks begint pas bij zijn eerste dag met stilstand (bv. een lijn die later start). De vensters en gevonden uitschieters staan naast de Arrow cache; een nieuwe dag kost één
+# stap voor alle reeksen tegelijk, ongeacht de lengte van de historie. De dag van vandaag telt als voorlopig (niet in het venster).
+UITSCHIETER_VENSTER_DAGEN = 28
+UITSCHIETER_MIN_DAGEN = 10 # Minder dagen in het venster van een reeks: nog geen oordeel
+UITSCHIETER_K = 3.5
+UITSCHIETER_MIN_SPREIDING = 30.0 # Minuten; ondergrens voor 1.4826 * MAD, anders is bij een venster vol nullen elke stop een uitschieter
+UITSCHIETER_SCHEMA_VERSIE = 1
+ALLE_REDENEN = "Alle redenen"
+UITSCHIETER_KOLOMMEN = ["Dag_code", "Alleen_shift", "Workflow", "Reden", "Duur_min", "Mediaan", "MAD", "Drempel", "Score", "Voorlopig"]
+
+def uitschieter_pad(path: str) -> str:
+    """Pad van de uitschieter toestand naast de Arrow cache van path."""
+    return os.path.splitext(cache_pad_voor(path))[0] + ".uitschieters.json"
+
+def uitschieter_instellingen() -> dict:
+    """Alles waarvan de toestand afhangt; bij een verschil wordt hij opnieuw opgebouwd."""
+    return {"schema": UITSCHIETER_SCHEMA_VERSIE, "cache_schema": CACHE_SCHEMA_VERSIE, "venster": UITSCHIETER_VENSTER_DAGEN, "min_dagen": UITSCHIETER_MIN_DAGEN,
+            "k": UITSCHIETER_K, "min_spreiding": UITSCHIETER_MIN_SPREIDING, "workflows": GEWENSTE_WORKFLOWS, "shifts": repr(SHIFT_KALENDER), "feestdagen": repr(FEESTDAGEN)}
+
+def lege_uitschieter_toestand() -> dict:
+    """Toestand zonder verwerkte dagen: reeksen, venster (reeks x dag, ringbuffer; NaN = reeks nog niet begonnen), dag codes per
+    vensterpositie en de uitschieters."""
+    return {"instellingen": uitschieter_instellingen(), "reeksen": [], "gestart": np.zeros(0, dtype=bool), "venster": np.zeros((0, UITSCHIETER_VENSTER_DAGEN)),
+            "dagen": np.full(UITSCHIETER_VENSTER_DAGEN, -1, dtype=np.int64), "positie": 0, "aantal": 0, "dag_tot": None, "uitschieters": []}
+
+def lees_uitschieter_toestand(pad: str) -> dict:
+    """Bewaarde toestand, of een lege bij een ontbrekend/onleesbaar bestand of andere instellingen."""
+    try:
+        with open(pad, encoding="utf-8") as f: toestand = json.load(f)
+    except (OSError, ValueError): return lege_uitschieter_toestand()
+    if toestand.get("instellingen") != json.loads(json.dumps(uitschieter_instellingen())): return lege_uitschieter_toestand()
+    toestand["reeksen"] = [tuple(r) for r in toestand["reeksen"]]
+    toestand["venster"] = np.array(toestand["venster"], dtype=np.float64).reshape(len(toestand["reeksen"]), UITSCHIETER_VENSTER_DAGEN)
+    toestand["dagen"] = np.array(toestand["dagen"], dtype=np.int64); toestand["gestart"] = np.array(toestand["gestart"], dtype=bool)
+    return toestand
+
+def schrijf_uitschieter_toestand(toestand: dict, pad: str):
+    """Schrijft de toestand atomair weg (zonder voorlopige uitschieters)."""
+    data = dict(toestand, venster=toestand["venster"].tolist(), dagen=toestand["dagen"].tolist(), gestart=toestand["gestart"].tolist(),
+                uitschieters=[u for u in toestand["uitschieters"] if not u["Voorlopig"]])
+    tmp_pad = pad + ".tmp"
+    try:
+        with open(tmp_pad, "w", encoding="utf-8") as f: json.dump(data, f)
+        os.replace(tmp_pad, pad)
+    except OSError: # Bv. read-only map: dan volgende keer opnieuw opbouwen
+        if os.path.exists(tmp_pad): os.remove(tmp_pad)
+
+def dag_totalen(kubus_deel: pd.DataFrame) -> pd.DataFrame:
+    """Dagtotalen (minuten) met een rij per Dag_code en een kolom per reeks (Alleen_shift, Workflow, Reden)."""
+    delen = []
+    for alleen_shift in (False, True):
+        deel = kubus_deel[kubus_deel["In_shift"].to_numpy()] if alleen_shift else kubus_deel # Zoals filter_kubus
+        for kolommen in (["Workflow", "Reden"], ["Workflow"], ["Reden"], []):
+            totaal = deel.groupby(["Dag_code"] + kolommen, observed=True)["Duur_min"].sum().reset_index()
+            delen.append(pd.DataFrame({"Dag_code": totaal["Dag_code"], "Alleen_shift": alleen_shift,
+                                       "Workflow": totaal["Workflow"].astype(str) if "Workflow" in kolommen else "Alle lijnen",
+                                       "Reden": totaal["Reden"].astype(str) if "Reden" in kolommen else ALLE_REDENEN, "Duur_min": totaal["Duur_min"].astype(np.float64)}))
+    lang = pd.concat(delen, ignore_index=True)
+    if lang.empty: return pd.DataFrame(index=pd.Index([], name="Dag_code"), columns=pd.MultiIndex.from_tuples([], names=["Alleen_shift", "Workflow", "Reden"]), dtype=np.float64)
+    return lang.pivot_table(index="Dag_code", columns=["Alleen_shift", "Workflow", "Reden"], values="Duur_min", aggfunc="sum", fill_value=0.0)
+
+def kubus_dag_bereik(bron) -> tuple:
+    """(eerste, laatste) Dag_code in de kubus, of None zonder data. bron: de rollup kubus, of de SQL database (dict)."""
+    if isinstance(bron, dict):
+        bereik = sql_query(bron, "SELECT MIN(Dag_code) AS van, MAX(Dag_code) AS tot FROM kubus").iloc[0]
+        return None if pd.isna(bereik["van"]) else (int(bereik["van"]), int(bereik["tot"]))
+    return None if bron.empty else (int(bron["Dag_code"].min()), int(bron["Dag_code"].max()))
+
+def kubus_dagen(bron, van_code: int, tot_code: int) -> pd.DataFrame:
+    """Het deel van de kubus (GEWENSTE_WORKFLOWS) met Dag_code van_code t/m tot_code (selecteer_bereik, of SQL)."""
+    bereik = (np.datetime64(int(van_code), "D"), np.datetime64(int(tot_code), "D"))
+    if isinstance(bron, dict):
+        sel = sql_selectie(bron, "kubus", "Alle lijnen", bereik, False)
+        df = sql_query(bron, f"SELECT Dag_code, Workflow, Reden, In_shift, Duur_min FROM kubus WHERE {sel.where}", sel.params)
+        return df.assign(In_shift=df["In_shift"].astype(bool))
+    return selecteer_bereik(bron, "Dag", "Alle lijnen", bereik)
+
+def rij_mediaan(waarden: np.ndarray) -> np.ndarray:
+    """Mediaan per rij zonder NaN's (np.nanmedian is traag op veel korte rijen): sorteren zet de NaN's achteraan."""
+    gesorteerd = np.sort(waarden, axis=1); n = (~np.isnan(waarden)).sum(axis=1); rijen = np.arange(len(waarden))
+    return (gesorteerd[rijen, np.maximum((n - 1) // 2, 0)] + gesorteerd[rijen, n // 2 - (n == 0)]) / 2 # Rij zonder waarden: NaN
+
+def beoordeel_dag(toestand: dict, code: int, waarden: np.ndarray, voorlopig: bool) -> list:
+    """Uitschieters van één dag t.o.v. het huidige venster van elke reeks (leeg zolang het venster te kort is)."""
+    aantal = toestand["aantal"]
+    if aantal < UITSCHIETER_MIN_DAGEN: return []
+    venster = toestand["venster"][:, :aantal] # Tot het venster vol is staan de dagen op posities 0..aantal-1
+    genoeg = (~np.isnan(venster)).sum(axis=1) >= UITSCHIETER_MIN_DAGEN
+    if not genoeg.any(): return []
+    mediaan = rij_mediaan(venster); mad = rij_mediaan(np.abs(venster - mediaan[:, None]))
+    spreiding = np.maximum(1.4826 * mad, UITSCHIETER_MIN_SPREIDING); drempel = mediaan + UITSCHIETER_K * spreiding
+    return [{"Dag_code": int(code), "Alleen_shift": bool(toestand["reeksen"][i][0]), "Workflow": toestand["reeksen"][i][1], "Reden": toestand["reeksen"][i][2],
+             "Duur_min": float(waarden[i]), "Mediaan": float(mediaan[i]), "MAD": float(mad[i]), "Drempel": float(drempel[i]),
+             "Score": float((waarden[i] - mediaan[i]) / spreiding[i]), "Voorlopig": voorlopig} for i in np.flatnonzero(genoeg & (waarden > drempel))]
+
+def voeg_dag_toe(toestand: dict, code: int, waarden: np.ndarray):
+    """Schuift één dag in de vensters van alle reeksen (de oudste dag valt eruit zodra het venster vol is)."""
+    positie = toestand["positie"]; toestand["gestart"] |= waarden > 0
+    toestand["venster"][:, positie] = np.where(toestand["gestart"], waarden, np.nan); toestand["dagen"][positie] = code
+    toestand["positie"] = (positie + 1) % UITSCHIETER_VENSTER_DAGEN; toestand["aantal"] = min(toestand["aantal"] + 1, UITSCHIETER_VENSTER_DAGEN)
+    toestand["dag_tot"] = int(code)
+
+def werk_uitschieters_bij(bron, pad: str = None) -> dict:
+    """Verwerkt de dagen na de bewaarde toestand (pad; None = niet bewaren) en geeft de toestand terug.
+
+    bron: de rollup kubus, of de SQL database (dict). Alleen de nieuwe dagen worden uit de kubus gehaald. Wijken de dagen
+    in het venster af van de kubus, of heeft de kubus t/m dag_tot een dag die niet in het venster staat (bv. een export met
+    oudere stops), dan wordt de toestand opnieuw opgebouwd.
+    """
+    toestand = lees_uitschieter_toestand(pad) if pad else lege_uitschieter_toestand()
+    bereik = kubus_dag_bereik(bron)
+    if bereik is None: return toestand
+    vandaag = int(np.datetime64(datetime.date.today(), "D").astype(np.int64)); eerste, laatste = bereik
+    if toestand["dag_tot"] is not None and toestand["aantal"]: # Controle: het venster moet nog kloppen met de kubus
+        posities = np.flatnonzero(toestand["dagen"] >= 0); codes = toestand["dagen"][posities]
+        van_controle = codes.min() if toestand["aantal"] == UITSCHIETER_VENSTER_DAGEN else eerste # Venster nog niet vol: alle verwerkte dagen staan erin
+        controle = dag_totalen(kubus_dagen(bron, min(van_controle, codes.min()), toestand["dag_tot"]))
+        reeksen = pd.MultiIndex.from_tuples(toestand["reeksen"])
+        ontbreekt = not (controle.index.isin(codes).all() and controle.columns.isin(reeksen).all()) # Bv. een dag die er bij het bewaren nog niet was
+        controle = controle.reindex(index=codes, columns=reeksen, fill_value=0.0)
+        if ontbreekt or not np.allclose(controle.to_numpy().T, np.nan_to_num(toestand["venster"][:, posities]), atol=1e-3): toestand = lege_uitschieter_toestand() # NaN = 0 minuten
+    van = toestand["dag_tot"] + 1 if toestand["dag_tot"] is not None else eerste
+    if van > laatste: return toestand
+    totalen = dag_totalen(kubus_dagen(bron, van, laatste))
+    nieuwe_reeksen = [r for r in totalen.columns if r not in set(toestand["reeksen"])]
+    if nieuwe_reeksen: # Nog niet begonnen: de dagen in het venster hadden 0 minuten
+        toestand["reeksen"] = toestand["reeksen"] + nieuwe_reeksen; toestand["gestart"] = np.r_[toestand["gestart"], np.zeros(len(nieuwe_reeksen), dtype=bool)]
+        toestand["venster"] = np.vstack([toestand["venster"], np.full((len(nieuwe_reeksen), UITSCHIETER_VENSTER_DAGEN), np.nan)])
+    totalen = totalen.reindex(columns=pd.MultiIndex.from_tuples(toestand["reeksen"]), fill_value=0.0)
+    toestand["uitschieters"] = [u for u in toestand["uitschieters"] if not u["Voorlopig"]]; dag_tot = toestand["dag_tot"]
+    for code, waarden in zip(totalen.index, totalen.to_numpy()):
+        voorlopig = code >= vandaag
+        toestand["uitschieters"] += beoordeel_dag(toestand, code, waarden, voorlopig)
+        if not voorlopig: voeg_dag_toe(toestand, code, waarden)
+    if pad and toestand["dag_tot"] != dag_tot: schrijf_uitschieter_toestand(toestand, pad) # Alleen als er definitieve dagen bij zijn gekomen
+    return toestand
+
+def uitschieters_frame(toestand: dict) -> pd.DataFrame:
+    """De gevonden uitschieters als frame, met Dag en de periode codes (voor selectie per periode)."""
+    df = pd.DataFrame(toestand["uitschieters"], columns=UITSCHIETER_KOLOMMEN).sort_values(["Dag_code", "Alleen_shift", "Workflow", "Reden"], ignore_index=True)
+    dag = pd.Series(df["Dag_code"].to_numpy().astype("datetime64[D]").astype("datetime64[ns]"), index=df.index)
+    return pd.concat([df.drop(columns="Dag_code").assign(Dag=dag), periode_codes(dag)], axis=1)
+
+def uitschieter_tabel(df: pd.DataFrame) -> pd.DataFrame:
+    """Uitschieters voor dashboard en rapport: nieuwste dag eerst, per dag de grootste afwijking eerst."""
+    df = df.sort_values(["Dag", "Score"], ascending=[False, False])
+    return pd.DataFrame({"Dag": [periode_label(code, "Dag") for code in df["Dag_code"]], "Workflow": df["Workflow"], "Reden": df["Reden"],
+                         "Stilstand (min)": df["Duur_min"], "Mediaan (min)": df["Mediaan"], "Drempel (min)": df["Drempel"], "Score": df["Score"], "Voorlopig": df["Voorlopig"]})
+
+def selecteer_uitschieters(df: pd.DataFrame, workflow_select: str, date_range: tuple, apply_shift_filter: bool) -> pd.DataFrame:
+    """Uitschieters in het datumbereik voor de sidebar selectie ("Alle lijnen": ook die per lijn)."""
+    mask = (df["Alleen_shift"] == bool(apply_shift_filter)) & df["Dag"].between(pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]))
+    if workflow_select != "Alle lijnen": mask &= df["Workflow"] == workflow_select
+    return df[mask.to_numpy()]
+
+# === LIVE TAIL (Downtime) ===
+# Voor het scherm op de vloer: een achtergrond thread kijkt elke LIVE_TAIL_INTERVAL_S seconden of er exports bij zijn
+# gekomen of gewijzigd zijn (alleen grootte/mtime). Dan leest laad_downtime alleen die exports in, en gaan alleen de
+# stops vanaf de eerste geraakte dag per workflow opnieuw door overlap, shiftkalender en kubus. Sessies zien de nieuwe
+# generatie via een fragment in de sidebar en rerunnen dan. Alleen zonder SQL_BACKEND.
+LIVE_TAIL_INTERVAL_S = None # Bv. 30; None = uit
+TIJDKENMERKEN = ["Duur_min", "Weekdag", "Shift_min", "In_shift"] # Kolommen van voeg_tijdkenmerken_toe
+
+def oude_posities(df_oud: pd.DataFrame, df: pd.DataFrame) -> np.ndarray:
+    """Posities van de rijen van df_oud in df, of None als df geen uitbreiding van df_oud is.
+
+    Beide zijn gesorteerd op (Workflow, Starttijd_dt); bij gelijke starttijd staan bestaande rijen vóór nieuwe (laad_downtime).
+    """
+    posities = np.empty(len(df_oud), dtype=np.int64)
+    for workflow in df_oud["Workflow"].cat.categories:
+        lo_oud, hi_oud = workflow_grenzen(df_oud, workflow); lo, hi = workflow_grenzen(df, workflow)
+        a = df_oud["Starttijd_dt"].to_numpy()[lo_oud:hi_oud]; b = df["Starttijd_dt"].to_numpy()[lo:hi]
+        deel = lo + np.searchsorted(b, a, side="left") + np.arange(len(a)) - np.searchsorted(a, a, side="left") # Gelijke starttijden: in volgorde
+        if len(deel) and deel[-1] >= hi: return None
+        posities[lo_oud:hi_oud] = deel
+    if np.any(np.diff(posities) <= 0) or not np.array_equal(df["Starttijd_dt"].to_numpy()[posities], df_oud["Starttijd_dt"].to_numpy()): return None
+    return posities
+
+def gewijzigde_rijen(df_oud: pd.DataFrame, df: pd.DataFrame, posities: np.ndarray) -> np.ndarray:
+    """Mask over df_oud: rijen waarvan de opnieuw geëxporteerde versie (op posities in df) een andere reden of stoptijd heeft.
+
+    Workflow en starttijd zijn al gelijk (oude_posities); de rest van de pipeline hangt alleen nog van deze twee af.
+    """
+    naar_nieuw = df["Reden"].cat.categories.get_indexer(df_oud["Reden"].cat.categories) # Oude categorie -> code in df (-1: bestaat niet meer)
+    codes_oud = df_oud["Reden"].cat.codes.to_numpy(); reden_oud = np.where(codes_oud >= 0, naar_nieuw[codes_oud], -1)
+    return (reden_oud != df["Reden"].cat.codes.to_numpy()[posities]) | (df_oud["Stoptijd_dt"].to_numpy() != df["Stoptijd_dt"].to_numpy()[posities])
+
+def herbereken_vanaf(df: pd.DataFrame, nieuw: np.ndarray) -> dict:
+    """Per workflow met nieuwe stops de eerste dag die opnieuw berekend moet worden.
+
+    Start bij de dag van de vroegste nieuwe stop en schuift terug tot geen stop van die workflow over de grens loopt:
+    overlap en dagsplitsing vanaf de grens hangen dan alleen af van stops die op of na de grens beginnen.
+    """
+    grenzen = {}
+    for workflow, starts in df["Starttijd_dt"][nieuw].groupby(df["Workflow"][nieuw], observed=True):
+        lo, hi = workflow_grenzen(df, workflow)
+        start = df["Starttijd_dt"].to_numpy()[lo:hi]; stop = df["Stoptijd_dt"].to_numpy()[lo:hi]
+        grens = starts.min().normalize().to_datetime64()
+        while True:
+            over = (start < grens) & (stop >= grens)
+            if not over.any(): break
+            grens = pd.Timestamp(start[over].min()).normalize().to_datetime64()
+        grenzen[workflow] = grens
+    return grenzen
+
+def werk_dataset_bij(dataset: dict, df: pd.DataFrame) -> dict:
+    """Nieuwe dataset uit de vorige (events + kubus) en het uitgebreide frame van laad_downtime.
+
+    Alleen stops vanaf herbereken_vanaf gaan opnieuw door de pipeline; de rest komt uit de vorige dataset. Gewijzigde
+    stops uit een opnieuw geëxporteerd bestand (andere reden of stoptijd) tellen als nieuw. Is df geen uitbreiding van
+    de vorige events (bv. een stop verdwenen of met een andere starttijd, of cache opnieuw opgebouwd), dan volledig
+    zoals laad_dataset.
+    """
+    events_oud, kubus_oud = dataset["events"], dataset["kubus"]
+    posities = oude_posities(events_oud, df) if not events_oud.empty and not df.empty else None
+    if posities is None:
+        segmenten = bouw_segmenten(df); df = voeg_tijdkenmerken_toe(df, segmenten)
+        return {"events": df, "kubus": bouw_kubus(df, segmenten)}
+    nieuw = np.ones(len(df), dtype=bool); nieuw[posities] = False; nieuw[posities[gewijzigde_rijen(events_oud, df, posities)]] = True
+    opnieuw = np.zeros(len(df), dtype=bool); kubus_weg = np.zeros(len(kubus_oud), dtype=bool)
+    for workflow, grens in herbereken_vanaf(df, nieuw).items():
+        opnieuw |= (df["Workflow"] == workflow).to_numpy() & (df["Starttijd_dt"].to_numpy() >= grens)
+        kubus_weg |= (kubus_oud["Workflow"] == workflow).to_numpy() & (kubus_oud["Dag"].to_numpy() >= grens)
+    deel = df[opnieuw]; segmenten = bouw_segmenten(deel); deel = voeg_tijdkenmerken_toe(deel, segmenten)
+    behouden = ~opnieuw[posities]
+    kenmerken = {}
+    for kolom in TIJDKENMERKEN:
+        waarden = np.empty(len(df), dtype=events_oud[kolom].dtype)
+        waarden[posities[behouden]] = events_oud[kolom].to_numpy()[behouden]; waarden[opnieuw] = deel[kolom].to_numpy()
+        kenmerken[kolom] = waarden
+    kubus = pd.concat([kubus_oud[~kubus_weg], bouw_kubus(deel, segmenten)], ignore_index=True)
+    for kolom in ["Workflow", "Reden"]: kubus[kolom] = pd.Categorical(kubus[kolom], categories=df[kolom].cat.categories) # Zelfde categorieën als een volledige build
+    return {"events": df.assign(**kenmerken), "kubus": kubus.sort_values(KUBUS_SLEUTELS, kind="stable", ignore_index=True)}
+
+def bron_standen(path: str) -> dict:
+    """Grootte en mtime per export: goedkoop genoeg om bij elke poll te vergelijken."""
+    standen = {}
+    for bron in downtime_bronnen(path):
+        stat = os.stat(bron); standen[bron] = (stat.st_size, stat.st_mtime_ns)
+    return standen
+
+def live_tail_poll(live: dict, path: str):
+    """Eén poll: bij gewijzigde exports alleen de delta inlezen en een nieuwe generatie van de dataset publiceren."""
+    standen = bron_standen(path) # Vóór het inlezen, zodat een wijziging tijdens het inlezen bij de volgende poll gezien wordt
+    if standen == live["standen"]: return
+    df, meldingen = laad_downtime(path)
+    stand = live["stand"]
+    if df.attrs.get("versie") != stand["dataset"]["events"].attrs.get("versie"):
+        live["stand"] = {"generatie": stand["generatie"] + 1, "dataset": werk_dataset_bij(stand["dataset"], df),
+                         "bijgewerkt": datetime.datetime.now(), "meldingen": meldingen} # Eén toewijzing: een rerun ziet oud of nieuw, nooit een mix
+    live["standen"] = standen
+
+def live_tail_lus(live: dict, path: str):
+    """Watcher thread: pollt tot het stop event gezet wordt. Fouten worden bewaard voor de sidebar, de oude data blijft staan."""
+    while not live["stop"].wait(LIVE_TAIL_INTERVAL_S):
+        try: live_tail_poll(live, path); live["fout"] = None
+        except Exception as e: live["fout"] = f"{type(e).__name__}: {e}"
+
+@st.cache_resource # Eén watcher thread en één live dataset per proces, gedeeld door alle sessies
+def live_dataset(path: str) -> dict:
+    """Start de watcher voor path. live["stand"] bevat de huidige generatie, dataset en tijd van bijwerken."""
+    standen = bron_standen(path) if os.path.exists(path) else {}
+    live = {"stand": {"generatie": 0, "dataset": load_dataset(path), "bijgewerkt": datetime.datetime.now(), "meldingen": []},
+            "standen": standen, "fout": None, "stop": threading.Event()}
+    threading.Thread(target=live_tail_lus, args=(live, path), name="live-tail", daemon=True).start()
+    return live
+
+def huidige_dataset(path: str) -> dict:
+    """De dataset voor deze rerun: de laatste live generatie (LIVE_TAIL_INTERVAL_S) of de eenmalig geladen dataset."""
+    if not LIVE_TAIL_INTERVAL_S: return load_dataset(path)
+    stand = live_dataset(path)["stand"]
+    st.session_state["live_generatie"] = stand["generatie"]
+    for melding in stand["meldingen"]: st.warning(melding)
+    return stand["dataset"]
+
+@st.fragment(run_every=LIVE_TAIL_INTERVAL_S)
+def display_live_status(path: str):
+    """Live status in de sidebar. Draait elke LIVE_TAIL_INTERVAL_S seconden los van de rest en rerunt de app bij een nieuwe generatie."""
+    live = live_dataset(path); stand = live["stand"]
+    if stand["generatie"] != st.session_state.get("live_generatie"): st.rerun(scope="app")
+    st.caption(f"🟢 Live: bijgewerkt om {stand['bijgewerkt']:%H:%M:%S} (controle elke {LIVE_TAIL_INTERVAL_S} s)")
+    if live["fout"]: st.warning(f"Live bijwerken mislukt: {live['fout']}")
+
+# === SQL BACKEND (optioneel) ===
+# Met SQL_BACKEND staan events, rollup kubus en orders in een lokaal DuckDB/SQLite bestand. Filters en aggregaties
+# gaan als SQL naar de database; alleen de (kleine) resultaten komen terug in pandas, dus het geheugen per sessie
+# groeit niet mee met de historie. Tijden als epoch seconden, dagen als Dag_code (zie periode_codes).
+try: import duckdb
+except ImportError: duckdb = None # Optioneel: zonder duckdb wordt SQLite (standaardbibliotheek) gebruikt
+
+SQL_SCHEMA_VERSIE = 3
+
+def sql_engine() -> str:
+    """De SQL engine voor SQL_BACKEND: DuckDB als die gevraagd én geïnstalleerd is, anders SQLite."""
+    return "duckdb" if SQL_BACKEND == "duckdb" and duckdb is not None else "sqlite"
+
+def sql_verbind(pad: str, engine: str, read_only: bool = True):
+    """Nieuwe DB-API verbinding (per query; verbindingen worden niet gedeeld tussen threads)."""
+    if engine == "duckdb": return duckdb.connect(pad, read_only=read_only)
+    return sqlite3.connect(f"file:{pad}?mode=ro", uri=True) if read_only else sqlite3.connect(pad)
+
+def sql_query(db: dict, query: str, params: tuple = ()) -> pd.DataFrame:
+    """Voert een query uit op de dashboard database en geeft het resultaat als DataFrame."""
+    with closing(sql_verbind(db["pad"], db["engine"])) as con:
+        cur = con.execute(query, params)
+        return pd.DataFrame(cur.fetchall(), columns=[k[0] for k in cur.description])
+
+def sql_schrijf_tabel(con, engine: str, naam: str, df: pd.DataFrame):
+    """Schrijft df als nieuwe tabel (categorieën als tekst, bools als 0/1)."""
+    df = df.astype({k: object for k in df.columns if isinstance(df[k].dtype, pd.CategoricalDtype)})
+    df = df.astype({k: "int8" for k in df.columns if df[k].dtype == bool})
+    if engine == "duckdb": con.register("df_bron", df); con.execute(f"CREATE TABLE {naam} AS SELECT * FROM df_bron"); con.unregister("df_bron")
+    else: df.to_sql(naam, con, index=False, chunksize=50_000)
+
+def sql_db_pad(path: str) -> str:
+    """Pad van de database naast de downtime bron (bestand of exports map)."""
+    return f"{path.rstrip(os.sep)}.{sql_engine()}"
+
+def sql_versie(path: str, meta: dict) -> str:
+    """Versie van de database: dataset versie plus de order bron."""
+    order_fp = bron_fingerprint(DATA_PATH_ORDER, met_hash=False) if os.path.exists(DATA_PATH_ORDER) else None
+    return f"{SQL_SCHEMA_VERSIE}-{dataset_versie(meta)}-{json.dumps(order_fp, sort_keys=True, default=str)}"
+
+def bouw_sql_database(path: str, pad_db: str, engine: str) -> list:
+    """(Her)bouwt de database uit de downtime pipeline en de order data. Geeft de meldingen terug."""
+    dataset, meldingen = laad_dataset(path)
+    df, kubus = dataset["events"], dataset["kubus"]
+    events = pd.DataFrame({"Rij": df.index.to_numpy(), "Workflow": df["Workflow"], "Reden": df["Reden"], "Ordernummer": df["Ordernummer"],
+                           "Start_s": df["Starttijd_dt"].to_numpy().astype("datetime64[s]").astype(np.int64),
+                           "Stop_s": df["Stoptijd_dt"].to_numpy().astype("datetime64[s]").astype(np.int64),
+                           "Weekdag": df["Weekdag"], "Duur_min": df["Duur_min"], "Shift_min": df["Shift_min"], "In_shift": df["In_shift"]})
+    df_orders = pd.DataFrame()
+    if os.path.exists(DATA_PATH_ORDER):
+        try: df_orders, order_meldingen = lees_order_csv(DATA_PATH_ORDER); meldingen = meldingen + order_meldingen
+        except ValueError as ve: meldingen = meldingen + [str(ve)]
+    versie = sql_versie(path, lees_cache_meta(cache_pad_voor(path))) # Na de ingest, dus inclusief nieuwe exports
+    tmp_pad = pad_db + ".tmp"
+    if os.path.exists(tmp_pad): os.remove(tmp_pad)
+    with closing(sql_verbind(tmp_pad, engine, read_only=False)) as con:
+        sql_schrijf_tabel(con, engine, "events", events)
+        sql_schrijf_tabel(con, engine, "kubus", kubus.drop(columns="Dag"))
+        if not df_orders.empty:
+            orders = df_orders.rename(columns={"WO #": "WO_nr"}).assign(Date=df_orders["Date"].to_numpy().astype("datetime64[s]").astype(np.int64))
+            sql_schrijf_tabel(con, engine, "orders", orders)
+        con.execute("CREATE INDEX events_wf_tijd ON events (Workflow, Start_s)")
+        con.execute("CREATE INDEX kubus_wf_dag ON kubus (Workflow, Dag_code)")
+        con.execute("CREATE TABLE meta (sleutel TEXT, waarde TEXT)")
+        con.execute("INSERT INTO meta VALUES (?, ?), (?, ?), (?, ?)", ("versie", versie, "cache_pad", df.attrs.get("cache_pad") or "", "cache_versie", df.attrs.get("versie")))
+        con.commit()
+    os.replace(tmp_pad, pad_db) # Atomisch: lezers zien de oude of de nieuwe database, nooit een halve
+    return meldingen
+
+def sql_database(path: str) -> tuple:
+    """Opent (en bouwt zo nodig) de database voor de downtime bron in path. Geeft (db, meldingen) terug.
+
+    Zolang de exports (volgens de Arrow cache) en de order bron niet veranderd zijn, wordt de bestaande database
+    gebruikt zonder de downtime data in het geheugen te laden.
+    """
+    engine = sql_engine(); db = {"pad": sql_db_pad(path), "engine": engine}
+    meta = lees_cache_meta(cache_pad_voor(path)); bekend = meta.get("bronnen", {})
+    db_meta = {}
+    if meta and os.path.exists(db["pad"]) and all(bron_ongewijzigd(b, bekend.get(b)) for b in downtime_bronnen(path)):
+        try: db_meta = dict(sql_query(db, "SELECT sleutel, waarde FROM meta").itertuples(index=False))
+        except Exception: db_meta = {} # Onleesbare of oude database: opnieuw bouwen
+    if db_meta.get("versie") == sql_versie(path, meta): meldingen = [m for info in bekend.values() for m in info.get("meldingen", [])]
+    else:
+        meldingen = bouw_sql_database(path, db["pad"], engine)
+        db_meta = dict(sql_query(db, "SELECT sleutel, waarde FROM meta").itertuples(index=False))
+    return dict(db, versie=db_meta["versie"], cache_pad=db_meta["cache_pad"] or None, cache_versie=db_meta.get("cache_versie")), meldingen
+
+@st.cache_resource # Eén database (pad + versie) voor alle sessies; elke query opent een eigen verbinding
+def load_sql_database(path: str) -> dict:
+    """Opent de SQL database voor de downtime data (UI wrapper met foutmeldingen)."""
+    if not os.path.exists(path): st.error(f"❌ Downtime bestand niet gevonden: {path}"); st.stop(); return {}
+    try:
+        db, meldingen = sql_database(path)
+        for melding in meldingen: st.warning(melding)
+        return db
+    except ValueError as ve: st.error(str(ve)); st.stop(); return {}
+    except Exception as e: st.error(f"Fout bij opbouwen SQL database voor: {path}."); st.exception(e); st.stop(); return {}
+
+def sql_tabel_bestaat(db: dict, naam: str) -> bool:
+    """True als de tabel in de database staat (orders is optioneel)."""
+    query = "SELECT 1 FROM information_schema.tables WHERE table_name = ?" if db["engine"] == "duckdb" else "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return not sql_query(db, query, (naam,)).empty
+
+class SqlSelectie(NamedTuple):
+    """Selectie op de events of kubus tabel; vervangt het gefilterde frame in de bereken_* functies."""
+    db: dict
+    tabel: str
+    where: str
+    params: tuple
+    duur: str # Duur kolom: Shift_min bij het shift filter op events, anders Duur_min
+    duur_max: str = "Duur_max" # Langste stop in de kubus: Shift_max bij het shift filter
+
+    @property
+    def empty(self) -> bool:
+        return sql_query(self.db, f"SELECT 1 FROM {self.tabel} WHERE {self.where} LIMIT 1", self.params).empty
+
+def sql_selectie(db: dict, tabel: str, workflow_select: str, date_range: tuple, apply_shift_filter: bool) -> SqlSelectie:
+    """Zelfde selectie als filter_data (tabel events) of filter_kubus (tabel kubus), als WHERE clause."""
+    workflows = [workflow_select] if workflow_select != "Alle lijnen" else GEWENSTE_WORKFLOWS
+    start, eind = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+    if tabel == "events": tijd_kolom, van, tot = "Start_s", int(start.timestamp()), int(eind.timestamp())
+    else: tijd_kolom, van, tot = "Dag_code", int(np.datetime64(start, "D").astype(np.int64)), int(np.datetime64(eind, "D").astype(np.int64))
+    where = f"Workflow IN ({', '.join('?' * len(workflows))}) AND {tijd_kolom} >= ? AND {tijd_kolom} < ?" + (" AND In_shift = 1" if apply_shift_filter else "")
+    duur = "Shift_min" if apply_shift_filter and tabel == "events" else "Duur_min"
+    return SqlSelectie(db, tabel, where, (*workflows, van, tot), duur, "Shift_max" if apply_shift_filter else "Duur_max")
+
+def sql_overzicht(db: dict) -> pd.DataFrame:
+    """Klein frame met per workflow de eerste en laatste dag, genoeg voor de sidebar filters."""
+    df = sql_query(db, "SELECT Workflow, MIN(Dag_code) AS eerste, MAX(Dag_code) AS laatste FROM kubus GROUP BY Workflow")
+    dagen = np.concatenate([df["eerste"], df["laatste"]]).astype("datetime64[D]").astype("datetime64[ns]")
+    return pd.DataFrame({"Workflow": np.concatenate([df["Workflow"], df["Workflow"]]), "Datum": dagen})
+
+def sql_order_lijnen(db: dict) -> pd.DataFrame:
+    """De order lijnen (kolom Line), of een leeg frame als er geen order data in de database staat."""
+    if not sql_tabel_bestaat(db, "orders"): return pd.DataFrame()
+    return sql_query(db, "SELECT DISTINCT Line FROM orders ORDER BY Line")
+
+def sql_orders(db: dict, selected_order_line: str) -> pd.DataFrame:
+    """Orders van een lijn met Target_Time_Min (Quantity / EFFECTIVE_CAPACITY) in SQL berekend."""
+    where, params = ("WHERE Line = ?", (selected_order_line,)) if selected_order_line and selected_order_line != "Alle lijnen" else ("", ())
+    df = sql_query(db, f'SELECT Date, Line, WO_nr AS "WO #", Item, Quantity, Quantity / ? AS Target_Time_Min FROM orders {where}', (EFFECTIVE_CAPACITY, *params))
+    return df.assign(Date=pd.to_datetime(df["Date"], unit="s"))
+
+def sql_order_koppel_invoer(db: dict, df_orders: pd.DataFrame) -> tuple:
+    """Als order_koppel_invoer, met de stilstand per ordernummer als GROUP BY en alleen losse stops binnen de order periode."""
+    per_nummer = sql_query(db, "SELECT Ordernummer, SUM(Duur_min) AS Duur_min, COUNT(*) AS Stops FROM events WHERE Ordernummer IS NOT NULL GROUP BY Ordernummer")
+    sleutels = order_sleutel(per_nummer["Ordernummer"]); orders = order_sleutel(df_orders["WO #"]).dropna()
+    bekend = sleutels.isin(orders).to_numpy(dtype=bool)
+    per_order = per_nummer[bekend].groupby(sleutels[bekend].to_numpy()).agg(Downtime_min=("Duur_min", "sum"), Stops=("Stops", "sum"))
+    datums = df_orders["Date"].dropna()
+    if datums.empty: return per_order, pd.DataFrame(columns=["Workflow", "Starttijd_dt", "Duur_min"])
+    van, tot = int(datums.min().timestamp()), int((datums.max() + ORDER_KOPPEL_TOLERANTIE).timestamp())
+    los = sql_query(db, "SELECT Workflow, Ordernummer, Start_s, Duur_min FROM events WHERE Start_s >= ? AND Start_s <= ?", (van, tot))
+    los = los[order_sleutel(los["Ordernummer"]).isna().to_numpy()]
+    return per_order, pd.DataFrame({"Workflow": los["Workflow"], "Starttijd_dt": pd.to_datetime(los["Start_s"], unit="s"), "Duur_min": los["Duur_min"]})
+
+def sql_groep(sel: SqlSelectie, kolommen: list, extra: str = "", extra_params: tuple = (), aantal: bool = False, limiet: int = None) -> pd.DataFrame:
+    """SUM(duur) (en optioneel COUNT(*) als Aantal) per groep binnen de selectie. NULL sleutels vallen weg, zoals bij groupby."""
+    groep = ", ".join(kolommen)
+    where = " AND ".join([sel.where] + [f"{k} IS NOT NULL" for k in kolommen]) + extra
+    query = f"SELECT {groep}, SUM({sel.duur}) AS Duur_min{', COUNT(*) AS Aantal' if aantal else ''} FROM {sel.tabel} WHERE {where} GROUP BY {groep}"
+    query += f" ORDER BY Duur_min DESC LIMIT {int(limiet)}" if limiet else f" ORDER BY {groep}"
+    return sql_query(sel.db, query, sel.params + tuple(extra_params))
+
+def sql_kpi_totalen(sel: SqlSelectie) -> pd.DataFrame:
+    """Eén rij met de totalen van de kubus selectie (leeg als de selectie leeg is)."""
+    df = sql_query(sel.db, f"SELECT SUM(Duur_min) AS Duur_min, SUM(Aantal) AS Aantal, MAX({sel.duur_max}) AS Duur_max FROM kubus WHERE {sel.where}", sel.params)
+    return df.dropna(subset=["Aantal"])
+
+def sql_langste_stilstanden(sel: SqlSelectie, orders: list) -> pd.DataFrame:
+    """Per order de langste stop (bij gelijke duur de eerste, zoals idxmax), met het rijnummer in de cache als index."""
+    df = sql_query(sel.db, f"""SELECT Rij, Ordernummer, Start_s, Stop_s, Duur_min, Reden FROM (
+        SELECT Rij, Ordernummer, Start_s, Stop_s, {sel.duur} AS Duur_min, Reden, ROW_NUMBER() OVER (PARTITION BY Ordernummer ORDER BY {sel.duur} DESC, Workflow, Start_s) AS rang
+        FROM events WHERE {sel.where} AND Ordernummer IN ({', '.join('?' * len(orders))})) AS t WHERE rang = 1 ORDER BY Ordernummer""", sel.params + tuple(orders))
+    df = pd.DataFrame({"Ordernummer": df["Ordernummer"], "Starttijd_dt": pd.to_datetime(df["Start_s"], unit="s"), "Stoptijd_dt": pd.to_datetime(df["Stop_s"], unit="s"),
+                       "Duur_min": df["Duur_min"], "Reden": df["Reden"]}).set_axis(df["Rij"].to_numpy())
+    df.attrs["cache_pad"] = sel.db.get("cache_pad"); df.attrs["versie"] = sel.db.get("cache_versie") # Voor laad_opmerkingen: Rij hoort bij deze cache versie
+    return df
+
+# === VIEW CACHE (gedeeld tussen sessies) ===
+# Elke widget wijziging runt main() opnieuw. Gefilterde frames en afgeleide aggregaten worden daarom bewaard onder
+# (soort, dataset versie, workflow, datumbereik, shift, ...) in één begrensde LRU cache voor alle sessies.
+VIEW_CACHE_MAX_ITEMS = 256
+VIEW_CACHE_MAX_MB = 256
+
+@st.cache_resource
+def view_cache() -> dict:
+    """De gedeelde LRU cache met hit/miss tellers per soort."""
+    return {"items": OrderedDict(), "groottes": {}, "bytes": 0, "tellers": {}, "lock": threading.Lock()}
+
+def geschatte_grootte(waarde) -> int:
+    """Ruwe grootte in bytes van een cache waarde (frames, en lijsten/dicts daarvan)."""
+    if isinstance(waarde, pd.DataFrame): return int(waarde.memory_usage(index=True).sum())
+    if isinstance(waarde, pd.Series): return int(waarde.memory_usage(index=True))
+    if isinstance(waarde, dict): return sum(geschatte_grootte(v) for v in waarde.values())
+    if isinstance(waarde, (list, tuple)): return sum(geschatte_grootte(v) for v in waarde)
+    return 64
+
+def memo(soort: str, sleutel: tuple, bereken):
+    """Geeft de gecachte waarde voor (soort, sleutel) terug, of berekent en bewaart hem. Zonder sleutel: geen cache.
+
+    Gecachte waarden worden gedeeld tussen sessies en mogen dus niet aangepast worden. Elke aanroep is een stap (INSTRUMENTATIE).
+    """
+    with stap(soort) as info:
+        if sleutel is None: waarde = bereken(); info.update(cache="uit", rijen=aantal_rijen(waarde)); return waarde
+        cache = view_cache(); volledige_sleutel = (soort,) + tuple(sleutel)
+        with cache["lock"]:
+            tellers = cache["tellers"].setdefault(soort, {"hits": 0, "misses": 0})
+            if volledige_sleutel in cache["items"]:
+                cache["items"].move_to_end(volledige_sleutel); tellers["hits"] += 1
+                waarde = cache["items"][volledige_sleutel]; info.update(cache="hit", rijen=aantal_rijen(waarde))
+                return waarde
+            tellers["misses"] += 1
+        waarde = bereken() # Buiten de lock, zodat andere sessies niet wachten op deze berekening
+        grootte = geschatte_grootte(waarde); info.update(cache="miss", rijen=aantal_rijen(waarde))
+        with cache["lock"]:
+            if volledige_sleutel not in cache["items"]:
+                cache["items"][volledige_sleutel] = waarde; cache["groottes"][volledige_sleutel] = grootte; cache["bytes"] += grootte
+            while len(cache["items"]) > 1 and (len(cache["items"]) > VIEW_CACHE_MAX_ITEMS or cache["bytes"] > VIEW_CACHE_MAX_MB * 1e6):
+                oudste, _ = cache["items"].popitem(last=False); cache["bytes"] -= cache["groottes"].pop(oudste)
+        return waarde
+
+def view_sleutel(versie: str, workflow_select: str, date_range: tuple, apply_shift_filter: bool) -> tuple:
+    """Cache sleutel voor de huidige sidebar selectie."""
+    return (versie, workflow_select, str(date_range[0]), str(date_range[1]), bool(apply_shift_filter))
+
+def display_debug_panel() -> tuple:
+    """Optionele debug sectie in de sidebar: view cache statistieken en instrumentatie. Geeft (debug, timings loggen) terug."""
+    if not st.sidebar.toggle("🛠️ Debug info", value=False, key="debug_toggle"): return False, False
+    loggen = st.sidebar.toggle("Timings loggen", value=False, key="debug_log", help=f"Elke rerun als JSON regel naar {INSTRUMENTATIE_LOG}")
+    kolom_profiel, kolom_wis = st.sidebar.columns(2)
+    if kolom_profiel.button("Profileer rerun", key="debug_profileer", help="pyinstrument als die geïnstalleerd is, anders cProfile"):
+        st.session_state["debug_profileer_rerun"] = True; st.rerun()
+    if kolom_wis.button("Profiel wissen", key="debug_profiel_wissen", disabled="debug_profiel" not in st.session_state):
+        st.session_state.pop("debug_profiel", None)
+    with st.sidebar.expander("View cache", expanded=True):
+        cache = view_cache()
+        with cache["lock"]:
+            tellers = {soort: dict(t) for soort, t in cache["tellers"].items()}; aantal = len(cache["items"]); mb = cache["bytes"] / 1e6
+        st.caption(f"{aantal}/{VIEW_CACHE_MAX_ITEMS} items, {mb:.1f}/{VIEW_CACHE_MAX_MB} MB")
+        if tellers:
+            df_tellers = pd.DataFrame.from_dict(tellers, orient="index").rename_axis("Soort").reset_index()
+            df_tellers["Hit ratio"] = df_tellers["hits"] / (df_tellers["hits"] + df_tellers["misses"])
+            st.dataframe(df_tellers, hide_index=True, use_container_width=True, column_config={"Hit ratio": st.column_config.NumberColumn(format="%.2f")})
+        if st.button("Cache legen", key="debug_cache_legen"):
+            with cache["lock"]: cache["items"].clear(); cache["groottes"].clear(); cache["bytes"] = 0; cache["tellers"].clear()
+    return True, loggen
+
+# === BEREKENINGEN (Downtime Analyse) ===
+# Pure functies zonder st.* aanroepen; de display functies tonen de resultaten (via memo).
+
+def bereken_kpis(kubus_sel: pd.DataFrame) -> dict:
+    """Totale stilstand (uren), aantal stilstanden en langste stilstand (min)."""
+    if isinstance(kubus_sel, SqlSelectie): kubus_sel = sql_kpi_totalen(kubus_sel)
+    if kubus_sel.empty: return {"totaal_uren": None, "aantal": 0, "langste_min": None}
+    max_stilstand = kubus_sel["Duur_max"].max()
+    return {"totaal_uren": kubus_sel["Duur_min"].sum() / 60, "aantal": int(kubus_sel["Aantal"].sum()), "langste_min": max_stilstand if pd.notna(max_stilstand) else None}
+
+def bereken_reden_per_lijn(df_filtered: pd.DataFrame) -> pd.DataFrame:
+    """Stilstand en aantal rijen per (Workflow, Reden) in één groupby, met de Uitgesloten vlag per unieke reden."""
+    if isinstance(df_filtered, SqlSelectie): df_reden_lijn = sql_groep(df_filtered, ["Workflow", "Reden"], aantal=True)
+    else: df_reden_lijn = df_filtered.groupby(["Workflow", "Reden"], observed=True)["Duur_min"].agg(Duur_min="sum", Aantal="size").reset_index()
+    df_reden_lijn["Uitgesloten"] = uitgesloten_redenen(df_reden_lijn["Reden"]).to_numpy() if UITGESLOTEN_REDENEN_KEYWORDS else False
+    return df_reden_lijn
+
+def bereken_reden_aggregaat(df_reden_lijn: pd.DataFrame, lijn_naam: str) -> tuple:
+    """Stilstand per reden (aflopend, met percentage) voor één lijn of "Alle lijnen", zonder uitgesloten redenen.
+
+    Geeft (df, aantal uitgesloten rijen); df is None als er na het filter geen relevante stilstand over is.
+    """
+    df_lijn = df_reden_lijn if lijn_naam == "Alle lijnen" else df_reden_lijn[df_reden_lijn["Workflow"] == lijn_naam]
+    aantal_uitgesloten = int(df_lijn.loc[df_lijn["Uitgesloten"], "Aantal"].sum())
+    df_lijn = df_lijn[~df_lijn["Uitgesloten"]]
+    if df_lijn.empty or df_lijn["Duur_min"].sum() < 0.1: return None, aantal_uitgesloten
+    df_reason_agg = df_lijn.groupby("Reden", observed=True)["Duur_min"].sum().reset_index()
+    df_reason_agg = df_reason_agg[df_reason_agg['Reden'] != ''].sort_values(by="Duur_min", ascending=False)
+    totaal_duur_relevant = df_reason_agg["Duur_min"].sum()
+    if totaal_duur_relevant > 0: df_reason_agg['percentage_totaal'] = (df_reason_agg['Duur_min'] / totaal_duur_relevant) * 100
+    else: df_reason_agg['percentage_totaal'] = 0.0
+    return df_reason_agg, aantal_uitgesloten
+
+def bereken_periode_trend(kubus_sel: pd.DataFrame, periode_selectie: str) -> pd.DataFrame:
+    """Totale stilstand per periode (chronologisch, met label)."""
+    if isinstance(kubus_sel, SqlSelectie): kubus_sel = sql_groep(kubus_sel, [PERIODE_CODE_KOLOM[periode_selectie]])
+    df_tijd = kubus_sel.groupby(PERIODE_CODE_KOLOM[periode_selectie])["Duur_min"].sum() # Gesorteerd op code = chronologisch
+    return pd.DataFrame({"Periode": [periode_label(code, periode_selectie) for code in df_tijd.index], "Duur_min": df_tijd.to_numpy()})
+
+def bereken_top_orders(df_filtered: pd.DataFrame) -> pd.DataFrame:
+    """Top 3 orders op totale stilstand (index 1..3)."""
+    if isinstance(df_filtered, SqlSelectie): df_filtered = sql_groep(df_filtered, ["Ordernummer"], limiet=3)
+    df_order_downtime = (df_filtered.groupby("Ordernummer", observed=True)["Duur_min"].sum().sort_values(ascending=False).head(3).reset_index())
+    df_order_downtime.index = range(1, len(df_order_downtime) + 1)
+    return df_order_downtime
+
+def bereken_langste_stilstanden(df_filtered: pd.DataFrame, top_orders_list: list) -> pd.DataFrame:
+    """Langste enkele stilstand per order in top_orders_list, met Opmerking (lazy opgehaald)."""
+    if isinstance(df_filtered, SqlSelectie): df_filtered = sql_langste_stilstanden(df_filtered, top_orders_list)
+    df_top_events = df_filtered[df_filtered["Ordernummer"].isin(top_orders_list)]
+    if df_top_events.empty: return pd.DataFrame()
+    idx = df_top_events.loc[df_top_events.groupby("Ordernummer", observed=True)["Duur_min"].idxmax()].index
+    df_longest_events = df_top_events.loc[idx]
+    df_longest_display = df_longest_events[["Ordernummer", "Starttijd_dt", "Stoptijd_dt", "Duur_min", "Reden"]].copy()
+    df_longest_display["Opmerking"] = laad_opmerkingen(df_longest_events) # Vrije tekst alleen voor deze paar rijen ophalen
+    return df_longest_display.rename(columns={"Starttijd_dt": "Start", "Stoptijd_dt": "Stop", "Duur_min": "Duur (min)"})
+
+WERKDAGEN = ['Maandag', 'Dinsdag', 'Woensdag', 'Donderdag', 'Vrijdag']
+
+def bereken_top_orders_per_weekdag(df_filtered: pd.DataFrame) -> dict:
+    """Per werkdag (Ma-Vr) de top 3 orders met hun belangrijkste reden. Dagen zonder data ontbreken.
+
+    Eén gegroepeerde berekening voor alle dagen: top 3 per dag via sorteren + head(3) op de totalen per (weekdag, order),
+    de belangrijkste reden via drop_duplicates op de aflopend gesorteerde totalen per (weekdag, order, reden).
+    """
+    if isinstance(df_filtered, SqlSelectie): df_filtered = sql_groep(df_filtered, ["Weekdag", "Ordernummer", "Reden"], " AND Weekdag < 5")
+    df_werkdagen = df_filtered[df_filtered['Weekdag'].to_numpy() < 5]
+    per_order = df_werkdagen.groupby(['Weekdag', 'Ordernummer'], observed=True)['Duur_min'].sum().reset_index()
+    df_top = per_order.sort_values(['Weekdag', 'Duur_min'], ascending=[True, False], kind="stable").groupby('Weekdag').head(3)
+    per_reden = df_werkdagen.groupby(['Weekdag', 'Ordernummer', 'Reden'], observed=True)['Duur_min'].sum().reset_index()
+    per_reden = per_reden.merge(df_top[['Weekdag', 'Ordernummer']], on=['Weekdag', 'Ordernummer']) # Alleen de top orders
+    top_reden = per_reden.sort_values('Duur_min', ascending=False, kind="stable").drop_duplicates(['Weekdag', 'Ordernummer']) # Gelijke stand: eerste reden, zoals idxmax
+    df_top = df_top.merge(top_reden[['Weekdag', 'Ordernummer', 'Reden']], on=['Weekdag', 'Ordernummer'], how='left')
+    df_top['Totale stilstand (uur)'] = df_top['Duur_min'] / 60
+    return {WERKDAGEN[dag_nr]: df_dag[["Ordernummer", "Reden", "Duur_min", "Totale stilstand (uur)"]].set_axis(range(1, len(df_dag) + 1))
+            for dag_nr, df_dag in df_top.groupby('Weekdag', sort=True)}
+
+def bereken_performance(kubus_sel: pd.DataFrame) -> tuple:
+    """Dagelijkse stilstand en performance %, plus de uitschieter drempel (gem + 1.5 * std; None bij < 2 dagen)."""
+    if isinstance(kubus_sel, SqlSelectie): kubus_sel = sql_groep(kubus_sel, ["Dag_code"])
+    df_performance = kubus_sel.groupby("Dag_code")["Duur_min"].sum().reset_index()
+    df_performance.insert(0, "Dag", [periode_label(code, "Dag") for code in df_performance.pop("Dag_code")]) # Alleen de unieke dagen formatteren
+    df_performance.rename(columns={"Duur_min": "Total_downtime_min"}, inplace=True)
+    df_performance["Performance (%)"] = (100 * (1 - (df_performance["Total_downtime_min"] / PERFORMANCE_SHIFT_MINUTES))).clip(lower=0)
+    if len(df_performance) < 2: return df_performance, None
+    mean_down = df_performance["Total_downtime_min"].mean(); std_down  = df_performance["Total_downtime_min"].std()
+    if pd.isna(std_down) or std_down == 0: threshold = mean_down + 1
+    else: threshold = mean_down + (1.5 * std_down)
+    df_performance["Is_outlier"] = df_performance["Total_downtime_min"] > threshold
+    return df_performance, threshold
+
+def bereken_pareto_periodes(kubus_sel: pd.DataFrame, periode_selectie: str) -> list:
+    """Periode codes in de selectie, nieuwste eerst."""
+    if isinstance(kubus_sel, SqlSelectie): kubus_sel = sql_groep(kubus_sel, [PERIODE_CODE_KOLOM[periode_selectie]])
+    return np.unique(kubus_sel[PERIODE_CODE_KOLOM[periode_selectie]].to_numpy())[::-1].tolist()
+
+def bereken_pareto(kubus_sel: pd.DataFrame, periode_selectie: str, periode_code: int) -> pd.DataFrame:
+    """Top 3 redenen (zonder uitgesloten redenen) in één periode (index 1..3)."""
+    if isinstance(kubus_sel, SqlSelectie): kubus_sel = sql_groep(kubus_sel, [PERIODE_CODE_KOLOM[periode_selectie], "Reden", "Uitgesloten"], f" AND {PERIODE_CODE_KOLOM[periode_selectie]} = ? AND Uitgesloten = 0", (int(periode_code),))
+    df_pareto_period = kubus_sel[kubus_sel[PERIODE_CODE_KOLOM[periode_selectie]].to_numpy() == periode_code]
+    df_pareto_period = df_pareto_period[~df_pareto_period["Uitgesloten"].to_numpy(dtype=bool)] # Filter ook hier (vlag in de kubus)
+    if df_pareto_period.empty: return pd.DataFrame()
+    df_top_reasons = (df_pareto_period.groupby("Reden", observed=True)["Duur_min"].sum().sort_values(ascending=False).head(3).reset_index())
+    df_top_reasons.index = range(1, len(df_top_reasons) + 1)
+    return df_top_reasons
+
+def bereken_rapport(kubus_sel: pd.DataFrame, df_filtered: pd.DataFrame, periode_selectie: str, periode_code: int) -> dict:
+    """Alle tabellen die main() voor één selectie en periode toont, als frames (voor rapport.py)."""
+    kpis = bereken_kpis(kubus_sel)
+    df_performance, threshold = bereken_performance(kubus_sel) if not kubus_sel.empty else (pd.DataFrame(), None)
+    per_dag = bereken_top_orders_per_weekdag(df_filtered) if not df_filtered.empty else {}
+    return {"kerncijfers": pd.DataFrame([{"Totale stilstand (uren)": kpis["totaal_uren"], "Aantal stilstanden": kpis["aantal"], "Langste stilstand (min)": kpis["langste_min"]}]),
+            "pareto": bereken_pareto(kubus_sel, periode_selectie, periode_code).rename_axis("Rang").reset_index() if not kubus_sel.empty else pd.DataFrame(),
+            "performance": df_performance.assign(Drempel_min=threshold) if not df_performance.empty else df_performance,
+            "top_orders": bereken_top_orders(df_filtered).rename_axis("Rang").reset_index() if not df_filtered.empty else pd.DataFrame(),
+            "top_orders_weekdag": pd.concat([df.rename_axis("Rang").reset_index().assign(Weekdag=dag) for dag, df in per_dag.items()], ignore_index=True) if per_dag else pd.DataFrame()}
+
 # === DISPLAY FUNCTIES (Downtime Analyse) ===
 
-def MaakKengetallenZichtbaar(df_filtered: pd.DataFrame):
-    """Toont de Key Performance Indicators (KPIs) in kolommen."""
+@getimed
+def MaakKengetallenZichtbaar(kubus_sel: pd.DataFrame, sleutel: tuple = None):
+    """Toont de Key Performance Indicators (KPIs) in kolommen (uit de rollup kubus)."""
     st.subheader("📈 Kerncijfers") # Emoji kan helpen
+    st.caption(f"{TOEREKENING_KUBUS} Geldt ook voor trend, performance en Pareto.")
     col1, col2, col3 = st.columns(3)
-    if df_filtered.empty:
+    kpis = memo("kpis", sleutel, lambda: bereken_kpis(kubus_sel))
+    if kpis["totaal_uren"] is None:
         col1.metric("Totale stilstand (uren)", "N/A"); col2.metric("Aantal stilstanden", 0); col3.metric("Langste stilstand (min)", "N/A")
     else:
-        total_downtime_hrs = df_filtered["Duur_min"].sum() / 60; col1.metric("Totale stilstand (uren)", f"{total_downtime_hrs:.2f}")
-        col2.metric("Aantal stilstanden", len(df_filtered)); max_stilstand = df_filtered["Duur_min"].max()
-        col3.metric("Langste stilstand (min)", f"{max_stilstand:.1f}" if pd.notna(max_stilstand) else "N/A")
+        col1.metric("Totale stilstand (uren)", f"{kpis['totaal_uren']:.2f}")
+        col2.metric("Aantal stilstanden", kpis["aantal"])
+        col3.metric("Langste stilstand (min)", f"{kpis['langste_min']:.1f}" if kpis["langste_min"] is not None else "N/A")
 
-def display_tabbed_line_analysis(data_om_te_tonen):
-    """Toont per lijn (in tabs) een staafdiagram en een donut+legenda."""
+@getimed
+def display_tabbed_line_analysis(data_om_te_tonen, sleutel: tuple = None):
+    """Toont per lijn (keuze als tabbalk) een staafdiagram en een donut+legenda. Alleen de gekozen lijn wordt getekend."""
     st.subheader("📊 Analyse Stilstandsredenen per Lijn")
-    lijnen_in_data = sorted([w for w in data_om_te_tonen["Workflow"].unique() if w in GEWENSTE_WORKFLOWS])
+    st.caption(TOEREKENING_EVENTS)
+    df_reden_lijn = memo("reden_per_lijn", sleutel, lambda: bereken_reden_per_lijn(data_om_te_tonen))
+    lijnen_in_data = sorted([w for w in df_reden_lijn["Workflow"].unique() if w in GEWENSTE_WORKFLOWS])
     tab_namen = ["Alle lijnen"] + lijnen_in_data
-    tabs = st.tabs(tab_namen)
+    lijn_naam = st.radio("Lijn:", tab_namen, horizontal=True, key="lijn_analyse_tab", label_visibility="collapsed")
     color_sequence = px.colors.qualitative.Plotly
 
-    for i, lijn_naam in enumerate(tab_namen):
-        with tabs[i]:
-            if lijn_naam == "Alle lijnen": data_voor_deze_lijn = data_om_te_tonen
-            else: data_voor_deze_lijn = data_om_te_tonen[data_om_te_tonen["Workflow"] == lijn_naam]
-            if data_voor_deze_lijn.empty: st.caption("Geen data beschikbaar."); continue
-
-            data_gefilterd = data_voor_deze_lijn.copy(); filter_applied_info = []
-            if UITGESLOTEN_REDENEN_KEYWORDS:
-                mask_exclude = pd.Series(False, index=data_gefilterd.index)
-                for keyword in UITGESLOTEN_REDENEN_KEYWORDS: mask_exclude |= data_gefilterd['Reden'].str.contains(keyword, case=False, na=False)
-                rows_before = len(data_gefilterd); data_gefilterd = data_gefilterd[~mask_exclude]; rows_after = len(data_gefilterd)
-                if rows_before > rows_after: filter_applied_info.append(f"{rows_before - rows_after} rijen met '{', '.join(UITGESLOTEN_REDENEN_KEYWORDS)}' verwijderd")
-            if filter_applied_info: st.caption(f"Filter info: {'; '.join(filter_applied_info)}.", help="...")
-
-            if data_gefilterd.empty or data_gefilterd["Duur_min"].sum() < 0.1: st.caption("Geen relevante data na filter."); continue
-
-            df_reason_agg = data_gefilterd.groupby("Reden")["Duur_min"].sum().reset_index()
-            df_reason_agg = df_reason_agg[df_reason_agg['Reden'] != ''].sort_values(by="Duur_min", ascending=False)
-            totaal_duur_relevant = df_reason_agg["Duur_min"].sum()
-            if totaal_duur_relevant > 0: df_reason_agg['percentage_totaal'] = (df_reason_agg['Duur_min'] / totaal_duur_relevant) * 100
-            else: df_reason_agg['percentage_totaal'] = 0.0
-
-            all_reasons_sorted = df_reason_agg['Reden'].tolist()
-            color_map = {reason: color_sequence[i % len(color_sequence)] for i, reason in enumerate(all_reasons_sorted)}
-            overig_label = f'Overige ({max(0, len(df_reason_agg) - TOP_N_IN_DONUT)})'
-            color_map[overig_label] = '#bdbdbd'
-
-            col_bar, col_donut_leg = st.columns(2)
-            with col_bar:
-                st.markdown(f"**Top {TOP_N_IN_BARCHART} Redenen (Staafdiagram)**")
-                df_bar_display = df_reason_agg.head(TOP_N_IN_BARCHART).copy(); df_bar_display['percentage'] = df_bar_display['percentage_totaal']
-                if df_bar_display.empty: st.caption("Geen data.")
+    if lijn_naam is None or df_reden_lijn.empty: st.caption("Geen data beschikbaar."); return
+    df_reason_agg, aantal_uitgesloten = memo("reden_aggregaat", sleutel and sleutel + (lijn_naam,), lambda: bereken_reden_aggregaat(df_reden_lijn, lijn_naam))
+    if aantal_uitgesloten: st.caption(f"Filter info: {aantal_uitgesloten} rijen met '{', '.join(UITGESLOTEN_REDENEN_KEYWORDS)}' verwijderd.", help="...")
+    if df_reason_agg is None: st.caption("Geen relevante data na filter."); return
+    totaal_duur_relevant = df_reason_agg["Duur_min"].sum()
+
+    all_reasons_sorted = df_reason_agg['Reden'].tolist()
+    color_map = {reason: color_sequence[i % len(color_sequence)] for i, reason in enumerate(all_reasons_sorted)}
+    overig_label = f'Overige ({max(0, len(df_reason_agg) - TOP_N_IN_DONUT)})'
+    color_map[overig_label] = '#bdbdbd'
+
+    col_bar, col_donut_leg = st.columns(2)
+    with col_bar:
+        st.markdown(f"**Top {TOP_N_IN_BARCHART} Redenen (Staafdiagram)**")
+        df_bar_display = df_reason_agg.head(TOP_N_IN_BARCHART).copy(); df_bar_display['percentage'] = df_bar_display['percentage_totaal']
+        if df_bar_display.empty: st.caption("Geen data.")
+        else:
+            try:
+                fig_bar = px.bar(df_bar_display, x="Duur_min", y="Reden", orientation='h', labels={"Duur_min": "Duur (min)", "Reden": ""}, text="Duur_min", color="Reden", color_discrete_map=color_map)
+                fig_bar.update_layout(showlegend=False, yaxis={'categoryorder':'total ascending'}, height=max(350, len(df_bar_display) * 28), margin=dict(l=10, r=10, t=10, b=10))
+                fig_bar.update_traces(texttemplate='%{text:.0f}', textposition='outside', hovertemplate="<b>%{y}</b><br>Duur: %{x:.1f} min<br>Percentage: %{customdata[0]:.1f}%<extra></extra>", customdata=df_bar_display[['percentage']])
+                toon_grafiek(fig_bar, "redenen per lijn")
+            except Exception as e: st.error("Kon staafdiagram niet maken."); st.exception(e)
+    with col_donut_leg:
+        st.markdown(f"**Top {TOP_N_IN_DONUT} + Overig (Donut)**")
+        overig_duur = 0.0; df_donut_data = pd.DataFrame()
+        if len(df_reason_agg) > TOP_N_IN_DONUT:
+            df_top_n_donut = df_reason_agg.head(TOP_N_IN_DONUT).copy()
+            if len(df_reason_agg) > TOP_N_IN_DONUT: overig_duur = float(df_reason_agg.iloc[TOP_N_IN_DONUT:]['Duur_min'].sum())
+            if overig_duur > 0.01:
+                df_overig = pd.DataFrame([{'Reden': overig_label, 'Duur_min': overig_duur}])
+                if isinstance(df_top_n_donut, pd.DataFrame) and isinstance(df_overig, pd.DataFrame):
+                   try: df_donut_data = pd.concat([df_top_n_donut, df_overig], ignore_index=True)
+                   except ValueError as ve: st.error(f"Concat Fout: {ve}"); df_donut_data = df_top_n_donut
+                else: df_donut_data = df_top_n_donut
+            else: df_donut_data = df_top_n_donut
+        else: df_donut_data = df_reason_agg.copy()
+
+        if not df_donut_data.empty and totaal_duur_relevant > 0:
+            df_donut_data['percentage'] = (df_donut_data['Duur_min'] / totaal_duur_relevant) * 100
+            top_3_legenda = df_reason_agg.head(3).copy()
+            try:
+                fig_donut = px.pie(df_donut_data, names="Reden", values="Duur_min", hole=0.45, color="Reden", color_discrete_map=color_map)
+                fig_donut.update_traces(textinfo='percent', textfont_size=11, hovertemplate = "<b>%{label}</b><br>Duur: %{value:.1f} min<br>Percentage: %{percent:.1%}<extra></extra>")
+                fig_donut.update_layout(showlegend=False, margin=dict(l=10, r=10, t=10, b=10), height=250)
+                toon_grafiek(fig_donut, "top redenen donut")
+                st.markdown("**Top 3 Details:**")
+                if top_3_legenda.empty: st.caption("Geen top redenen.")
                 else:
-                    try:
-                        fig_bar = px.bar(df_bar_display, x="Duur_min", y="Reden", orientation='h', labels={"Duur_min": "Duur (min)", "Reden": ""}, text="Duur_min", color="Reden", color_discrete_map=color_map)
-                        fig_bar.update_layout(showlegend=False, yaxis={'categoryorder':'total ascending'}, height=max(350, len(df_bar_display) * 28), margin=dict(l=10, r=10, t=10, b=10))
-                        fig_bar.update_traces(texttemplate='%{text:.0f}', textposition='outside', hovertemplate="<b>%{y}</b><br>Duur: %{x:.1f} min<br>Percentage: %{customdata[0]:.1f}%<extra></extra>", customdata=df_bar_display[['percentage']])
-                        st.plotly_chart(fig_bar, use_container_width=True)
-                    except Exception as e: st.error("Kon staafdiagram niet maken."); st.exception(e)
-            with col_donut_leg:
-                st.markdown(f"**Top {TOP_N_IN_DONUT} + Overig (Donut)**")
-                overig_duur = 0.0; df_donut_data = pd.DataFrame()
-                if len(df_reason_agg) > TOP_N_IN_DONUT:
-                    df_top_n_donut = df_reason_agg.head(TOP_N_IN_DONUT).copy()
-                    if len(df_reason_agg) > TOP_N_IN_DONUT: overig_duur = float(df_reason_agg.iloc[TOP_N_IN_DONUT:]['Duur_min'].sum())
-                    if overig_duur > 0.01:
-                        df_overig = pd.DataFrame([{'Reden': overig_label, 'Duur_min': overig_duur}])
-                        if isinstance(df_top_n_donut, pd.DataFrame) and isinstance(df_overig, pd.DataFrame):
-                           try: df_donut_data = pd.concat([df_top_n_donut, df_overig], ignore_index=True)
-                           except ValueError as ve: st.error(f"Concat Fout: {ve}"); df_donut_data = df_top_n_donut
-                        else: df_donut_data = df_top_n_donut
-                    else: df_donut_data = df_top_n_donut
-                else: df_donut_data = df_reason_agg.copy()
-
-                if not df_donut_data.empty and totaal_duur_relevant > 0:
-                    df_donut_data['percentage'] = (df_donut_data['Duur_min'] / totaal_duur_relevant) * 100
-                    top_3_legenda = df_reason_agg.head(3).copy()
-                    try:
-                        fig_donut = px.pie(df_donut_data, names="Reden", values="Duur_min", hole=0.45, color="Reden", color_discrete_map=color_map)
-                        fig_donut.update_traces(textinfo='percent', textfont_size=11, hovertemplate = "<b>%{label}</b><br>Duur: %{value:.1f} min<br>Percentage: %{percent:.1%}<extra></extra>")
-                        fig_donut.update_layout(showlegend=False, margin=dict(l=10, r=10, t=10, b=10), height=250)
-                        st.plotly_chart(fig_donut, use_container_width=True)
-                        st.markdown("**Top 3 Details:**")
-                        if top_3_legenda.empty: st.caption("Geen top redenen.")
-                        else:
-                            for idx in range(len(top_3_legenda)):
-                                 row = top_3_legenda.iloc[idx]; color = color_map.get(row['Reden'], '#808080'); display_reden = row['Reden'][:30] + '...' if len(row['Reden']) > 30 else row['Reden']
-                                 st.markdown(f"<div style='margin-bottom: 4px; text-align: left;' title='{row['Reden']}'><span style='display: inline-block; width: 10px; height: 10px; background-color: {color}; margin-right: 5px; vertical-align: middle; border: 1px solid #ccc;'></span><span style='font-size: 0.9em; vertical-align: middle;'><b>{display_reden}</b></span><br><span style='font-size: 0.8em; padding-left: 15px;'>{row['percentage_totaal']:.1f}% ({row['Duur_min']:.0f} min)</span></div>", unsafe_allow_html=True)
-                    except Exception as e: st.error("Kon donut/legenda niet maken."); st.exception(e)
-                else: st.caption("Geen data voor donut.")
-
-def display_period_analysis(df_filtered: pd.DataFrame, periode_selectie: str):
-     """Toont de totale stilstand gegroepeerd per geselecteerde periode."""
+                    for idx in range(len(top_3_legenda)):
+                         row = top_3_legenda.iloc[idx]; color = color_map.get(row['Reden'], '#808080'); display_reden = row['Reden'][:30] + '...' if len(row['Reden']) > 30 else row['Reden']
+                         st.markdown(f"<div style='margin-bottom: 4px; text-align: left;' title='{row['Reden']}'><span style='display: inline-block; width: 10px; height: 10px; background-color: {color}; margin-right: 5px; vertical-align: middle; border: 1px solid #ccc;'></span><span style='font-size: 0.9em; vertical-align: middle;'><b>{display_reden}</b></span><br><span style='font-size: 0.8em; padding-left: 15px;'>{row['percentage_totaal']:.1f}% ({row['Duur_min']:.0f} min)</span></div>", unsafe_allow_html=True)
+            except Exception as e: st.error("Kon donut/legenda niet maken."); st.exception(e)
+        else: st.caption("Geen data voor donut.")
+
+@getimed
+def display_period_analysis(kubus_sel: pd.DataFrame, periode_selectie: str, sleutel: tuple = None):
+     """Toont de totale stilstand gegroepeerd per geselecteerde periode (dagen uit de kubus opgerold)."""
      st.subheader(f"📆 Trend Niet-geplande stilstand")
-     df_analysis = df_filtered.copy()
-     try:
-          if periode_selectie == "Dag": df_analysis["Periode"] = df_analysis["Starttijd_dt"].dt.strftime("%Y-%m-%d")
-          elif periode_selectie == "Week": df_analysis["Periode"] = df_analysis["Starttijd_dt"].dt.strftime('%Y-W%V')
-          else: df_analysis["Periode"] = df_analysis["Starttijd_dt"].dt.to_period("M").astype(str)
-     except AttributeError as ae: st.error(f"Fout bij bepalen periode: {ae}"); return
-     df_tijd = df_analysis.groupby("Periode")["Duur_min"].sum().reset_index()
+     df_tijd = memo("periode_trend", sleutel and sleutel + (periode_selectie,), lambda: bereken_periode_trend(kubus_sel, periode_selectie))
      if df_tijd.empty: st.caption(f"Geen data per {periode_selectie.lower()}."); return
-     df_tijd = df_tijd.sort_values("Periode")
      try:
           fig_tijd = px.bar(df_tijd, x="Periode", y="Duur_min", title=f"Totale Stilstand (min) per {periode_selectie.lower()}", labels={"Duur_min": "Stilstand (min)"})
           if len(df_tijd) > 15: fig_tijd.update_xaxes(tickangle=45)
-          st.plotly_chart(fig_tijd, use_container_width=True)
+          toon_grafiek(fig_tijd, "periode trend")
      except Exception as e: st.error(f"Kon periode grafiek niet maken."); st.exception(e)
 
-def display_order_analysis(df_filtered: pd.DataFrame):
+@getimed
+def display_order_analysis(df_filtered: pd.DataFrame, sleutel: tuple = None):
     """Toont analyses gerelateerd aan orders uit downtime data."""
     st.subheader("📦 Analyse per Order (Downtime)")
     if df_filtered.empty: st.caption("Geen data."); return
+    st.caption(TOEREKENING_EVENTS)
 
     st.markdown("**Top 3 Orders (Totale Stilstand):**")
     try:
-        df_order_downtime = (df_filtered.groupby("Ordernummer")["Duur_min"].sum().sort_values(ascending=False).head(3).reset_index())
+        df_order_downtime = memo("top_orders", sleutel, lambda: bereken_top_orders(df_filtered))
         if not df_order_downtime.empty:
-             df_order_downtime.index = range(1, len(df_order_downtime) + 1)
              st.dataframe(df_order_downtime.rename(columns={"Duur_min": "Totale Stilstand (min)"}), use_container_width=True, column_config={"Totale Stilstand (min)": st.column_config.NumberColumn(format="%.1f")})
              top_orders_list = df_order_downtime["Ordernummer"].tolist()
         else: st.caption("Geen orders gevonden."); top_orders_list = []
@@ -304,12 +1606,8 @@ def display_order_analysis(df_filtered: pd.DataFrame):
     if not top_orders_list: st.caption("Geen top orders gevonden.")
     else:
         try:
-            df_top_events = df_filtered[df_filtered["Ordernummer"].isin(top_orders_list)].copy()
-            if not df_top_events.empty:
-                 idx = df_top_events.loc[df_top_events.groupby("Ordernummer")["Duur_min"].idxmax()].index
-                 df_longest_events = df_top_events.loc[idx]
-                 df_longest_display = df_longest_events[["Ordernummer", "Starttijd_dt", "Stoptijd_dt", "Duur_min", "Reden"]].copy()
-                 df_longest_display.rename(columns={"Starttijd_dt": "Start", "Stoptijd_dt": "Stop", "Duur_min": "Duur (min)"}, inplace=True)
+            df_longest_display = memo("langste_stilstanden", sleutel, lambda: bereken_langste_stilstanden(df_filtered, top_orders_list))
+            if not df_longest_display.empty:
                  st.dataframe(df_longest_display, use_container_width=True, column_config={"Start": st.column_config.DatetimeColumn(format="DD-MM-YY HH:mm"), "Stop": st.column_config.DatetimeColumn(format="DD-MM-YY HH:mm"), "Duur (min)": st.column_config.NumberColumn(format="%.1f")})
             else: st.caption("Geen stilstanden voor top 3 orders.")
         except Exception as e: st.error("Berekening mislukt."); st.exception(e)
@@ -317,55 +1615,37 @@ def display_order_analysis(df_filtered: pd.DataFrame):
     st.markdown("---")
     st.markdown("**Top 3 Orders per Werkdag (Ma-Vr):**")
     try:
-        df_daily_analysis = df_filtered.copy()
-        if 'Starttijd_dt' not in df_daily_analysis.columns: st.error("'Starttijd_dt' kolom mist."); return
-        weekday_map = {0: 'Maandag', 1: 'Dinsdag', 2: 'Woensdag', 3: 'Donderdag', 4: 'Vrijdag'}
-        df_daily_analysis['Weekdag'] = df_daily_analysis['Starttijd_dt'].dt.weekday.map(weekday_map)
-        if 'Weekdag' in df_daily_analysis.columns:
-             df_daily_analysis = df_daily_analysis[df_daily_analysis['Starttijd_dt'].dt.weekday < 5]
-             werkdagen = ['Maandag', 'Dinsdag', 'Woensdag', 'Donderdag', 'Vrijdag']
-             for dag in werkdagen:
-                 df_dag = df_daily_analysis[df_daily_analysis['Weekdag'] == dag]
-                 if df_dag.empty: continue
-                 st.markdown(f"**{dag}:**")
-                 df_top_dag = (df_dag.groupby('Ordernummer')['Duur_min'].sum().sort_values(ascending=False).head(3).reset_index())
-                 if df_top_dag.empty: st.caption("Geen data."); continue
-                 df_reason_order = (df_dag.groupby(['Ordernummer', 'Reden'])['Duur_min'].sum().reset_index())
-                 if not df_reason_order.empty:
-                      idx_res = df_reason_order.loc[df_reason_order.groupby('Ordernummer')['Duur_min'].idxmax()]
-                      df_top_reason = idx_res[['Ordernummer', 'Reden']]
-                      df_top_dag = df_top_dag.merge(df_top_reason, on='Ordernummer', how='left')
-                 else: df_top_dag['Reden'] = 'N/A'
-                 df_top_dag['Totale stilstand (uur)'] = (df_top_dag['Duur_min'] / 60)
-                 df_top_dag.index = range(1, len(df_top_dag) + 1)
-                 st.dataframe(df_top_dag[["Ordernummer", "Reden", "Duur_min", "Totale stilstand (uur)"]], use_container_width=True, column_config={"Duur_min": st.column_config.NumberColumn("Minuten", format="%.1f"), "Totale stilstand (uur)": st.column_config.NumberColumn("Uren", format="%.2f")})
-        else: st.error("Kon 'Weekdag' kolom niet maken.")
+        for dag, df_top_dag in memo("top_orders_weekdag", sleutel, lambda: bereken_top_orders_per_weekdag(df_filtered)).items():
+            st.markdown(f"**{dag}:**")
+            if df_top_dag.empty: st.caption("Geen data."); continue
+            st.dataframe(df_top_dag, use_container_width=True, column_config={"Duur_min": st.column_config.NumberColumn("Minuten", format="%.1f"), "Totale stilstand (uur)": st.column_config.NumberColumn("Uren", format="%.2f")})
     except Exception as e: st.error("Analyse per werkdag mislukt."); st.exception(e)
 
-def display_performance_outliers(df_filtered: pd.DataFrame):
-    """ Toont dagelijkse performance grafiek en detecteert outliers."""
+@getimed
+def display_performance_outliers(kubus_sel: pd.DataFrame, sleutel: tuple = None, df_uitschieters: pd.DataFrame = None):
+    """ Toont dagelijkse performance grafiek en detecteert outliers (uit de rollup kubus).
+
+    De uitschieters t.o.v. de basislijn staan los daarvan: die hangen niet af van het aantal geselecteerde dagen, dus ze
+    worden ook getoond bij één dag of een lege selectie.
+    """
     st.subheader("⏱️ Performance & Uitschieters (Dagelijks)")
-    if df_filtered.empty: st.caption("Geen data."); return
+    if kubus_sel.empty: st.caption("Geen data.")
+    else: display_dagelijkse_performance(kubus_sel, sleutel)
+    if df_uitschieters is not None: display_robuuste_uitschieters(df_uitschieters)
+
+def display_dagelijkse_performance(kubus_sel: pd.DataFrame, sleutel: tuple = None):
+    """Performance grafiek en uitschieters t.o.v. gemiddelde + 1.5 * std over de geselecteerde dagen."""
     try:
-        if 'Starttijd_dt' not in df_filtered.columns: st.error("'Starttijd_dt' kolom mist."); return
-        df_daily = df_filtered.copy()
-        df_daily["Dag"] = df_daily["Starttijd_dt"].dt.strftime("%Y-%m-%d")
-        df_performance = df_daily.groupby("Dag")["Duur_min"].sum().reset_index()
-        df_performance.rename(columns={"Duur_min": "Total_downtime_min"}, inplace=True)
-        df_performance["Performance (%)"] = (100 * (1 - (df_performance["Total_downtime_min"] / PERFORMANCE_SHIFT_MINUTES))).clip(lower=0)
+        df_performance, threshold = memo("performance", sleutel, lambda: bereken_performance(kubus_sel))
 
         st.markdown("**Performance over tijd:**"); st.caption(f"Gebaseerd op vaste shift van {PERFORMANCE_SHIFT_MINUTES / 60:.1f} uur.")
         if df_performance.empty: st.caption("Geen data."); return
         fig_perf = px.line(df_performance.sort_values("Dag"), x="Dag", y="Performance (%)", markers=True, title="Performance over tijd (%)")
         fig_perf.update_layout(yaxis_range=[0, 105])
-        st.plotly_chart(fig_perf, use_container_width=True)
+        toon_grafiek(fig_perf, "performance")
 
         st.markdown("---"); st.markdown("**Uitschieters in dagelijkse stilstand:**")
-        if len(df_performance) < 2: st.caption("Te weinig data."); return
-        mean_down = df_performance["Total_downtime_min"].mean(); std_down  = df_performance["Total_downtime_min"].std()
-        if pd.isna(std_down) or std_down == 0: threshold = mean_down + 1
-        else: threshold = mean_down + (1.5 * std_down)
-        df_performance["Is_outlier"] = df_performance["Total_downtime_min"] > threshold
+        if threshold is None: st.caption("Te weinig data."); return
         df_outliers = df_performance[df_performance["Is_outlier"]].copy()
 
         st.caption(f"Drempel: > {threshold:.1f} min stilstand (gem + 1.5 * std dev).")
@@ -377,34 +1657,35 @@ def display_performance_outliers(df_filtered: pd.DataFrame):
                          column_config={"Total_downtime_min": st.column_config.NumberColumn("Minuten", format="%.1f"), "Uren Stilstand": st.column_config.NumberColumn(format="%.2f"), "Performance (%)": st.column_config.NumberColumn(format="%.1f%%")})
     except Exception as e: st.error("Performance analyse mislukt."); st.exception(e)
 
-def display_pareto_analysis(df_filtered: pd.DataFrame, periode_selectie: str, workflow_select: str):
-    """ Toont een Pareto analyse (Top 3 tabel) voor een geselecteerde periode. """
-    st.subheader(f"🔎 Pareto Top 3 Redenen per {periode_selectie}")
-    if df_filtered.empty: st.caption("Geen data."); return
+def display_robuuste_uitschieters(df_uitschieters: pd.DataFrame):
+    """Uitschieters uit de incrementele mediaan/MAD vensters (zie UITSCHIETERS), per lijn en per reden."""
+    st.markdown("---"); st.markdown("**Uitschieters t.o.v. de eigen basislijn (per lijn en reden):**")
+    st.caption(f"Dagtotaal > mediaan + {UITSCHIETER_K} x MAD (x1.4826, minimaal {UITSCHIETER_MIN_SPREIDING:.0f} min) van de "
+               f"{UITSCHIETER_VENSTER_DAGEN} productiedagen ervoor. Score = aantal spreidingen boven de mediaan. Voorlopig: dag is nog niet om.")
+    if df_uitschieters.empty: st.success("✅ Geen uitschieters t.o.v. de basislijn in deze periode."); return
     try:
-        df_pareto_base = df_filtered.copy()
-        try:
-             if periode_selectie == "Dag": df_pareto_base["Periode"] = df_pareto_base["Starttijd_dt"].dt.strftime("%Y-%m-%d")
-             elif periode_selectie == "Week": df_pareto_base["Periode"] = df_pareto_base["Starttijd_dt"].dt.strftime('%Y-W%V')
-             else: df_pareto_base["Periode"] = df_pareto_base["Starttijd_dt"].dt.to_period("M").astype(str)
-        except AttributeError as ae: st.error(f"Fout bij bepalen periode: {ae}"); return
+        totalen = df_uitschieters["Reden"] == ALLE_REDENEN
+        st.warning(f"🚨 {int(totalen.sum())} lijn-dag(en) en {int((~totalen).sum())} reden-dag(en) boven de basislijn:")
+        st.dataframe(uitschieter_tabel(df_uitschieters), hide_index=True, use_container_width=True,
+                     column_config={k: st.column_config.NumberColumn(format="%.1f") for k in ["Stilstand (min)", "Mediaan (min)", "Drempel (min)", "Score"]})
+    except Exception as e: st.error("Uitschieters t.o.v. de basislijn konden niet getoond worden."); st.exception(e)
 
-        periodes = sorted(df_pareto_base["Periode"].unique(), reverse=True)
+@getimed
+def display_pareto_analysis(kubus_sel: pd.DataFrame, periode_selectie: str, workflow_select: str, sleutel: tuple = None):
+    """ Toont een Pareto analyse (Top 3 tabel) voor een geselecteerde periode (uit de rollup kubus). """
+    st.subheader(f"🔎 Pareto Top 3 Redenen per {periode_selectie}")
+    if kubus_sel.empty: st.caption("Geen data."); return
+    try:
+        periode_sleutel = sleutel and sleutel + (periode_selectie,)
+        periodes = memo("pareto_periodes", periode_sleutel, lambda: bereken_pareto_periodes(kubus_sel, periode_selectie))
         if not periodes: st.caption("Geen periodes gevonden."); return
-        selected_periode = st.selectbox(f"Kies {periode_selectie.lower()} voor Pareto:", periodes, key="pareto_period_select")
+        selected_code = st.selectbox(f"Kies {periode_selectie.lower()} voor Pareto:", periodes, format_func=lambda code: periode_label(code, periode_selectie), key="pareto_period_select")
+        selected_periode = periode_label(selected_code, periode_selectie) if selected_code is not None else None
 
         if selected_periode:
-            df_pareto_period = df_pareto_base[df_pareto_base["Periode"] == selected_periode]
-            if UITGESLOTEN_REDENEN_KEYWORDS: # Filter ook hier
-                mask_exclude = pd.Series(False, index=df_pareto_period.index)
-                for keyword in UITGESLOTEN_REDENEN_KEYWORDS: mask_exclude |= df_pareto_period['Reden'].str.contains(keyword, case=False, na=False)
-                df_pareto_period = df_pareto_period[~mask_exclude]
-            if df_pareto_period.empty: st.caption(f"Geen relevante data voor {selected_periode} (na filter)."); return
-
-            df_top_reasons = (df_pareto_period.groupby("Reden")["Duur_min"].sum().sort_values(ascending=False).head(3).reset_index())
-            if df_top_reasons.empty: st.caption(f"Geen top redenen voor {selected_periode}.")
+            df_top_reasons = memo("pareto", periode_sleutel and periode_sleutel + (selected_code,), lambda: bereken_pareto(kubus_sel, periode_selectie, selected_code))
+            if df_top_reasons.empty: st.caption(f"Geen relevante data voor {selected_periode} (na filter).")
             else:
-                 df_top_reasons.index = range(1, len(df_top_reasons) + 1)
                  st.markdown(f"**Top 3 Redenen ({workflow_select}) in {selected_periode}:**")
                  st.dataframe(df_top_reasons.rename(columns={"Duur_min":"Totaal Minuten"}), use_container_width=True, column_config={"Totaal Minuten": st.column_config.NumberColumn(format="%.1f")})
         else: st.caption("Selecteer een periode.")
@@ -412,19 +1693,59 @@ def display_pareto_analysis(df_filtered: pd.DataFrame, periode_selectie: str, wo
 
 # === HOOFD APPLICATIE LOGICA ===
 def main():
-    """Hoofdfunctie die de applicatie runt."""
+    """Hoofdfunctie die de applicatie runt, met per rerun de stap timings (zie INSTRUMENTATIE)."""
+    start_rerun()
+    profiler = start_profiel() if st.session_state.pop("debug_profileer_rerun", False) else None
+    debug = loggen = False
+    try: debug, loggen = toon_dashboard()
+    finally:
+        if profiler is not None: st.session_state["debug_profiel"] = stop_profiel(profiler)
+        stappen, totaal_ms = rond_rerun_af(loggen)
+        if debug: toon_timings(stappen, totaal_ms)
+
+def toon_dashboard() -> tuple:
+    """Het dashboard zelf. Geeft de debug instellingen (debug, timings loggen) uit de sidebar terug."""
+    # === PAGE CONFIG === (in main, zodat dashboard.py zonder Streamlit sessie te importeren is, zie rapport.py)
+    st.set_page_config(page_title="Interfilling OEE Analyse", layout="wide")
+
+    # === HEADER ===
+    st.title("📊 Interfilling Dashboard") # Algemenere titel?
+    st.caption("Dashboard door www.proces360.com | rob@proces360.com")
+    st.markdown("---")
+
     # Laad beide datasets aan het begin (als ze bestaan)
-    df_downtime_raw = load_data(DATA_PATH_DOWNTIME)
-    df_orders_raw = load_order_data(DATA_PATH_ORDER) # Nieuwe laadfunctie aanroepen
+    pad_downtime = DATA_DIR_DOWNTIME if os.path.isdir(DATA_DIR_DOWNTIME) else DATA_PATH_DOWNTIME
+    if SQL_BACKEND: # Alleen een overzicht in geheugen; selecties en aggregaties gaan als SQL naar de database
+        with stap("load_sql_database"): db = load_sql_database(pad_downtime)
+        with stap("sql_overzicht") as info: df_downtime_raw = sql_overzicht(db); df_downtime_raw.attrs["versie"] = db["versie"]; info["rijen"] = len(df_downtime_raw)
+        with stap("sql_order_lijnen") as info: df_orders_raw = sql_order_lijnen(db); info["rijen"] = len(df_orders_raw)
+    else:
+        db = None
+        with stap("load_data") as info: dataset = huidige_dataset(pad_downtime); df_downtime_raw = dataset["events"]; info["rijen"] = len(df_downtime_raw)
+        with stap("load_order_data") as info: df_orders_raw = load_order_data(DATA_PATH_ORDER); info["rijen"] = len(df_orders_raw) # Nieuwe laadfunctie aanroepen
 
     # Maak sidebar (heeft nu beide dataframes nodig voor filters)
     dashboard_choice, workflow_select, date_range, periode_selectie, apply_shift_filter, selected_order_line = create_sidebar(df_downtime_raw, df_orders_raw)
+    if LIVE_TAIL_INTERVAL_S and db is None:
+        with st.sidebar: display_live_status(pad_downtime)
+    debug_instellingen = display_debug_panel()
+    rerun_info(dashboard=dashboard_choice, workflow=workflow_select, periode=periode_selectie, shift=apply_shift_filter,
+               datum=[str(d) for d in date_range] if date_range else None, order_lijn=selected_order_line)
 
     # --- Downtime Analyse Dashboard ---
     if dashboard_choice == "Downtime Analyse":
-        if df_downtime_raw.empty: st.warning("Kan Downtime Analyse niet tonen: geen downtime data geladen."); return # Check of data er is
-        if not date_range or len(date_range) != 2: st.error("Selecteer een geldig datumbereik."); st.stop(); return
-        df_filtered = filter_data(df_downtime_raw, workflow_select, date_range, apply_shift_filter)
+        if df_downtime_raw.empty: st.warning("Kan Downtime Analyse niet tonen: geen downtime data geladen."); return debug_instellingen # Check of data er is
+        if not date_range or len(date_range) != 2: st.error("Selecteer een geldig datumbereik."); st.stop(); return debug_instellingen
+        sleutel = view_sleutel(df_downtime_raw.attrs.get("versie"), workflow_select, date_range, apply_shift_filter)
+        if db is not None:
+            df_filtered = sql_selectie(db, "events", workflow_select, date_range, apply_shift_filter)
+            kubus_sel = sql_selectie(db, "kubus", workflow_select, date_range, apply_shift_filter)
+        else:
+            df_filtered = memo("filter_data", sleutel, lambda: filter_data(df_downtime_raw, workflow_select, date_range, apply_shift_filter))
+            kubus_sel = memo("filter_kubus", sleutel, lambda: filter_kubus(dataset["kubus"], workflow_select, date_range, apply_shift_filter))
+
+        df_uitschieters = memo("uitschieters", (df_downtime_raw.attrs.get("versie"),), # Per dataset versie één keer bijwerken (alleen nieuwe dagen)
+                               lambda: uitschieters_frame(werk_uitschieters_bij(db if db is not None else dataset["kubus"], uitschieter_pad(pad_downtime))))
 
         st.header(f"Downtime Analyse: {workflow_select}") # Aangepaste header
         date_info = f"Periode: {date_range[0].strftime('%d-%m-%Y')} tot {date_range[1].strftime('%d-%m-%Y')}"
@@ -433,22 +1754,22 @@ def main():
 
         if df_filtered.empty: st.warning("Geen downtime data gevonden voor de geselecteerde filters.")
         else:
-            MaakKengetallenZichtbaar(df_filtered); st.markdown("---")
-            display_tabbed_line_analysis(df_filtered); st.markdown("---")
-            display_period_analysis(df_filtered, periode_selectie); st.markdown("---")
-            display_order_analysis(df_filtered); st.markdown("---") # Order analyse (op downtime data)
-            display_performance_outliers(df_filtered); st.markdown("---") # Performance (op downtime data)
-            display_pareto_analysis(df_filtered, periode_selectie, workflow_select); st.markdown("---") # Pareto (op downtime data)
+            MaakKengetallenZichtbaar(kubus_sel, sleutel); st.markdown("---")
+            display_tabbed_line_analysis(df_filtered, sleutel); st.markdown("---")
+            display_period_analysis(kubus_sel, periode_selectie, sleutel); st.markdown("---")
+            display_order_analysis(df_filtered, sleutel); st.markdown("---") # Order analyse (op downtime data)
+            display_performance_outliers(kubus_sel, sleutel, selecteer_uitschieters(df_uitschieters, workflow_select, date_range, apply_shift_filter)); st.markdown("---") # Performance (op rollup kubus + uitschieters)
+            display_pareto_analysis(kubus_sel, periode_selectie, workflow_select, sleutel); st.markdown("---") # Pareto (op rollup kubus)
 
     # --- Order Target Calculator ---
     elif dashboard_choice == "Order Target Calculator":
         st.header("🕒 Order Target Calculator") # Aangepaste header
-        if df_orders_raw.empty: st.warning(f"Kan Order Calculator niet tonen: Kon bestand '{DATA_PATH_ORDER}' niet laden of het is leeg."); return
+        if df_orders_raw.empty: st.warning(f"Kan Order Calculator niet tonen: Kon bestand '{DATA_PATH_ORDER}' niet laden of het is leeg."); return debug_instellingen
 
         # Filter order data op geselecteerde lijn (uit sidebar)
-        df_orders_filtered = df_orders_raw.copy()
+        df_orders_filtered = sql_orders(db, selected_order_line) if db is not None else df_orders_raw.copy() # SQL: lijn filter en target in de query
         if selected_order_line and selected_order_line != "Alle lijnen":
-            df_orders_filtered = df_orders_filtered[df_orders_filtered['Line'] == selected_order_line]
+            if db is None: df_orders_filtered = df_orders_filtered[df_orders_filtered['Line'] == selected_order_line]
             st.caption(f"Filters: Lijn = {selected_order_line}")
         else:
              st.caption(f"Filters: Alle lijnen")
@@ -465,24 +1786,38 @@ def main():
                         st.error("Effective capacity moet groter dan 0 zijn.")
                   else:
                         df_orders_filtered['Target_Time_Min'] = df_orders_filtered['Quantity'] / EFFECTIVE_CAPACITY
+                        # Koppel stilstand aan de orders (ordernummer, anders lijn + tijd) voor de performance per order
+                        df_orders_filtered = memo("order_koppeling", (df_downtime_raw.attrs.get("versie"), selected_order_line),
+                                                  lambda: bereken_order_koppeling(df_orders_filtered, db if db is not None else df_downtime_raw))
 
                         st.write(f"**Standaard effective capacity:** {EFFECTIVE_CAPACITY} stuks/minuut")
                         st.markdown("---")
 
                         # Toon Tabel
                         st.subheader("Berekende Target Tijden")
-                        display_df_orders = df_orders_filtered[['Line', 'WO #', 'Item', 'Quantity', 'Target_Time_Min']].copy()
-                        display_df_orders.rename(columns={'Quantity': 'Order Aantal', 'Target_Time_Min': 'Target Tijd (min)'}, inplace=True)
+                        display_df_orders = df_orders_filtered[['Line', 'WO #', 'Item', 'Quantity', 'Target_Time_Min', 'Downtime_min', 'Stops', 'Performance (%)', 'Koppeling']].copy()
+                        display_df_orders.rename(columns={'Quantity': 'Order Aantal', 'Target_Time_Min': 'Target Tijd (min)', 'Downtime_min': 'Stilstand (min)'}, inplace=True)
+                        aantal_gekoppeld = int((df_orders_filtered['Koppeling'] != "Geen").sum())
+                        st.caption(f"{aantal_gekoppeld} van {len(df_orders_filtered)} orders gekoppeld aan stilstand. Performance = target tijd / (target tijd + stilstand).")
                         st.dataframe(display_df_orders, use_container_width=True, column_config={
-                             "Target Tijd (min)": st.column_config.NumberColumn(format="%.1f")
+                             "Target Tijd (min)": st.column_config.NumberColumn(format="%.1f"),
+                             "Stilstand (min)": st.column_config.NumberColumn(format="%.1f"),
+                             "Performance (%)": st.column_config.NumberColumn(format="%.1f%%")
                         })
 
                         st.markdown("---")
                         # Toon Scatter Plot
                         st.subheader("Visualisatie Aantal vs Targettijd")
-                        if len(df_orders_filtered) > 1000:
-                              st.info("Te veel datapunten (>1000) om scatter plot interactief te tonen. Overweeg kortere periode of specifieke lijn.")
-                              # Optioneel: sample tonen? fig_order = px.scatter(df_orders_filtered.sample(1000), ...)
+                        if len(df_orders_filtered) > ORDER_SCATTER_MAX_PUNTEN: # Gebind op de server: begrensde grafiek i.p.v. alle punten naar de browser
+                              df_bins = memo("order_bins", (df_downtime_raw.attrs.get("versie"), selected_order_line), lambda: bin_orders(df_orders_filtered, 'Quantity', 'Target_Time_Min', 'Line'))
+                              st.caption(f"{len(df_orders_filtered)} orders samengevat in {len(df_bins)} cellen ({ORDER_SCATTER_BINS}x{ORDER_SCATTER_BINS} raster per lijn); grootte = aantal orders.")
+                              fig_order = px.scatter(
+                                  df_bins, x='Quantity', y='Target_Time_Min', size='Aantal',
+                                  color='Line', hover_data=['Aantal'],
+                                  labels={'Quantity': 'Order Aantal', 'Target_Time_Min': 'Target Tijd (min)', 'Aantal': 'Orders'},
+                                  title="Order Aantal versus Berekende Targettijd (gebind)"
+                              )
+                              toon_grafiek(fig_order, "order scatter gebind")
                         else:
                               fig_order = px.scatter(
                                   df_orders_filtered, x='Quantity', y='Target_Time_Min',
@@ -490,7 +1825,7 @@ def main():
                                   labels={'Quantity': 'Order Aantal', 'Target_Time_Min': 'Target Tijd (min)'},
                                   title="Order Aantal versus Berekende Targettijd"
                               )
-                              st.plotly_chart(fig_order, use_container_width=True)
+                              toon_grafiek(fig_order, "order scatter")
 
              except ZeroDivisionError:
                    st.error("Fout: Deling door nul bij berekenen Target Tijd (Effective Capacity mag geen 0 zijn).")
@@ -501,6 +1836,7 @@ def main():
     # === FOOTER ===
     st.markdown("---")
     st.info("Einde dashboard. Vragen? Neem contact op met rob@proces360.com")
+    return debug_instellingen
 
 # === RUN DE APP ===
 if __name__ == "__main__":
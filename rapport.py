@@ -0,0 +1,129 @@
+"""Rapporten zonder browser: dezelfde kerncijfers, Pareto top 3, dagelijkse performance/uitschieters en top orders
+per werkdag als het dashboard, voor elke workflow x periode in één run (bv. elke nacht via de taakplanner).
+
+Gebruik: python rapport.py [--periode Week] [--formaat html csv parquet] [--uit rapporten] [--workers 4] [--alle-tijden]
+"""
+import argparse
+import datetime
+import html
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from dashboard import (DATA_DIR_DOWNTIME, DATA_PATH_DOWNTIME, GEWENSTE_WORKFLOWS, PERIODE_CODE_KOLOM, pa,
+                       bereken_rapport, laad_dataset, periode_codes, periode_label, uitschieter_pad, uitschieter_tabel,
+                       uitschieters_frame, werk_uitschieters_bij)
+
+# === CONSTANTEN ===
+RAPPORT_DIR = "rapporten"
+RAPPORT_SOORTEN = ["kerncijfers", "pareto", "performance", "uitschieters", "top_orders", "top_orders_weekdag"]
+RAPPORT_TITELS = {"kerncijfers": "Kerncijfers", "pareto": "Pareto Top 3 Redenen", "performance": "Performance & Uitschieters (Dagelijks)",
+                  "uitschieters": "Uitschieters t.o.v. de Basislijn (Mediaan/MAD, per Lijn en Reden)",
+                  "top_orders": "Top 3 Orders (Totale Stilstand)", "top_orders_weekdag": "Top 3 Orders per Werkdag (Ma-Vr)"}
+
+# === TAKEN ===
+def rapport_taken(dataset: dict, periode_selectie: str, apply_shift_filter: bool) -> list:
+    """Splitst events en kubus per (workflow, periode) en per periode voor "Alle lijnen": [(workflow, code, kubus_sel, df_sel)].
+
+    Zelfde selectie als filter_data/filter_kubus in het dashboard, maar met één groupby per frame i.p.v. een filter per rapport.
+    """
+    df, kubus = dataset["events"], dataset["kubus"]
+    df = df[df["Workflow"].isin(GEWENSTE_WORKFLOWS).to_numpy()]; kubus = kubus[kubus["Workflow"].isin(GEWENSTE_WORKFLOWS).to_numpy()]
+    if apply_shift_filter:
+        df = df[df["In_shift"].to_numpy()]; df = df.assign(Duur_min=df["Shift_min"])
+        kubus = kubus[kubus["In_shift"].to_numpy()]; kubus = kubus.assign(Duur_max=kubus["Shift_max"]) # Zoals filter_kubus
+    kolom = PERIODE_CODE_KOLOM[periode_selectie]
+    df = df.assign(**{kolom: periode_codes(df["Starttijd_dt"])[kolom]}) # Events vallen in de periode van hun starttijd, zoals in filter_data
+    leeg = df.iloc[0:0]
+    events_per_lijn = dict(iter(df.groupby(["Workflow", kolom], observed=True))); events_per_periode = dict(iter(df.groupby(kolom)))
+    taken = [("Alle lijnen", code, kubus_sel, events_per_periode.get(code, leeg)) for code, kubus_sel in kubus.groupby(kolom)]
+    taken += [(workflow, code, kubus_sel, events_per_lijn.get((workflow, code), leeg)) for (workflow, code), kubus_sel in kubus.groupby(["Workflow", kolom], observed=True)]
+    return [(workflow, int(code), periode_selectie, kubus_sel, df_sel) for workflow, code, kubus_sel, df_sel in taken]
+
+def maak_rapport(taak: tuple) -> tuple:
+    """Rekent één taak door (in een worker proces). Geeft (workflow, code, {soort: frame}) terug."""
+    workflow, code, periode_selectie, kubus_sel, df_sel = taak
+    return workflow, code, bereken_rapport(kubus_sel, df_sel, periode_selectie, code)
+
+def voeg_uitschieters_toe(resultaten: list, df_uitschieters: pd.DataFrame, periode_selectie: str, apply_shift_filter: bool) -> list:
+    """Zet bij elk rapport de uitschieters van die workflow (of de fabriek bij "Alle lijnen") en periode."""
+    kolom = PERIODE_CODE_KOLOM[periode_selectie]
+    df = df_uitschieters[(df_uitschieters["Alleen_shift"] == apply_shift_filter).to_numpy()]
+    per_taak = dict(iter(df.groupby(["Workflow", kolom])))
+    return [(workflow, code, dict(frames, uitschieters=uitschieter_tabel(per_taak[(workflow, code)]).drop(columns="Workflow") if (workflow, code) in per_taak else pd.DataFrame()))
+            for workflow, code, frames in resultaten]
+
+def bereken_rapporten(taken: list, workers: int) -> list:
+    """Alle taken, parallel over een process pool (workers=1: in dit proces)."""
+    if workers == 1 or len(taken) < 2: return [maak_rapport(taak) for taak in taken]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(maak_rapport, taken, chunksize=max(1, len(taken) // (4 * (workers or os.cpu_count() or 1)))))
+
+# === UITVOER ===
+def rapport_tabellen(resultaten: list, periode_selectie: str) -> dict:
+    """Per soort één tabel over alle rapporten, met Workflow en Periode vooraan (nieuwste periode eerst)."""
+    resultaten = sorted(resultaten, key=lambda r: (-r[1], r[0] != "Alle lijnen", r[0]))
+    tabellen = {}
+    for soort in RAPPORT_SOORTEN:
+        delen = [frames[soort].assign(Workflow=workflow, Periode=periode_label(code, periode_selectie)) for workflow, code, frames in resultaten if not frames[soort].empty]
+        tabel = pd.concat(delen, ignore_index=True) if delen else pd.DataFrame(columns=["Workflow", "Periode"])
+        tabellen[soort] = tabel[["Workflow", "Periode"] + [c for c in tabel.columns if c not in ("Workflow", "Periode")]]
+    return tabellen
+
+def schrijf_html(resultaten: list, periode_selectie: str, pad: str):
+    """Eén HTML bestand met per workflow x periode alle tabellen."""
+    delen = [f"<h1>Interfilling OEE rapport per {periode_selectie.lower()}</h1><p>Gemaakt op {datetime.datetime.now():%d-%m-%Y %H:%M}</p>"]
+    for workflow, code, frames in sorted(resultaten, key=lambda r: (-r[1], r[0] != "Alle lijnen", r[0])):
+        delen.append(f"<h2>{html.escape(workflow)} - {periode_label(code, periode_selectie)}</h2>")
+        for soort in RAPPORT_SOORTEN:
+            if frames[soort].empty: continue
+            delen.append(f"<h3>{RAPPORT_TITELS[soort]}</h3>" + frames[soort].to_html(index=False, float_format=lambda v: f"{v:.1f}", na_rep=""))
+    with open(pad, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html><html><head><meta charset='utf-8'><title>Interfilling OEE rapport</title>"
+                "<style>body{font-family:sans-serif} table{border-collapse:collapse} td,th{border:1px solid #ccc;padding:2px 6px}</style></head><body>"
+                + "\n".join(delen) + "</body></html>")
+
+def schrijf_rapporten(resultaten: list, periode_selectie: str, uit: str, formaten: list) -> list:
+    """Schrijft de rapporten naar uit/ in de gevraagde formaten. Geeft de geschreven paden terug."""
+    os.makedirs(uit, exist_ok=True); paden = []
+    achtervoegsel = periode_selectie.lower()
+    if "html" in formaten:
+        paden.append(os.path.join(uit, f"rapport_{achtervoegsel}.html")); schrijf_html(resultaten, periode_selectie, paden[-1])
+    tabellen = rapport_tabellen(resultaten, periode_selectie) if {"csv", "parquet"} & set(formaten) else {}
+    for soort, tabel in tabellen.items():
+        if "csv" in formaten:
+            paden.append(os.path.join(uit, f"{soort}_{achtervoegsel}.csv")); tabel.to_csv(paden[-1], index=False)
+        if "parquet" in formaten:
+            paden.append(os.path.join(uit, f"{soort}_{achtervoegsel}.parquet")); tabel.to_parquet(paden[-1], index=False)
+    return paden
+
+# === CLI ===
+def main(argv: list = None) -> int:
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Maakt de dashboard rapporten voor elke workflow x periode, zonder browser.")
+    parser.add_argument("--bron", help=f"Downtime export of map met exports (standaard: {DATA_DIR_DOWNTIME} als die bestaat, anders {DATA_PATH_DOWNTIME})")
+    parser.add_argument("--periode", choices=list(PERIODE_CODE_KOLOM), default="Week", help="Rapport per dag, week of maand (standaard: Week)")
+    parser.add_argument("--formaat", nargs="+", choices=["html", "csv", "parquet"], default=["html", "csv"], help="Uitvoerformaten (standaard: html csv)")
+    parser.add_argument("--uit", default=RAPPORT_DIR, help=f"Uitvoermap (standaard: {RAPPORT_DIR})")
+    parser.add_argument("--workers", type=int, default=None, help="Aantal processen (standaard: aantal CPU's; 1 = geen pool)")
+    parser.add_argument("--alle-tijden", action="store_true", help="Ook stilstand buiten de shift meetellen (dashboard: shift toggle uit)")
+    args = parser.parse_args(argv)
+
+    if "parquet" in args.formaat and pa is None: print("❌ Parquet uitvoer vereist pyarrow (pip install pyarrow).", file=sys.stderr); return 1
+    pad = args.bron or (DATA_DIR_DOWNTIME if os.path.isdir(DATA_DIR_DOWNTIME) else DATA_PATH_DOWNTIME)
+    if not os.path.exists(pad): print(f"❌ Downtime bestand niet gevonden: {pad}", file=sys.stderr); return 1
+    try: dataset, meldingen = laad_dataset(pad)
+    except ValueError as ve: print(f"❌ {ve}", file=sys.stderr); return 1
+    for melding in meldingen: print(f"⚠️ {melding}", file=sys.stderr)
+    if dataset["events"].empty: print("Geen downtime data gevonden.", file=sys.stderr); return 1
+
+    taken = rapport_taken(dataset, args.periode, not args.alle_tijden)
+    resultaten = bereken_rapporten(taken, args.workers)
+    df_uitschieters = uitschieters_frame(werk_uitschieters_bij(dataset["kubus"], uitschieter_pad(pad))) # Alleen de dagen sinds de vorige run
+    resultaten = voeg_uitschieters_toe(resultaten, df_uitschieters, args.periode, not args.alle_tijden)
+    for pad_uit in schrijf_rapporten(resultaten, args.periode, args.uit, args.formaat): print(pad_uit)
+    print(f"{len(resultaten)} rapporten ({args.periode.lower()}) geschreven naar {args.uit}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+# File: tests/conftest.py
+# Controles van de rekenkern tegen een brute-force of volledige herberekening (geen Streamlit nodig).
+# Gebruik: pytest tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks")) # genereer_motivate
@@ -0,0 +1,60 @@
+# File: tests/test_laad_downtime.py
+# laad_downtime (incrementele ingest): een opnieuw geëxporteerde, gecorrigeerde export vervangt zijn oude rijen, en
+# het resultaat is gelijk aan een koude build van dezelfde exports.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard import laad_downtime
+from genereer_motivate import genereer_export
+
+KOLOMMEN = ["Workflow", "Reden", "Ordernummer", "Starttijd_dt", "Stoptijd_dt", "Duur_min"]
+
+@pytest.fixture(scope="module")
+def export(tmp_path_factory) -> pd.DataFrame:
+    pad = genereer_export(5_000, str(tmp_path_factory.mktemp("bron") / "motivate.csv"), seed=3)
+    return pd.read_csv(pad, dtype=str, keep_default_na=False)
+
+def schrijf(df: pd.DataFrame, pad):
+    df.to_csv(pad, index=False, quoting=1)
+
+def koud(tmp_path, *exports) -> pd.DataFrame:
+    """laad_downtime zonder cache op dezelfde exports (zelfde bestandsnamen, dus zelfde volgorde)."""
+    map_pad = tmp_path / "koud"; map_pad.mkdir()
+    for naam, df in exports: schrijf(df, map_pad / naam)
+    return laad_downtime(str(map_pad))[0]
+
+def gelijk(a: pd.DataFrame, b: pd.DataFrame):
+    pd.testing.assert_frame_equal(a[KOLOMMEN].astype({"Workflow": str, "Reden": str, "Ordernummer": str}).reset_index(drop=True),
+                                  b[KOLOMMEN].astype({"Workflow": str, "Reden": str, "Ordernummer": str}).reset_index(drop=True))
+
+def test_gecorrigeerde_export_vervangt_oude_rijen(export, tmp_path):
+    eerst = export.copy(); leeg = np.arange(0, len(export), 37)
+    eerst.loc[leeg, "Reden"] = ""; eerst.loc[leeg, "Verklaard door"] = "" # Nog niet verklaard
+    map_pad = tmp_path / "exp"; map_pad.mkdir(); pad = map_pad / "export.csv"
+    schrijf(eerst, pad)
+    df, _ = laad_downtime(str(map_pad))
+    assert (df["Reden"] == "Onbekend").sum() == len(leeg)
+
+    gecorrigeerd = export.copy() # Operator heeft de redenen ingevuld, en één starttijd is gecorrigeerd
+    gecorrigeerd.loc[5, "Starttijd"] = (pd.to_datetime(export.loc[5, "Starttijd"], format="%d/%m/%y %H:%M:%S") - pd.Timedelta(minutes=3)).strftime("%d/%m/%y %H:%M:%S")
+    schrijf(gecorrigeerd, pad)
+    df, _ = laad_downtime(str(map_pad))
+    assert (df["Reden"] == "Onbekend").sum() == 0
+    verwacht = koud(tmp_path, ("export.csv", gecorrigeerd))
+    assert len(df) == len(verwacht) # De oude versie van de gecorrigeerde stop is weg, geen tweede kopie
+    gelijk(df, verwacht)
+
+def test_dubbele_rijen_tussen_exports(export, tmp_path):
+    """Overlappende exports: een rij die al in een andere export staat telt één keer, ook na een wijziging van de tweede."""
+    map_pad = tmp_path / "exp"; map_pad.mkdir()
+    a, b = export.iloc[:3_000], export.iloc[2_500:].copy()
+    schrijf(a, map_pad / "a.csv"); laad_downtime(str(map_pad))
+    schrijf(b, map_pad / "b.csv"); df, _ = laad_downtime(str(map_pad))
+    aantal = len(df)
+    b.loc[b.index[-1], "Reden"] = "Storing / Etiketeerder"; schrijf(b, map_pad / "b.csv")
+    df, _ = laad_downtime(str(map_pad))
+    verwacht = koud(tmp_path, ("a.csv", a), ("b.csv", b))
+    assert len(df) == aantal == len(verwacht) and (df["Reden"] == "Storing / Etiketeerder").sum() == (verwacht["Reden"] == "Storing / Etiketeerder").sum()
+    gelijk(df, verwacht)
@@ -0,0 +1,89 @@
+# File: tests/test_live_tail.py
+# werk_dataset_bij (live tail) tegen een volledige herberekening: na elke nieuwe export moeten events en kubus
+# exact gelijk zijn aan bouw_segmenten + voeg_tijdkenmerken_toe + bouw_kubus op het hele frame.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard import bouw_kubus, bouw_segmenten, laad_dataset, laad_downtime, voeg_tijdkenmerken_toe, werk_dataset_bij
+from genereer_motivate import genereer_export
+
+@pytest.fixture(scope="module")
+def export(tmp_path_factory) -> pd.DataFrame:
+    """Synthetische export als tekst (zoals Motivate) met de starttijden erbij, om op te splitsen."""
+    pad = genereer_export(20_000, str(tmp_path_factory.mktemp("bron") / "motivate.csv"), seed=7)
+    ruw = pd.read_csv(pad, dtype=str, keep_default_na=False)
+    return ruw.assign(_start=pd.to_datetime(ruw["Starttijd"], format="%d/%m/%y %H:%M:%S"))
+
+def volledig(df: pd.DataFrame) -> dict:
+    segmenten = bouw_segmenten(df); events = voeg_tijdkenmerken_toe(df, segmenten)
+    return {"events": events, "kubus": bouw_kubus(events, segmenten)}
+
+def controleer(map_pad, delen: list):
+    """Schrijft de delen één voor één als export in map_pad en vergelijkt de incrementele dataset met een volledige."""
+    map_pad.mkdir()
+    delen[0].drop(columns="_start").to_csv(map_pad / "export_0.csv", index=False, quoting=1)
+    dataset, _ = laad_dataset(str(map_pad))
+    for i, deel in enumerate(delen[1:], 1):
+        deel.drop(columns="_start").to_csv(map_pad / f"export_{i}.csv", index=False, quoting=1)
+        df, _ = laad_downtime(str(map_pad))
+        dataset = werk_dataset_bij(dataset, df); verwacht = volledig(df)
+        pd.testing.assert_frame_equal(dataset["events"], verwacht["events"])
+        pd.testing.assert_frame_equal(dataset["kubus"], verwacht["kubus"])
+
+def test_nieuwe_exports_op_tijd(export, tmp_path):
+    """Gewone live tail: elke export bevat de stops na de vorige."""
+    volgorde = np.argsort(export["_start"].to_numpy(), kind="stable")
+    controleer(tmp_path / "exp", [export.iloc[volgorde[:17_000]], export.iloc[volgorde[17_000:18_500]], export.iloc[volgorde[18_500:]]])
+
+def test_nieuwe_exports_willekeurig(export, tmp_path):
+    """Nagekomen stops midden in de historie: herbereken_vanaf moet ver genoeg terug."""
+    volgorde = np.random.default_rng(1).permutation(len(export))
+    controleer(tmp_path / "exp", [export.iloc[volgorde[:15_000]], export.iloc[volgorde[15_000:]]])
+
+def test_overlap_over_de_grens(export, tmp_path):
+    """Tweede export begint vóór het einde van de eerste (dubbele rijen vallen weg); stops lopen over de grens."""
+    grens = export["_start"].max() - pd.Timedelta(days=2)
+    controleer(tmp_path / "exp", [export[export["_start"] < grens], export[export["_start"] >= grens - pd.Timedelta(hours=3)]])
+
+def test_geen_uitbreiding_volledig(export, tmp_path):
+    """Is het nieuwe frame geen uitbreiding van het vorige (bv. cache opnieuw opgebouwd), dan gewoon volledig."""
+    map_pad = tmp_path / "exp"; map_pad.mkdir()
+    export.iloc[:10_000].drop(columns="_start").to_csv(map_pad / "a.csv", index=False, quoting=1)
+    dataset, _ = laad_dataset(str(map_pad))
+    (map_pad / "a.csv").unlink(); (map_pad / "downtime.cache.arrow").unlink()
+    export.iloc[5_000:].drop(columns="_start").to_csv(map_pad / "b.csv", index=False, quoting=1)
+    df, _ = laad_downtime(str(map_pad))
+    bijgewerkt = werk_dataset_bij(dataset, df); verwacht = volledig(df)
+    pd.testing.assert_frame_equal(bijgewerkt["events"], verwacht["events"]); pd.testing.assert_frame_equal(bijgewerkt["kubus"], verwacht["kubus"])
+
+def test_gewijzigde_export(export, tmp_path):
+    """Dezelfde export opnieuw, met achteraf ingevulde redenen en een langer geworden stop: die stops worden herberekend."""
+    map_pad = tmp_path / "exp"; map_pad.mkdir(); pad = map_pad / "export.csv"
+    volgorde = np.argsort(export["_start"].to_numpy(), kind="stable")
+    eerst = export.iloc[volgorde[:18_000]].drop(columns="_start").copy()
+    onverklaard = eerst.index[::50]; eerst.loc[onverklaard, "Reden"] = ""
+    eerst.to_csv(pad, index=False, quoting=1)
+    dataset, _ = laad_dataset(str(map_pad))
+    gecorrigeerd = export.iloc[volgorde[:18_500]].drop(columns="_start").copy() # Redenen ingevuld, nieuwe stops erbij
+    laatste = gecorrigeerd.index[17_990] # Een stop die bij de eerste export nog liep: stoptijd later
+    stop = pd.to_datetime(gecorrigeerd.loc[laatste, "Stoptijd"], format="%d/%m/%y %H:%M:%S") + pd.Timedelta(hours=5)
+    gecorrigeerd.loc[laatste, "Stoptijd"] = stop.strftime("%d/%m/%y %H:%M:%S")
+    gecorrigeerd.to_csv(pad, index=False, quoting=1)
+    df, _ = laad_downtime(str(map_pad))
+    bijgewerkt = werk_dataset_bij(dataset, df); verwacht = volledig(df)
+    assert (bijgewerkt["events"]["Reden"] == "Onbekend").sum() == 0
+    pd.testing.assert_frame_equal(bijgewerkt["events"], verwacht["events"]); pd.testing.assert_frame_equal(bijgewerkt["kubus"], verwacht["kubus"])
+
+def test_gewijzigde_starttijd_volledig(export, tmp_path):
+    """Een gecorrigeerde starttijd: de oude stop verdwijnt, dus geen uitbreiding meer; het resultaat klopt toch."""
+    map_pad = tmp_path / "exp"; map_pad.mkdir(); pad = map_pad / "export.csv"
+    eerst = export.drop(columns="_start"); eerst.to_csv(pad, index=False, quoting=1)
+    dataset, _ = laad_dataset(str(map_pad))
+    gecorrigeerd = eerst.copy()
+    gecorrigeerd.loc[100, "Starttijd"] = (export.loc[100, "_start"] - pd.Timedelta(minutes=7)).strftime("%d/%m/%y %H:%M:%S")
+    gecorrigeerd.to_csv(pad, index=False, quoting=1)
+    df, _ = laad_downtime(str(map_pad))
+    bijgewerkt = werk_dataset_bij(dataset, df); verwacht = volledig(df)
+    pd.testing.assert_frame_equal(bijgewerkt["events"], verwacht["events"]); pd.testing.assert_frame_equal(bijgewerkt["kubus"], verwacht["kubus"])
@@ -0,0 +1,49 @@
+# File: tests/test_order_koppeling.py
+# bereken_order_koppeling: stilstand per werkorder wordt niet dubbel geteld als de ERP export meerdere regels per
+# werkorder heeft, en alleen stops zonder ordernummer gaan via lijn/tijd naar de laatst gestarte regel.
+
+import numpy as np
+import pandas as pd
+
+from dashboard import EFFECTIVE_CAPACITY, bereken_order_koppeling
+
+T = pd.Timestamp
+
+def events(*stops) -> pd.DataFrame:
+    """(ordernummer, workflow, start, minuten) -> events frame zoals laad_dataset het levert (alleen de gebruikte kolommen)."""
+    return pd.DataFrame({"Ordernummer": pd.Categorical([s[0] for s in stops]), "Workflow": pd.Categorical([s[1] for s in stops]),
+                         "Starttijd_dt": [T(s[2]) for s in stops], "Duur_min": np.array([s[3] for s in stops], dtype="float32")})
+
+def orders(*regels) -> pd.DataFrame:
+    """(wo, lijn, datum, aantal) -> orders frame zoals lees_order_csv het levert."""
+    return pd.DataFrame({"Date": [T(r[2]) for r in regels], "Line": [r[1] for r in regels], "WO #": [r[0] for r in regels],
+                         "Item": "A-1", "Quantity": [r[3] for r in regels]})
+
+def test_meerdere_regels_per_werkorder():
+    df_events = events(("WO000001", "VMPT1", "2025-03-03 08:00", 30), ("WO000001", "VMPT1", "2025-03-04 09:00", 50),
+                       ("WO000001", "VMPT1", "2025-03-05 10:00", 20), ("WO000002", "VMPT1", "2025-03-05 11:00", 10))
+    df_orders = orders(("WO000001", "VMPT 1", "2025-03-03", 1000), ("WO 1", "VMPT 1", "2025-03-04", 3000), ("wo000001", "VMPT 1", "2025-03-05", 0),
+                       ("WO000002", "VMPT 1", "2025-03-05", 500))
+    df = bereken_order_koppeling(df_orders, df_events)
+    assert np.allclose(df["Downtime_min"], [25.0, 75.0, 0.0, 10.0]) # 100 min naar Quantity verdeeld, niet 3x 100
+    assert df["Downtime_min"].sum() == df_events["Duur_min"].sum() and df["Stops"].sum() == len(df_events)
+    assert df["Stops"].tolist() == [1, 2, 0, 1]
+    target = 4000 / EFFECTIVE_CAPACITY # Elke regel met aantal toont de performance van de hele werkorder
+    assert np.allclose(df["Performance (%)"].iloc[:2], 100 * target / (target + 100))
+
+def test_regels_zonder_aantal_gelijk_verdeeld():
+    df = bereken_order_koppeling(orders(("WO7", "COSMO", "2025-03-03", 0), ("WO7", "COSMO", "2025-03-04", 0)),
+                                 events(("WO7", "COSMO", "2025-03-03 08:00", 40), ("WO7", "COSMO", "2025-03-03 09:00", 20), ("WO7", "COSMO", "2025-03-04 09:00", 30)))
+    assert df["Downtime_min"].tolist() == [45.0, 45.0] and df["Stops"].sum() == 3
+
+def test_lijn_tijd_koppeling_naast_ordernummer():
+    """Stops zonder ordernummer gaan naar de laatst gestarte orderregel op de lijn (binnen ORDER_KOPPEL_TOLERANTIE)."""
+    df = bereken_order_koppeling(orders(("WO1", "VMPT 1", "2025-03-03", 100), ("WO2", "VMPT 1", "2025-03-04", 100)),
+                                 events(("WO1", "VMPT1", "2025-03-03 08:00", 10), ("", "VMPT1", "2025-03-04 08:00", 15), ("ONBEKEND", "VMPT1", "2025-03-08 08:00", 5)))
+    assert df["Downtime_min"].tolist() == [10.0, 15.0] and df["Koppeling"].tolist() == ["Ordernummer", "Lijn/tijd"]
+
+def test_ander_ordernummer_niet_via_lijn_tijd():
+    """Een stop geboekt op een order die niet in de order data staat hoort niet bij een andere order op dezelfde lijn en dag."""
+    df = bereken_order_koppeling(orders(("WO1", "VMPT 1", "2025-03-03", 100)),
+                                 events(("WO1", "VMPT1", "2025-03-03 08:00", 10), ("WO777", "VMPT1", "2025-03-03 12:00", 25), (" wo 0 ", "VMPT1", "2025-03-03 13:00", 5)))
+    assert df["Downtime_min"].tolist() == [15.0] and df["Stops"].tolist() == [2]
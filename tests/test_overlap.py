@@ -0,0 +1,55 @@
+# File: tests/test_overlap.py
+# overlap_stukken / sweep_cluster tegen brute force per minuut: elke minuut waarin op een workflow stops actief zijn
+# hoort bij precies één stop, de actieve stop met de laagste (reden_rang, starttijd, positie in df).
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard import bouw_segmenten, overlap_stukken, reden_rang, voeg_tijdkenmerken_toe
+
+BEGIN = pd.Timestamp("2025-03-03")
+REDENEN = ["Storing / Etiketeerder", "Ongeplande organisatorische stilstand / Wachten op materiaal",
+           "Geplande organisatorische stilstand / Pauze", "Productie uitgepland  / Geen orders", "Onbekend"]
+
+def willekeurige_stops(rng: np.random.Generator, aantal: int, minuten: int, max_duur: int) -> pd.DataFrame:
+    """Stops op hele minuten op twee workflows, met veel overlap, gelijke starttijden en stops van 0 minuten."""
+    start = rng.integers(0, minuten, aantal); duur = rng.integers(0, max_duur, aantal)
+    return pd.DataFrame({"Workflow": pd.Categorical(rng.choice(["VMPT1", "COSMO"], aantal)), "Reden": pd.Categorical(rng.choice(REDENEN, aantal)),
+                         "Starttijd_dt": BEGIN + pd.to_timedelta(start, unit="min"), "Stoptijd_dt": BEGIN + pd.to_timedelta(start + duur, unit="min")})
+
+def minuten_per_stop(df: pd.DataFrame) -> np.ndarray:
+    """Brute force: per minuut de winnende actieve stop, opgeteld per stop."""
+    start = ((df["Starttijd_dt"] - BEGIN) // pd.Timedelta(minutes=1)).to_numpy(); stop = ((df["Stoptijd_dt"] - BEGIN) // pd.Timedelta(minutes=1)).to_numpy()
+    rang = reden_rang(df["Reden"]); minuten = np.zeros(len(df))
+    for workflow in df["Workflow"].cat.categories:
+        rijen = np.flatnonzero((df["Workflow"] == workflow).to_numpy())
+        for minuut in range(int(stop.max(initial=0)) + 1):
+            actief = [i for i in rijen if start[i] <= minuut < stop[i]]
+            if actief: minuten[min(actief, key=lambda i: (rang[i], start[i], i))] += 1
+    return minuten
+
+@pytest.mark.parametrize("seed", range(25))
+def test_overlap_gelijk_aan_brute_force(seed):
+    df = willekeurige_stops(np.random.default_rng(seed), aantal=40, minuten=600, max_duur=120)
+    rij, van, tot = overlap_stukken(df)
+    assert np.array_equal(np.bincount(rij, weights=(tot - van) / 60, minlength=len(df)), minuten_per_stop(df))
+    assert np.array_equal(np.unique(rij), np.arange(len(df))) # Ook een stop die helemaal wegvalt houdt een stuk (van 0 seconden)
+    for workflow in df["Workflow"].cat.categories: # Stukken (met duur) per workflow overlappen niet
+        mask = (df["Workflow"] == workflow).to_numpy()[rij] & (tot > van); volgorde = np.argsort(van[mask], kind="stable")
+        assert np.all(van[mask][volgorde][1:] >= tot[mask][volgorde][:-1])
+
+def test_geneste_stops():
+    """Een storing binnen een pauze: de storing krijgt zijn minuten, de pauze de rest; de kloktijd blijft gelijk."""
+    df = pd.DataFrame({"Workflow": pd.Categorical(["VMPT1", "VMPT1", "VMPT1"]), "Reden": pd.Categorical([REDENEN[2], REDENEN[0], REDENEN[4]]),
+                       "Starttijd_dt": BEGIN + pd.to_timedelta([480, 500, 510], unit="min"), "Stoptijd_dt": BEGIN + pd.to_timedelta([540, 520, 515], unit="min")})
+    rij, van, tot = overlap_stukken(df)
+    assert np.bincount(rij, weights=(tot - van) / 60, minlength=3).tolist() == [40.0, 20.0, 0.0]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_segmenten_behouden_duur(seed):
+    """Na dagsplitsing en shiftkalender telt Duur_min per stop nog op tot de brute-force minuten (ook over middernacht)."""
+    df = willekeurige_stops(np.random.default_rng(100 + seed), aantal=30, minuten=3 * 24 * 60, max_duur=36 * 60)
+    events = voeg_tijdkenmerken_toe(df, bouw_segmenten(df))
+    assert np.allclose(events["Duur_min"].to_numpy(), minuten_per_stop(df), atol=1e-3)
+    assert np.all(events["Shift_min"].to_numpy() <= events["Duur_min"].to_numpy() + 1e-3)
@@ -0,0 +1,39 @@
+# File: tests/test_uitschieters.py
+# werk_uitschieters_bij met een bewaarde toestand tegen een verse berekening op de hele kubus: na elke stap
+# moeten dezelfde uitschieters gevonden worden.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard import bouw_kubus, bouw_segmenten, laad_downtime, uitschieters_frame, voeg_tijdkenmerken_toe, werk_uitschieters_bij
+from genereer_motivate import genereer_export
+
+@pytest.fixture(scope="module")
+def kubus(tmp_path_factory) -> pd.DataFrame:
+    pad = genereer_export(20_000, str(tmp_path_factory.mktemp("bron") / "motivate.csv"), seed=11)
+    df, _ = laad_downtime(pad); segmenten = bouw_segmenten(df)
+    return bouw_kubus(voeg_tijdkenmerken_toe(df, segmenten), segmenten)
+
+def controleer(kubus: pd.DataFrame, pad: str):
+    incrementeel = uitschieters_frame(werk_uitschieters_bij(kubus, pad)); vers = uitschieters_frame(werk_uitschieters_bij(kubus))
+    assert len(vers)
+    pd.testing.assert_frame_equal(incrementeel, vers)
+
+def test_in_stappen(kubus, tmp_path):
+    """Dagen komen er per blok bij: alleen de nieuwe dagen worden verwerkt."""
+    pad = str(tmp_path / "toestand.json"); codes = np.unique(kubus["Dag_code"].to_numpy())
+    for grens in codes[len(codes) // 2::7]: werk_uitschieters_bij(kubus[kubus["Dag_code"].to_numpy() <= grens].reset_index(drop=True), pad)
+    controleer(kubus, pad)
+
+def test_ontbrekende_dag(kubus, tmp_path):
+    """Een dag die bij het bewaren nog ontbrak (bv. een nagekomen export) moet tot een herberekening leiden."""
+    pad = str(tmp_path / "toestand.json"); codes = np.unique(kubus["Dag_code"].to_numpy())
+    werk_uitschieters_bij(kubus[kubus["Dag_code"].to_numpy() != codes[-10]].reset_index(drop=True), pad)
+    controleer(kubus, pad)
+
+def test_ontbrekende_dag_voor_het_venster(kubus, tmp_path):
+    """Venster nog niet vol: ook een dag vóór de eerste bewaarde dag telt."""
+    pad = str(tmp_path / "toestand.json"); codes = np.unique(kubus["Dag_code"].to_numpy())
+    werk_uitschieters_bij(kubus[(kubus["Dag_code"].to_numpy() != codes[0]) & (kubus["Dag_code"].to_numpy() <= codes[20])].reset_index(drop=True), pad)
+    controleer(kubus, pad)